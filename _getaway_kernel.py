@@ -0,0 +1,156 @@
+'''
+The inner loops of KernelFlowNetwork (see getaway.py), the build of the edges, the greedy warm start
+and the BFS with its backtracking, over flat lists of integers.
+They are only used by the "phased" engine with the "kernel" backend, allocate(..., engine="phased"),
+not by the default engine of allocate.
+
+This file is plain Python with type annotations, so it can be compiled by mypyc into an extension
+which is imported instead of this file:
+
+    pip install mypy
+    mypyc _getaway_kernel.py
+
+If the extension is not built, getaway.py imports this file and the same code runs in the interpreter.
+COMPILED tells which one was imported. Both give the same car list as CompactFlowNetwork.
+'''
+
+from __future__ import annotations
+
+# not typing, which is slow to import for a short-lived worker (collections.abc is imported by array anyway)
+from collections.abc import Sequence
+
+# True if this module is the extension of mypyc
+COMPILED: bool = not __file__.endswith(".py")
+
+
+def build_edges(preferences: Sequence[Sequence[int]], og_vertices: int, car_max: int, sink_index: int
+                ) -> tuple[list[int], list[int], list[int]]:
+    '''
+    Function description:
+
+    This function returns the rows of the edges of CompactFlowNetwork, from person to car and from car to sink.
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: og_vertices : the number of people
+        argv3: car_max : the number of cars
+        argv4: sink_index : the vertex index of the sink
+
+    :Output, return: (offsets, u, v), the rows of source and sink are empty
+
+    :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+    :Aux space complexity: O(N + E)
+    '''
+    offsets: list[int] = [0]
+    edge_u: list[int] = []
+    edge_v: list[int] = []
+
+    # add edges from person to car
+    for i in range(og_vertices):
+        for j in preferences[i]:
+            edge_u.append(i)
+            edge_v.append(og_vertices + j)
+        offsets.append(len(edge_v))
+
+    # add edges from car to sink
+    for i in range(car_max):
+        edge_u.append(og_vertices + i)
+        edge_v.append(sink_index)
+        offsets.append(len(edge_v))
+
+    # source and sink rows are empty
+    offsets.append(len(edge_v))
+    offsets.append(len(edge_v))
+    return offsets, edge_u, edge_v
+
+
+def warm_start(offsets: list[int], edge_v: list[int], c: list[int], f: list[int], source_start: int,
+               og_vertices: int, car_edges_start: int, car_list: list[list[int]]) -> list[int]:
+    '''
+    Function description:
+
+    This function allocates greedily every person with an edge from source to the first car of their list with space,
+    same as CompactFlowNetwork.warm_start. The edges from source are the edges from source_start to the end.
+
+    :Output, return: the allocated people, who are appended to their car in car_list too
+
+    :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+    :Aux space complexity: O(N)
+    '''
+    allocated: list[int] = []
+
+    for source_edge in range(source_start, len(edge_v)):
+        if c[source_edge] - f[source_edge] <= 0:
+            continue
+        person = edge_v[source_edge]
+        for e in range(offsets[person], offsets[person + 1]):
+            if c[e] - f[e] <= 0:
+                continue
+            car = edge_v[e] - og_vertices
+            car_edge = car_edges_start + car
+            if c[car_edge] - f[car_edge] > 0:
+                f[source_edge] += 1
+                f[e] += 1
+                f[car_edge] += 1
+                car_list[car].append(person)
+                allocated.append(person)
+                break
+
+    return allocated
+
+
+def find_path(offsets: list[int], edge_u: list[int], edge_v: list[int], c: list[int], f: list[int],
+              source_start: int, source_index: int, source: int, sink: int,
+              previous: list[int], stamp: list[int], queue: list[int], generation: int
+              ) -> tuple[list[int] | None, int]:
+    '''
+    Function description:
+
+    BFS algorithm to find the path from source to sink, same as CompactFlowNetwork.find_path.
+    The discovered vertices are the ones whose stamp is generation, which must be new for every call.
+    The edges from source are the edges from source_start to the end, so every row is a range of edge indices.
+
+    :Output, return: (the list of the edge indices on the path or None, the number of vertices which were served)
+
+    :Time complexity: O(V + E), where V is the number of vertices and E is the number of edges.
+    :Aux space complexity: O(1), the queue is the given list.
+    '''
+    stamp[source] = generation
+    queue[0] = source
+    head = 0
+    tail = 1
+
+    # it will run while there is a vertex in the queue
+    while head < tail:
+        u = queue[head]
+        head += 1
+
+        if u == source_index:
+            first = source_start
+            last = len(edge_v)
+        else:
+            first = offsets[u]
+            last = offsets[u + 1]
+
+        for e in range(first, last):
+            v = edge_v[e]
+
+            # if the vertex is not discovered and the capacity is bigger than flow, discover the vertex
+            if stamp[v] != generation and c[e] - f[e] > 0:
+                previous[v] = e
+
+                # the sink is found, backtrack the path
+                if v == sink:
+                    path: list[int] = []
+                    while v != source:
+                        e = previous[v]
+                        path.append(e)
+                        v = edge_u[e]
+                    path.reverse()
+                    return path, head
+
+                stamp[v] = generation
+                queue[tail] = v
+                tail += 1
+
+    return None, head
@@ -0,0 +1,1194 @@
+'''
+Benchmarks for getaway.py.
+
+Usage:
+    python benchmark.py backends [--kind K] [N ...]
+    python benchmark.py engines [N ...]
+    python benchmark.py bfs [N ...]
+    python benchmark.py batch [--jobs J] [--size N] [WORKERS ...]
+    python benchmark.py incremental [N ...]
+    python benchmark.py ingest [N ...]
+    python benchmark.py profile [--engine E] [N ...]
+    python benchmark.py suite [--kinds K ...] [--engines E ...] [--budget S] [--output FILE] [N ...]
+    python benchmark.py compare OLD.json NEW.json [--threshold R]
+    python benchmark.py crosscheck [--trips T] [N ...]
+    python benchmark.py components [--kind K] [--workers W] [N ...]
+    python benchmark.py service [--requests R] [--distinct D] [--concurrency C] [--timeout S] [--size N]
+    python benchmark.py anytime [--kind K] [--slice S] [N ...]
+    python benchmark.py snapshot [--kind K] [N ...]
+    python benchmark.py ranked [--kind K] [--slowdown X] [N ...]
+    python benchmark.py kernel [--kind K] [--trips T] [N ...]
+    python benchmark.py fleet [--kind K] [--trips T] [--seats R] [--max-edges E] [N ...]
+    python benchmark.py startup [--runs R] [N ...]
+    python benchmark.py spill [--kind K] [--budget MB] [N ...]
+
+"backends" builds the flow network with every backend in getaway.NETWORK_BACKENDS
+and reports the time and the peak memory of the build, and the wall time and the peak memory of allocate.
+"engines" reports the wall time of allocate with every engine in getaway.ENGINES.
+"bfs" reports the time per call of bfs (before) and find_path (after) of every backend, and the time of the "phased" engine.
+"batch" reports the throughput of getaway.allocate_many for every number of workers.
+"incremental" reports the latency of a single edit with getaway.Allocator against solving again.
+"ingest" reports the peak memory of reading a trip file into lists against getaway.load_trip.
+"profile" reports the AllocationStats of every phase, and the time of allocate with and without stats.
+"suite" sweeps N (10 to 10^6 by default) over every kind of trip in TRIP_KINDS and every engine,
+and writes the wall time, the BFS calls and the peak memory of every run to a JSON file.
+"compare" prints the ratio of two JSON files of "suite", e.g. of two revisions.
+"crosscheck" checks every engine against "dinic" on random trips, and that every car list is valid.
+"components" reports the time of allocate with and without allocate_components, on a pool of processes too.
+"service" sends a burst of requests to getaway.AllocationService in this process, and reports the solves,
+the coalesced requests, the timeouts and how long the event loop was blocked.
+"anytime" runs getaway.AnytimeAllocator in slices of S seconds, and reports the people who are not in a car
+after every slice, and the time of allocate for the same trip.
+"snapshot" reports the time of the "phased" engine against getaway.load_network of its snapshot, and the file size.
+"ranked" reports the time and the sum of the ranks of the "bipartite" and the "ranked" engines,
+and of the "ranked" engine with max_slowdown X.
+"kernel" checks that the "kernel" backend gives the same car list as "compact" with the interpreted
+_getaway_kernel.py and with the extension of mypyc (if it is built), on T random small trips
+and on a trip of every size, and reports the time of the "phased" engine with each of them.
+"fleet" schedules T trips of N people on a shared inventory with R times the seats that they can take
+at every destination, with getaway.schedule_trips and with solving every trip alone and then
+reconciling the seats, and reports the time and the trips which were allocated.
+"startup" reports the wall time from the start of a new Python process to the car list of a trip of N people,
+for python -m getaway and for the import of getaway with the engines of before, against an empty Python
+and the import alone, and the time of the first allocate of a new process with "auto" and "bipartite".
+"spill" reports the time and the peak memory of a new process which solves a binary trip of N people with the
+"phased" engine and the "compact", "kernel" and "spill" backends, with a budget of MB for "spill",
+and checks that they give the same car list.
+'''
+
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+
+import getaway
+
+
+# kind of trip: (the most extra destinations of a person,
+#                the probability of every extra destination, or None for a uniform number of them,
+#                the probability of a license for a person who is not one of the 2 drivers of a car,
+#                the number of cars of a cluster which the extra destinations are picked from, or None for every car)
+TRIP_KINDS = {
+    "mixed": (2, None, 1 / 3, None),
+    "single": (1, 0.1, 1 / 3, None),
+    "multi": (5, 0.8, 1 / 3, None),
+    "scarce": (2, 0.5, 0.02, None),
+    "infeasible": (2, 0.5, 1 / 3, None),
+    "clustered": (2, None, 1 / 3, 10),
+    "long": (30, None, 1 / 3, None),
+}
+
+
+def make_trip(n, seed=0, kind="mixed"):
+    '''
+    Function description:
+
+    This function returns a random (preferences, licenses) pair for n people.
+    It has an allocation, unless the kind is "infeasible".
+
+    Approach description:
+
+    Every car gets 2 drivers first and the rest of the people are put in the cars which are not full.
+    Then every person picks some more random destinations (see TRIP_KINDS), and the preferences are shuffled.
+    "single" is mostly one destination per person, "multi" is up to 5 more destinations,
+    "scarce" has (almost) only the 2 drivers of every car with a license.
+    "clustered" picks the extra destinations in the block of 10 cars of the person,
+    so the trip has many independent components.
+    "long" has up to 30 more destinations per person.
+    "infeasible" takes the license of a driver of car 0 and car 0 from the other people with a license,
+    so car 0 cannot have 2 drivers.
+
+    :Input:
+        argv1: n : the number of people
+        argv2: seed : the seed of the random generator
+        argv3: kind : the kind of trip, a key of TRIP_KINDS
+
+    :Output, return: (preferences, licenses)
+    '''
+    most_extra, extra_probability, license_probability, cluster = TRIP_KINDS[kind]
+    rng = random.Random(seed)
+    car_max = -(-n // 5)
+    people = list(range(n))
+    rng.shuffle(people)
+
+    # 2 drivers per car, the other people have a license with the probability 1/3
+    car_of = [0] * n
+    licenses = []
+    seats = []
+    for k in range(n):
+        person = people[k]
+        if k < 2 * car_max:
+            car_of[person] = k // 2
+            licenses.append(person)
+        else:
+            if not seats:
+                seats = [j for j in range(car_max) for _ in range(3)]
+                rng.shuffle(seats)
+            car_of[person] = seats.pop()
+            if rng.random() < license_probability:
+                licenses.append(person)
+
+    preferences = []
+    for i in range(n):
+        person_preference = {car_of[i]}
+
+        # the extra destinations are picked from first to last
+        first = 0
+        last = car_max
+        if cluster is not None:
+            first = car_of[i] - car_of[i] % cluster
+            last = min(first + cluster, car_max)
+
+        if extra_probability is None:
+            for _ in range(rng.randint(0, most_extra)):
+                person_preference.add(rng.randrange(first, last))
+        else:
+            for _ in range(most_extra):
+                if rng.random() < extra_probability:
+                    person_preference.add(rng.randrange(first, last))
+        person_preference = list(person_preference)
+        rng.shuffle(person_preference)
+        preferences.append(person_preference)
+
+    if kind == "infeasible" and n >= 2:
+        # people[0] and people[1] are the drivers of car 0
+        licenses.remove(people[0])
+        for person in licenses:
+            if person != people[1] and 0 in preferences[person] and len(preferences[person]) > 1:
+                preferences[person].remove(0)
+            elif person != people[1] and preferences[person] == [0]:
+                preferences[person] = [1 % car_max]
+
+    licenses.sort()
+    return preferences, licenses
+
+
+def network_memory(backend, preferences):
+    '''
+    Function description:
+
+    This function returns the peak memory (bytes) used while building the flow network with the backend.
+    '''
+    tracemalloc.start()
+    network = getaway.NETWORK_BACKENDS[backend](preferences)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del network
+    return peak
+
+
+def allocate_time(preferences, licenses, repeat=3, **options):
+    '''
+    Function description:
+
+    This function returns the best wall time (seconds) of allocate with the options,
+    and whether an allocation was found.
+    '''
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = getaway.allocate(preferences, licenses, **options)
+        best = min(best, time.perf_counter() - start)
+    return best, result is not None
+
+
+def allocate_memory(preferences, licenses, **options):
+    '''
+    Function description:
+
+    This function returns the peak memory (bytes) used by allocate with the options.
+    '''
+    tracemalloc.start()
+    getaway.allocate(preferences, licenses, **options)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def bench_backends(sizes, kind):
+    '''
+    Function description:
+
+    This function prints the memory and the time of the build and of allocate for every backend and every size.
+    '''
+    print("%-10s %8s %10s %14s %12s %14s" % ("backend", "N", "build s", "build bytes", "allocate s", "allocate bytes"))
+    for n in sizes:
+        preferences, licenses = make_trip(n, 0, kind)
+        for backend in getaway.NETWORK_BACKENDS:
+            start = time.perf_counter()
+            getaway.NETWORK_BACKENDS[backend](preferences)
+            build = time.perf_counter() - start
+            memory = network_memory(backend, preferences)
+            seconds = allocate_time(preferences, licenses, engine="phased", backend=backend)[0]
+            peak = allocate_memory(preferences, licenses, engine="phased", backend=backend)
+            print("%-10s %8d %10.4f %14d %12.4f %14d" % (backend, n, build, memory, seconds, peak))
+
+
+def bench_engines(sizes):
+    '''
+    Function description:
+
+    This function prints the time of allocate for every engine and every size.
+    '''
+    print("%-10s %8s %12s %8s" % ("engine", "N", "allocate s", "found"))
+    for n in sizes:
+        preferences, licenses = make_trip(n)
+        for engine in getaway.ENGINES:
+            seconds, found = allocate_time(preferences, licenses, engine=engine)
+            print("%-10s %8d %12.4f %8s" % (engine, n, seconds, found))
+
+
+def bfs_call_time(network, method, calls):
+    '''
+    Function description:
+
+    This function returns the time (seconds) per call of the BFS method of the network.
+    '''
+    search = getattr(network, method)
+    start = time.perf_counter()
+    for _ in range(calls):
+        search(network.source_index, network.sink_index)
+    return (time.perf_counter() - start) / calls
+
+
+def bench_bfs(sizes, calls=20):
+    '''
+    Function description:
+
+    This function prints the time per BFS call before (bfs, with a reset, a Queue and no early exit)
+    and after (find_path, with generation stamps and early exit), and the time of the phased allocate,
+    for every backend and every size.
+
+    The network has an edge from source to every person, which is the state of the last phase of allocate.
+    '''
+    print("%-10s %8s %12s %12s %12s" % ("backend", "N", "bfs us", "find_path us", "phased s"))
+    for n in sizes:
+        preferences, licenses = make_trip(n)
+        for backend in getaway.NETWORK_BACKENDS:
+            network = getaway.NETWORK_BACKENDS[backend](preferences)
+            for i in range(n):
+                network.add_source_edge(i)
+            old = bfs_call_time(network, "bfs", calls)
+            new = bfs_call_time(network, "find_path", calls)
+            seconds = allocate_time(preferences, licenses, engine="phased", backend=backend)[0]
+            print("%-10s %8d %12.1f %12.1f %12.4f" % (backend, n, old * 1e6, new * 1e6, seconds))
+
+
+def bench_batch(jobs, size, workers_list):
+    '''
+    Function description:
+
+    This function prints the wall time and the speedup of allocate_many over a serial loop.
+    '''
+    trips = [make_trip(size, seed) for seed in range(jobs)]
+
+    start = time.perf_counter()
+    for preferences, licenses in trips:
+        getaway.allocate(preferences, licenses)
+    serial = time.perf_counter() - start
+
+    print("%-8s %10s %8s" % ("workers", "seconds", "speedup"))
+    print("%-8s %10.3f %8.2f" % ("loop", serial, 1.0))
+    for workers in workers_list:
+        start = time.perf_counter()
+        for _ in getaway.allocate_many(trips, workers=workers):
+            pass
+        seconds = time.perf_counter() - start
+        print("%-8d %10.3f %8.2f" % (workers, seconds, serial / seconds))
+
+
+def bench_incremental(sizes, edits=200):
+    '''
+    Function description:
+
+    This function prints the time of a full allocate and the mean time of a single edit with Allocator.
+    The edits are random preference changes, license toggles, and a person who leaves and comes back.
+    '''
+    print("%8s %12s %12s %8s" % ("N", "allocate s", "edit us", "feasible"))
+    for n in sizes:
+        preferences, licenses = make_trip(n)
+        rng = random.Random(n)
+
+        start = time.perf_counter()
+        getaway.allocate(preferences, licenses)
+        full = time.perf_counter() - start
+
+        allocator = getaway.Allocator(preferences, licenses)
+        licensed = set(licenses)
+
+        # the index of every person, a person who comes back gets a new index
+        people = list(range(n))
+        start = time.perf_counter()
+        for k in range(edits):
+            slot = rng.randrange(n)
+            person = people[slot]
+            original = slot
+            if k % 3 == 0:
+                allocator.change_preferences(person, preferences[original][::-1])
+            elif k % 3 == 1:
+                allocator.toggle_license(person)
+                allocator.toggle_license(person)
+            else:
+                allocator.remove_person(person)
+                people[slot] = allocator.add_person(preferences[original], original in licensed)
+        edit = (time.perf_counter() - start) / edits
+        print("%8d %12.4f %12.1f %8s" % (n, full, edit * 1e6, allocator.feasible))
+
+
+def read_lists(path):
+    '''
+    Function description:
+
+    This function reads a JSON lines trip into the list of lists, the way it is done without load_trip.
+    '''
+    import json
+
+    preferences = []
+    licenses = []
+    with open(path) as file:
+        for line in file:
+            record = json.loads(line)
+            if record.get("license"):
+                licenses.append(len(preferences))
+            preferences.append(record["preferences"])
+    return preferences, licenses
+
+
+def bench_ingest(sizes):
+    '''
+    Function description:
+
+    This function prints the peak memory and the time of reading a trip and building the compact flow network,
+    with the list of lists and with load_trip (JSON lines and binary).
+    '''
+    import json
+    import os
+    import tempfile
+
+    print("%-8s %8s %14s %10s" % ("reader", "N", "peak bytes", "seconds"))
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            preferences, licenses = make_trip(n)
+            licensed = set(licenses)
+            jsonl = os.path.join(directory, "trip.jsonl")
+            binary = os.path.join(directory, "trip.bin")
+            with open(jsonl, "w") as file:
+                for i in range(n):
+                    file.write(json.dumps({"preferences": preferences[i], "license": i in licensed}) + "\n")
+            getaway.save_trip(binary, preferences, licenses)
+            del preferences, licenses
+
+            readers = [
+                ("lists", lambda: read_lists(jsonl)),
+                ("jsonl", lambda: getaway.load_trip(jsonl)),
+                ("binary", lambda: getaway.load_trip(binary)),
+            ]
+            for name, read in readers:
+                tracemalloc.start()
+                start = time.perf_counter()
+                trip = read()
+                network = getaway.CompactFlowNetwork(trip[0])
+                seconds = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                del trip, network
+                print("%-8s %8d %14d %10.3f" % (name, n, peak, seconds))
+
+
+def bench_profile(sizes, engine):
+    '''
+    Function description:
+
+    This function prints the time and the BFS calls of every phase, and the overhead of the stats.
+    '''
+    for n in sizes:
+        preferences, licenses = make_trip(n)
+        plain = allocate_time(preferences, licenses, engine=engine)[0]
+
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            car_list, stats = getaway.allocate_with_stats(preferences, licenses, engine=engine)
+            best = min(best, time.perf_counter() - start)
+
+        print("N=%d engine=%s found=%s" % (n, engine, car_list is not None))
+        print("  %-12s %10s %10s" % ("phase", "seconds", "bfs calls"))
+        for phase, seconds in stats.phase_times.items():
+            print("  %-12s %10.4f %10d" % (phase, seconds, stats.bfs_calls[phase]))
+        print("  vertices scanned %d, edges scanned %d, augmenting paths %d, graph bytes %d"
+              % (stats.vertices_scanned, stats.edges_scanned, stats.augmenting_paths, stats.peak_graph_bytes))
+        print("  allocate %.4f s, with stats %.4f s" % (plain, best))
+
+
+def revision():
+    '''
+    Function description:
+
+    This function returns the git commit of getaway.py, or None outside of git.
+    '''
+    import os
+    import subprocess
+
+    try:
+        directory = os.path.dirname(os.path.abspath(getaway.__file__))
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=directory,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def suite_run(preferences, licenses, engine):
+    '''
+    Function description:
+
+    This function returns the result of one run of the suite.
+
+    Approach description:
+
+    The wall time is the best of 3 runs without stats and without tracemalloc (only 1 run if it takes
+    more than a second), then the trip is solved again with AllocationStats and tracemalloc
+    for the BFS calls and the peak memory.
+    '''
+    seconds = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        car_list = getaway.allocate(preferences, licenses, engine=engine)
+        seconds = min(seconds, time.perf_counter() - start)
+        if seconds > 1.0:
+            break
+
+    tracemalloc.start()
+    stats = getaway.allocate_with_stats(preferences, licenses, engine=engine)[1]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "seconds": seconds,
+        "found": car_list is not None,
+        "bfs_calls": sum(stats.bfs_calls.values()),
+        "augmenting_paths": stats.augmenting_paths,
+        "peak_bytes": peak,
+        "phase_times": stats.phase_times,
+    }
+
+
+def bench_suite(sizes, kinds, engines, budget, output, seed=0):
+    '''
+    Function description:
+
+    This function runs every engine on every kind of trip and every size, prints the results
+    and writes them to the JSON file output.
+
+    An engine is not run on the larger sizes of a kind once a run took more than budget seconds,
+    those runs are written with "skipped": true.
+    '''
+    results = []
+    print("%-10s %-10s %8s %10s %6s %10s %14s" % ("kind", "engine", "N", "seconds", "found", "bfs calls", "peak bytes"))
+    for kind in kinds:
+        slow = set()
+        for n in sizes:
+            preferences, licenses = make_trip(n, seed, kind)
+            for engine in engines:
+                result = {"kind": kind, "engine": engine, "n": n}
+                if engine in slow:
+                    result["skipped"] = True
+                    results.append(result)
+                    continue
+                result.update(suite_run(preferences, licenses, engine))
+                results.append(result)
+                if result["seconds"] > budget:
+                    slow.add(engine)
+                print("%-10s %-10s %8d %10.4f %6s %10d %14d" % (kind, engine, n, result["seconds"], result["found"],
+                                                                 result["bfs_calls"], result["peak_bytes"]))
+            del preferences, licenses
+
+    report = {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "budget": budget,
+        "results": results,
+    }
+    with open(output, "w") as file:
+        json.dump(report, file, indent=1)
+    print("written to %s" % output)
+
+
+def bench_compare(old_path, new_path, threshold, min_seconds=0.001):
+    '''
+    Function description:
+
+    This function prints the time and memory of the new results over the old ones,
+    for every run which is in both files. A run which is slower than threshold is marked,
+    unless it is slower by less than min_seconds (the noise of the tiny runs).
+
+    :Output, return: the number of marked runs
+    '''
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+
+    old_results = {}
+    for result in old["results"]:
+        if not result.get("skipped"):
+            old_results[(result["kind"], result["engine"], result["n"])] = result
+
+    print("%s -> %s" % (old.get("revision"), new.get("revision")))
+    print("%-10s %-10s %8s %10s %10s %8s %8s" % ("kind", "engine", "N", "old s", "new s", "time", "memory"))
+    regressions = 0
+    for result in new["results"]:
+        key = (result["kind"], result["engine"], result["n"])
+        if result.get("skipped") or key not in old_results:
+            continue
+        before = old_results[key]
+        time_ratio = result["seconds"] / max(before["seconds"], 1e-9)
+        memory_ratio = result["peak_bytes"] / max(before["peak_bytes"], 1)
+        mark = ""
+        if time_ratio > threshold and result["seconds"] - before["seconds"] > min_seconds:
+            mark = "  slower"
+            regressions += 1
+        if result["found"] != before["found"]:
+            mark += "  found %s -> %s" % (before["found"], result["found"])
+        print("%-10s %-10s %8d %10.4f %10.4f %7.2fx %7.2fx%s" % (key + (before["seconds"], result["seconds"],
+                                                                          time_ratio, memory_ratio, mark)))
+    return regressions
+
+
+def valid_allocation(preferences, licenses, car_list):
+    '''
+    Function description:
+
+    This function returns None if car_list is a valid allocation of the trip, or the reason why not.
+    '''
+    n = len(preferences)
+    licensed = set(licenses)
+    if len(car_list) != -(-n // 5):
+        return "%d cars instead of %d" % (len(car_list), -(-n // 5))
+    seen = set()
+    for j, car in enumerate(car_list):
+        if len(car) > 5:
+            return "car %d has %d people" % (j, len(car))
+        if sum(1 for person in car if person in licensed) < 2:
+            return "car %d has less than 2 drivers" % j
+        for person in car:
+            if person in seen:
+                return "person %d is in 2 cars" % person
+            if j not in preferences[person]:
+                return "person %d does not prefer car %d" % (person, j)
+            seen.add(person)
+    if len(seen) != n:
+        return "%d people are not allocated" % (n - len(seen))
+    return None
+
+
+def random_small_trip(rng):
+    '''
+    Function description:
+
+    This function returns a random trip of 1 to 15 people, most of them are infeasible or tight.
+    '''
+    n = rng.randint(1, 15)
+    car_max = -(-n // 5)
+    preferences = [rng.sample(range(car_max), rng.randint(1, car_max)) for _ in range(n)]
+    licenses = sorted(rng.sample(range(n), rng.randint(0, n)))
+    return preferences, licenses
+
+
+def bench_crosscheck(trips, sizes, seed=0):
+    '''
+    Function description:
+
+    This function runs every engine on random small trips and on every kind of trip of every size,
+    and checks that the engines agree with "dinic" on whether there is an allocation
+    and that every car list is valid. "phased" can miss an allocation, which is counted but not an error.
+
+    :Output, return: the number of errors
+    '''
+    rng = random.Random(seed)
+    cases = [random_small_trip(rng) for _ in range(trips)]
+    for n in sizes:
+        for kind in TRIP_KINDS:
+            cases.append(make_trip(n, seed, kind))
+
+    errors = 0
+    misses = dict.fromkeys(getaway.ENGINES, 0)
+    for preferences, licenses in cases:
+        expected = getaway.allocate(preferences, licenses, engine="dinic") is not None
+        for engine in getaway.ENGINES:
+            car_list = getaway.allocate(preferences, licenses, engine=engine)
+            if car_list is None:
+                if expected:
+                    misses[engine] += 1
+                    if engine != "phased":
+                        errors += 1
+                        print("%s found no allocation, N=%d" % (engine, len(preferences)))
+                continue
+            reason = valid_allocation(preferences, licenses, car_list)
+            if reason is not None or not expected:
+                errors += 1
+                print("%s: %s, N=%d" % (engine, reason or "dinic found no allocation", len(preferences)))
+
+    print("%d trips, %d errors" % (len(cases), errors))
+    for engine in getaway.ENGINES:
+        print("  %-10s missed %d" % (engine, misses[engine]))
+    return errors
+
+
+def bench_components(sizes, kind, workers):
+    '''
+    Function description:
+
+    This function prints the number of components and the time of every engine with and without components.
+    '''
+    print("%-10s %8s %10s %10s %12s %12s" % ("engine", "N", "components", "whole s", "components s", "%d processes s" % workers))
+    for n in sizes:
+        preferences, licenses = make_trip(n, 0, kind)
+        count = len(getaway.find_components(preferences, -(-n // 5)))
+        for engine in ("bipartite", "dinic"):
+            whole = allocate_time(preferences, licenses, repeat=1, engine=engine)[0]
+            split = allocate_time(preferences, licenses, repeat=1, engine=engine, components=True)[0]
+            pooled = allocate_time(preferences, licenses, repeat=1, engine=engine, components=True,
+                                   workers=workers, pool="process")[0]
+            print("%-10s %8d %10d %10.4f %12.4f %12.4f" % (engine, n, count, whole, split, pooled))
+
+
+def bench_service(requests, distinct, concurrency, timeout, size):
+    '''
+    Function description:
+
+    This function sends a burst of requests for a few distinct trips to an AllocationService,
+    while a ticker task measures the longest time the event loop did not run.
+    '''
+    import asyncio
+
+    trips = [make_trip(size, seed) for seed in range(distinct)]
+
+    async def burst():
+        longest = 0.0
+        running = True
+
+        async def ticker():
+            nonlocal longest
+            last = time.perf_counter()
+            while running:
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                longest = max(longest, now - last)
+                last = now
+
+        async with getaway.AllocationService(max_concurrency=concurrency) as service:
+            task = asyncio.ensure_future(ticker())
+            start = time.perf_counter()
+            results = await asyncio.gather(*[service.allocate(*trips[k % distinct], timeout=timeout)
+                                             for k in range(requests)], return_exceptions=True)
+            seconds = time.perf_counter() - start
+            running = False
+            await task
+
+        failed = sum(1 for result in results if isinstance(result, BaseException))
+        print("%d requests, %d trips: %d solves, %d coalesced, %d timeouts, %d failed" % (
+            service.requests, distinct, service.solves, service.coalesced, service.timeouts, failed))
+        print("%.3f s, the event loop was blocked at most %.1f ms" % (seconds, longest * 1000))
+
+    asyncio.run(burst())
+
+
+def bench_anytime(sizes, kind, seconds):
+    '''
+    Function description:
+
+    This function prints the progress of AnytimeAllocator after every slice, and checks the car list at the end.
+    '''
+    for n in sizes:
+        preferences, licenses = make_trip(n, 0, kind)
+        whole = allocate_time(preferences, licenses, repeat=1, engine="bipartite")[0]
+        print("N = %d (%s), allocate %.3f s" % (n, kind, whole))
+        print("%8s %10s %12s %12s" % ("slice", "seconds", "stage", "unallocated"))
+
+        start = time.perf_counter()
+        allocator = getaway.AnytimeAllocator(preferences, licenses)
+        status = "partial"
+        runs = 0
+        while status == "partial":
+            car_list, unallocated, status = allocator.run(seconds=seconds)
+            runs += 1
+            print("%8d %10.3f %12s %12d" % (runs, time.perf_counter() - start, allocator.stage, len(unallocated)))
+        problem = valid_allocation(preferences, licenses, car_list) if status == "feasible" else None
+        print("status %s%s" % (status, ", " + problem if problem else ""))
+
+
+def bench_snapshot(sizes, kind):
+    '''
+    Function description:
+
+    This function solves every trip with the "phased" engine and a snapshot, and then loads the snapshot
+    and reads the car list from it.
+    '''
+    import os
+    import tempfile
+
+    print("%8s %10s %10s %12s %12s" % ("N", "solve s", "load s", "car_list s", "MB"))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "network.bin")
+        for n in sizes:
+            preferences, licenses = make_trip(n, 0, kind)
+            start = time.perf_counter()
+            getaway.allocate_phased(preferences, licenses, "compact", snapshot=path)
+            solve = time.perf_counter() - start
+
+            start = time.perf_counter()
+            network = getaway.load_network(path)
+            load = time.perf_counter() - start
+            start = time.perf_counter()
+            network.car_list()
+            read = time.perf_counter() - start
+
+            print("%8d %10.4f %10.4f %12.4f %12.1f" % (n, solve, load, read, os.path.getsize(path) / 1e6))
+            del network
+
+
+def rank_sum(preferences, car_list):
+    '''
+    Function description:
+
+    This function returns the sum of the rank of the car of every person in the list of their preferences.
+    '''
+    return sum(preferences[person].index(car) for car, people in enumerate(car_list) for person in people)
+
+
+def bench_ranked(sizes, kind, slowdown):
+    '''
+    Function description:
+
+    This function solves every trip with the "bipartite" engine, the "ranked" engine and the "ranked" engine with a
+    bound on the slowdown, and checks every car list.
+    '''
+    print("%8s %-22s %10s %10s" % ("N", "engine", "seconds", "rank sum"))
+    for n in sizes:
+        preferences, licenses = make_trip(n, 0, kind)
+        runs = [("bipartite", getaway.allocate_bipartite, {}),
+                ("ranked", getaway.allocate_ranked, {}),
+                ("ranked (max %gx)" % slowdown, getaway.allocate_ranked, {"max_slowdown": slowdown})]
+        for name, engine, options in runs:
+            start = time.perf_counter()
+            car_list = engine(preferences, licenses, **options)
+            seconds = time.perf_counter() - start
+            if car_list is None:
+                print("%8d %-22s %10.3f %10s" % (n, name, seconds, "-"))
+                continue
+            problem = valid_allocation(preferences, licenses, car_list)
+            print("%8d %-22s %10.3f %10d%s" % (n, name, seconds, rank_sum(preferences, car_list),
+                                               "  " + problem if problem else ""))
+
+
+def kernel_backends():
+    '''
+    Function description:
+
+    This function returns the backends of bench_kernel, "compact", the "kernel" backend with
+    the interpreted _getaway_kernel.py, and with the extension of mypyc if it is the one which is imported.
+    '''
+    import importlib.util
+    import os
+
+    import _getaway_kernel
+
+    path = os.path.join(os.path.dirname(os.path.abspath(getaway.__file__)), "_getaway_kernel.py")
+    spec = importlib.util.spec_from_file_location("_getaway_kernel_interpreted", path)
+    interpreted = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(interpreted)
+
+    backends = {
+        "compact": getaway.CompactFlowNetwork,
+        "interpreted": type("InterpretedKernelFlowNetwork", (getaway.KernelFlowNetwork,), {"kernel": interpreted}),
+    }
+    if _getaway_kernel.COMPILED:
+        backends["compiled"] = type("CompiledKernelFlowNetwork", (getaway.KernelFlowNetwork,),
+                                    {"kernel": _getaway_kernel})
+    return backends
+
+
+def bench_kernel(sizes, kind, trips, seed=0):
+    '''
+    Function description:
+
+    This function checks that every backend of kernel_backends gives the same car list with the "phased" engine,
+    on random small trips and on a trip of every size, and prints the time of every backend on the trips of the sizes.
+
+    :Output, return: the number of trips where a car list is not the same
+    '''
+    backends = kernel_backends()
+    if "compiled" not in backends:
+        print("_getaway_kernel is not compiled (mypyc _getaway_kernel.py), only the interpreted kernel is checked")
+    for name, network_class in backends.items():
+        getaway.NETWORK_BACKENDS["bench " + name] = network_class
+
+    try:
+        rng = random.Random(seed)
+        errors = 0
+        for _ in range(trips):
+            preferences, licenses = random_small_trip(rng)
+            results = [getaway.allocate_phased(preferences, licenses, "bench " + name) for name in backends]
+            if any(result != results[0] for result in results):
+                errors += 1
+                print("not the same car list, N=%d" % len(preferences))
+        print("%d random trips, %d errors" % (trips, errors))
+
+        print("%8s %-12s %10s %8s" % ("N", "backend", "seconds", "speedup"))
+        for n in sizes:
+            preferences, licenses = make_trip(n, seed, kind)
+            results = []
+            compact = None
+            for name in backends:
+                best = float("inf")
+                for _ in range(3 if n < 1000000 else 1):
+                    start = time.perf_counter()
+                    result = getaway.allocate_phased(preferences, licenses, "bench " + name)
+                    best = min(best, time.perf_counter() - start)
+                results.append(result)
+                compact = compact or best
+                print("%8d %-12s %10.4f %7.2fx" % (n, name, best, compact / best))
+            if any(result != results[0] for result in results):
+                errors += 1
+                print("not the same car list, N=%d" % n)
+    finally:
+        for name in backends:
+            del getaway.NETWORK_BACKENDS["bench " + name]
+    return errors
+
+
+def fleet_trips(n, count, kind, seats):
+    '''
+    Function description:
+
+    This function returns count trips of n people and the inventory of their destinations, with seats times
+    the seats that the trips can take (5 per car of every trip) at every destination on average,
+    from 0.75 to 1.25 times of it, so some destinations are short and others have spare seats.
+    '''
+    trips = [make_trip(n, seed, kind) for seed in range(count)]
+    car_max = -(-n // 5)
+    rng = random.Random(count)
+    inventory = [int(seats * 5 * count * rng.uniform(0.75, 1.25)) for _ in range(car_max)]
+    return trips, inventory
+
+
+def reconcile_serially(trips, inventory):
+    '''
+    Function description:
+
+    This function is the baseline of bench_fleet, it solves every trip alone with allocate,
+    and then takes the trips in order while their cars fit in the seats which are left.
+    A trip which does not fit is solved again alone with the seats which are left, in a FleetNetwork.
+    '''
+    results = [getaway.allocate(preferences, licenses) for preferences, licenses in trips]
+    remaining = list(inventory)
+    for t in range(len(trips)):
+        car_list = results[t]
+        if car_list is None:
+            continue
+        if any(len(car_list[j]) > remaining[j] for j in range(len(car_list))):
+            network = getaway.FleetNetwork(remaining)
+            network.add_trip(*trips[t])
+            network.solve()
+            car_list = results[t] = network.car_list(0) if network.served(0) else None
+            if car_list is None:
+                continue
+        for j in range(len(car_list)):
+            remaining[j] -= len(car_list[j])
+    return results
+
+
+def bench_fleet(sizes, kind, count, seats, max_edges):
+    '''
+    Function description:
+
+    This function schedules the trips of fleet_trips with getaway.schedule_trips and with reconcile_serially,
+    checks every car list and the seats, and prints the time and the number of trips which were allocated.
+
+    :Output, return: the number of errors
+    '''
+    errors = 0
+    print("%8s %6s %-12s %10s %10s %10s" % ("N", "trips", "scheduler", "seconds", "allocated", "trips/s"))
+    for n in sizes:
+        trips, inventory = fleet_trips(n, count, kind, seats)
+        runs = [("joint", lambda: getaway.schedule_trips(trips, inventory, max_edges=max_edges)),
+                ("serial", lambda: reconcile_serially(trips, inventory))]
+        for name, run in runs:
+            start = time.perf_counter()
+            results = run()
+            seconds = time.perf_counter() - start
+
+            used = [0] * len(inventory)
+            for (preferences, licenses), car_list in zip(trips, results):
+                if car_list is None:
+                    continue
+                problem = valid_allocation(preferences, licenses, car_list)
+                if problem is not None:
+                    errors += 1
+                    print("%s: %s" % (name, problem))
+                for j in range(len(car_list)):
+                    used[j] += len(car_list[j])
+            if any(used[j] > inventory[j] for j in range(len(inventory))):
+                errors += 1
+                print("%s: more people than seats" % name)
+
+            allocated = sum(car_list is not None for car_list in results)
+            print("%8d %6d %-12s %10.3f %10d %10.1f" % (n, count, name, seconds, allocated, count / seconds))
+    return errors
+
+
+def bench_startup(sizes, runs):
+    '''
+    Function description:
+
+    This function runs R new Python processes for every command, and prints the best and the median wall time
+    from the start of the process to its exit, and the time of the first allocate of a new process
+    with "auto" (see getaway.choose_engine) and "bipartite".
+    '''
+    import os
+    import statistics
+    import subprocess
+    import sys
+
+    directory = os.path.dirname(os.path.abspath(getaway.__file__))
+
+    def wall(command, trip, env=None):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, input=trip, stdout=subprocess.DEVNULL, check=False, cwd=directory, env=env)
+            times.append(time.perf_counter() - start)
+        return min(times), statistics.median(times)
+
+    print("%8s %-34s %10s %10s" % ("N", "command", "best ms", "median ms"))
+    for n in sizes:
+        preferences, licenses = make_trip(n, 0, "mixed")
+        trip = json.dumps({"preferences": preferences, "licenses": licenses}).encode()
+        solve = ("import getaway, json, sys; trip = json.load(sys.stdin); "
+                 "json.dump(getaway.allocate(trip['preferences'], trip['licenses'], engine='%s', backend='object'), sys.stdout)")
+        commands = [
+            ("python -c pass", [sys.executable, "-c", "pass"]),
+            ("import getaway", [sys.executable, "-c", "import getaway"]),
+            ("python -m getaway", [sys.executable, "-m", "getaway"]),
+            ("python -S -m getaway", [sys.executable, "-S", "-m", "getaway"]),
+            ("allocate, bipartite", [sys.executable, "-c", solve % "bipartite"]),
+            ("allocate, phased object", [sys.executable, "-c", solve % "phased"]),
+        ]
+        for name, command in commands:
+            best, median = wall(command, trip)
+            print("%8d %-34s %10.1f %10.1f" % (n, name, best * 1e3, median * 1e3))
+
+        # a worker whose files are read-only and were not compiled, every start compiles getaway.py
+        import tempfile
+        with tempfile.TemporaryDirectory() as prefix:
+            env = dict(os.environ, PYTHONPYCACHEPREFIX=prefix, PYTHONDONTWRITEBYTECODE="1")
+            best, median = wall([sys.executable, "-m", "getaway"], trip, env)
+        print("%8d %-34s %10.1f %10.1f" % (n, "python -m getaway, without .pyc", best * 1e3, median * 1e3))
+
+        # the first call of a new process
+        for engine in ("auto", "bipartite"):
+            first = ("import time, getaway, benchmark; p, l = benchmark.make_trip(%d, 0, 'mixed'); "
+                     "start = time.perf_counter(); getaway.allocate(p, l, engine='%s'); "
+                     "print(time.perf_counter() - start)" % (n, engine))
+            times = []
+            for _ in range(runs):
+                result = subprocess.run([sys.executable, "-c", first], capture_output=True, check=True, cwd=directory)
+                times.append(float(result.stdout))
+            print("%8d %-34s %10.3f %10.3f" % (n, "first allocate, " + engine, min(times) * 1e3, statistics.median(times) * 1e3))
+
+
+
+
+def bench_spill(sizes, kind, budget):
+    '''
+    Function description:
+
+    This function saves a trip of every size with getaway.save_trip, and solves it with the "phased" engine
+    in a new process for the "compact", "kernel" and "spill" backends (with a budget of B MB), so the peak
+    memory of a process (VmHWM of Linux) is the one of the trip and of its network only. It checks that every backend
+    gives the same car list as "compact".
+    '''
+    import os
+    import subprocess
+    import sys
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(getaway.__file__))
+    solve = ("import hashlib, json, sys, time, getaway; getaway.SPILL_BUDGET = %d; "
+             "p, l = getaway.load_trip(sys.argv[1]); start = time.perf_counter(); "
+             "car_list = getaway.allocate_phased(p, l, backend=sys.argv[2]); seconds = time.perf_counter() - start; "
+             "peak = [line for line in open('/proc/self/status') if line.startswith('VmHWM')][0].split()[1]; "
+             "print(json.dumps([seconds, int(peak), car_list is not None, "
+             "hashlib.sha1(json.dumps(car_list).encode()).hexdigest()]))" % (budget << 20))
+
+    errors = 0
+    print("%8s %-8s %10s %10s %6s %6s" % ("N", "backend", "seconds", "peak MB", "found", "same"))
+    with tempfile.TemporaryDirectory() as temporary:
+        path = os.path.join(temporary, "trip.bin")
+        for n in sizes:
+            preferences, licenses = make_trip(n, 0, kind)
+            getaway.save_trip(path, preferences, licenses)
+            del preferences, licenses
+
+            expected = None
+            for backend in ("compact", "kernel", "spill"):
+                result = subprocess.run([sys.executable, "-c", solve, path, backend], capture_output=True,
+                                        check=True, cwd=directory, text=True)
+                seconds, peak, found, digest = json.loads(result.stdout)
+                if expected is None:
+                    expected = digest
+                same = digest == expected
+                errors += not same
+                # VmHWM is in KB
+                print("%8d %-8s %10.2f %10.1f %6s %6s" % (n, backend, seconds, peak / 1024, found, same))
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="getaway benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backends = commands.add_parser("backends", help="compare the flow network backends")
+    backends.add_argument("--kind", default="mixed", choices=list(TRIP_KINDS))
+    backends.add_argument("sizes", nargs="*", type=int, default=[100, 1000, 5000])
+
+    engines = commands.add_parser("engines", help="compare the max-flow engines")
+    engines.add_argument("sizes", nargs="*", type=int, default=[100, 1000, 5000])
+
+    bfs = commands.add_parser("bfs", help="time per BFS call")
+    bfs.add_argument("sizes", nargs="*", type=int, default=[100, 1000, 10000])
+
+    batch = commands.add_parser("batch", help="throughput of allocate_many")
+    batch.add_argument("--jobs", type=int, default=2000)
+    batch.add_argument("--size", type=int, default=50)
+    batch.add_argument("workers", nargs="*", type=int, default=[1, 2, 4])
+
+    incremental = commands.add_parser("incremental", help="latency of a single edit")
+    incremental.add_argument("sizes", nargs="*", type=int, default=[1000, 10000, 50000])
+
+    ingest = commands.add_parser("ingest", help="peak memory of reading a trip")
+    ingest.add_argument("sizes", nargs="*", type=int, default=[10000, 100000])
+
+    profile = commands.add_parser("profile", help="AllocationStats of every phase")
+    profile.add_argument("--engine", default="bipartite", choices=sorted(getaway.ENGINES))
+    profile.add_argument("sizes", nargs="*", type=int, default=[1000, 10000])
+
+    suite = commands.add_parser("suite", help="sweep every kind of trip and every engine, and write JSON")
+    suite.add_argument("--kinds", nargs="+", default=list(TRIP_KINDS), choices=list(TRIP_KINDS))
+    suite.add_argument("--engines", nargs="+", default=list(getaway.ENGINES), choices=list(getaway.ENGINES))
+    suite.add_argument("--budget", type=float, default=60.0, help="seconds of a run before the larger sizes are skipped")
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--output", default="benchmark.json")
+    suite.add_argument("sizes", nargs="*", type=int, default=[10, 100, 1000, 10000, 100000, 1000000])
+
+    compare = commands.add_parser("compare", help="compare two JSON files of suite")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=1.2, help="time ratio which is marked as slower")
+    compare.add_argument("--min-seconds", type=float, default=0.001, help="smaller differences are not marked")
+
+    crosscheck = commands.add_parser("crosscheck", help="check every engine against dinic")
+    crosscheck.add_argument("--trips", type=int, default=2000, help="number of random small trips")
+    crosscheck.add_argument("--seed", type=int, default=0)
+    crosscheck.add_argument("sizes", nargs="*", type=int, default=[100, 1000, 5000])
+
+    components = commands.add_parser("components", help="allocate with and without components")
+    components.add_argument("--kind", default="clustered", choices=list(TRIP_KINDS))
+    components.add_argument("--workers", type=int, default=2)
+    components.add_argument("sizes", nargs="*", type=int, default=[10000, 100000])
+
+    service = commands.add_parser("service", help="burst of requests to AllocationService")
+    service.add_argument("--requests", type=int, default=200)
+    service.add_argument("--distinct", type=int, default=5)
+    service.add_argument("--concurrency", type=int, default=2)
+    service.add_argument("--timeout", type=float, default=None)
+    service.add_argument("--size", type=int, default=5000)
+
+    anytime = commands.add_parser("anytime", help="AnytimeAllocator in slices")
+    anytime.add_argument("--kind", default="mixed", choices=list(TRIP_KINDS))
+    anytime.add_argument("--slice", type=float, default=0.1, help="seconds of every run")
+    anytime.add_argument("sizes", nargs="*", type=int, default=[10000, 100000])
+
+    snapshot = commands.add_parser("snapshot", help="solve against load_network")
+    snapshot.add_argument("--kind", default="single", choices=list(TRIP_KINDS))
+    snapshot.add_argument("sizes", nargs="*", type=int, default=[10000, 100000])
+
+    ranked = commands.add_parser("ranked", help="rank sum of the ranked engine")
+    ranked.add_argument("--kind", default="mixed", choices=list(TRIP_KINDS))
+    ranked.add_argument("--slowdown", type=float, default=3.0, help="max_slowdown of the bounded run")
+    ranked.add_argument("sizes", nargs="*", type=int, default=[1000, 10000])
+
+    kernel = commands.add_parser("kernel", help="parity and time of the kernel backend")
+    kernel.add_argument("--kind", default="single", choices=list(TRIP_KINDS))
+    kernel.add_argument("--trips", type=int, default=1000)
+    kernel.add_argument("sizes", nargs="*", type=int, default=[10000, 100000, 1000000])
+
+    fleet = commands.add_parser("fleet", help="schedule_trips against solving every trip alone")
+    fleet.add_argument("--kind", default="single", choices=list(TRIP_KINDS))
+    fleet.add_argument("--trips", type=int, default=20)
+    fleet.add_argument("--seats", type=float, default=0.8, help="the seats as a multiple of the seats the trips can take")
+    fleet.add_argument("--max-edges", type=int, default=2000000)
+    fleet.add_argument("sizes", nargs="*", type=int, default=[1000, 10000])
+
+    startup = commands.add_parser("startup", help="cold start to the first car list")
+    startup.add_argument("--runs", type=int, default=20)
+    startup.add_argument("sizes", nargs="*", type=int, default=[10, 30, 1000])
+
+    spill = commands.add_parser("spill", help="peak memory of the spill backend")
+    spill.add_argument("--kind", default="mixed", choices=list(TRIP_KINDS))
+    spill.add_argument("--budget", type=int, default=16, help="the SPILL_BUDGET of the spill backend in MB")
+    spill.add_argument("sizes", nargs="*", type=int, default=[100000, 1000000])
+
+    args = parser.parse_args()
+    if args.command == "backends":
+        bench_backends(args.sizes, args.kind)
+    elif args.command == "engines":
+        bench_engines(args.sizes)
+    elif args.command == "bfs":
+        bench_bfs(args.sizes)
+    elif args.command == "batch":
+        bench_batch(args.jobs, args.size, args.workers)
+    elif args.command == "incremental":
+        bench_incremental(args.sizes)
+    elif args.command == "ingest":
+        bench_ingest(args.sizes)
+    elif args.command == "profile":
+        bench_profile(args.sizes, args.engine)
+    elif args.command == "suite":
+        bench_suite(args.sizes, args.kinds, args.engines, args.budget, args.output, args.seed)
+    elif args.command == "compare":
+        if bench_compare(args.old, args.new, args.threshold, args.min_seconds):
+            raise SystemExit(1)
+    elif args.command == "components":
+        bench_components(args.sizes, args.kind, args.workers)
+    elif args.command == "service":
+        bench_service(args.requests, args.distinct, args.concurrency, args.timeout, args.size)
+    elif args.command == "anytime":
+        bench_anytime(args.sizes, args.kind, args.slice)
+    elif args.command == "snapshot":
+        bench_snapshot(args.sizes, args.kind)
+    elif args.command == "ranked":
+        bench_ranked(args.sizes, args.kind, args.slowdown)
+    elif args.command == "kernel":
+        if bench_kernel(args.sizes, args.kind, args.trips):
+            raise SystemExit(1)
+    elif args.command == "fleet":
+        if bench_fleet(args.sizes, args.kind, args.trips, args.seats, args.max_edges):
+            raise SystemExit(1)
+    elif args.command == "startup":
+        bench_startup(args.sizes, args.runs)
+    elif args.command == "spill":
+        if bench_spill(args.sizes, args.kind, args.budget):
+            raise SystemExit(1)
+    elif args.command == "crosscheck":
+        if bench_crosscheck(args.trips, args.sizes, args.seed):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
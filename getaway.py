@@ -2,8 +2,12 @@ __author__ = "June Jin"
 __version__ = "10.18.3 [Done]"
 
 import math
+import time
+from array import array
+from collections import deque
 
-def allocate(preferences, licenses):
+def allocate(preferences, licenses, engine="auto", backend="auto", cache=None, stats=None, strict=False,
+             components=False, workers=None, pool="thread", deadline=None, snapshot=None, max_slowdown=None):
     '''
     Function description:
 
@@ -13,7 +17,286 @@ def allocate(preferences, licenses):
     This function will allocate the people to the car with the given preferences and licenses list.
     And, it will return at which car the people are allocated.
 
-    If there is no allocation, it will return None.
+    If there is no allocation, it will return None (or raise InfeasibleTrip with strict=True).
+
+    Approach description:
+
+    The trip is checked first in linear time (see check_trip), so an obviously infeasible trip
+    does not build the flow network.
+    Then the allocation is done by one of the max-flow engines in ENGINES.
+
+    "auto" (default): the engine of choose_engine, "tiny" up to TINY_TRIP people and "bipartite" above.
+    "bipartite": a Hopcroft-Karp b-matching of the people to 2 driver seats and 3 open seats per car,
+                 without a flow network (see allocate_bipartite).
+    "dinic": one max-flow with residual edges and a lower bound of 2 drivers per car,
+             solved with Dinic's algorithm (see allocate_dinic).
+    "phased": the augmenting path in 3 phases, drivers with 1 destination, drivers with more
+              than 1 destination and then the passengers (see allocate_phased).
+              It can not undo a bad choice, so it can return None for a possible allocation.
+    "scipy": the same flow network as "dinic", made with NumPy and solved by SciPy (see allocate_scipy).
+             It is "dinic" when SciPy is not installed.
+    "ranked": the allocation with the smallest sum of the ranks of the cars in the preferences,
+              a min-cost max-flow (see allocate_ranked).
+    "tiny": the b-matching of "bipartite" with a simple augmenting path, for a trip of a few people (see allocate_tiny).
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+                       It can also be a PreferenceArrays, which is returned by load_trip.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: engine : the name of the max-flow engine, or "auto" (default).
+        argv4: backend : the name of the flow network backend for the "phased" engine, or "auto" (default, see choose_backend).
+                         "numpy" builds the network with NumPy, when it is installed (see NumpyFlowNetwork).
+                         "lazy" only makes the edges of a person when they are needed (see LazyFlowNetwork).
+                         "kernel" runs the inner loops in _getaway_kernel, compiled by mypyc if it is built (see KernelFlowNetwork).
+                         "spill" keeps the arrays in memory-mapped files, with about SPILL_BUDGET bytes in memory (see SpillFlowNetwork).
+                         The budget only bounds the edges and the state of the BFS of the flow network, the preferences,
+                         the car list and the flags of the people stay in memory. The other engines never spill.
+        argv5: cache : a SolveCache, the trips which were solved before (in any order of the people) are not solved again.
+        argv6: stats : an AllocationStats, which is filled with the counters and the time of every phase.
+                       Nothing is counted without it. (see allocate_with_stats)
+                       The reason of an infeasible trip is kept in stats.infeasible.
+        argv7: strict : raise InfeasibleTrip with the failed constraint instead of returning None.
+                        A destination which is not a car is always raised.
+        argv8: components : solve every connected component of the trip on its own (see allocate_components),
+                            not for the "phased" engine.
+        argv9: workers, pool : the pool of allocate_components, the components are solved in this thread by default.
+        argv10: deadline : a time.monotonic() value, AllocationTimeout is raised at the first phase
+                           (of augmenting paths) which starts after it. (see AllocationService)
+        argv11: snapshot : the path of the snapshot of the flow network, only for the "phased" engine
+                           (see save_network and load_network).
+        argv12: max_slowdown : only for the "ranked" engine without components, the time of the ranked allocation
+                               as a multiple of the time of "bipartite", whose allocation is returned if the ranked one
+                               is not done by then (see allocate_ranked). None (default) waits for the ranked allocation.
+
+    :Output, return: the list of cars, with the index of the drivers who allocated and the index the people who doesnt have license.
+    :Time complexity: O (N * sqrt(N)) with "bipartite" and "dinic", which N is the number of people.
+    :Aux space complexity: O (N), which N is the number of people.
+    '''
+    if engine == "auto":
+        engine = choose_engine(preferences, licenses)
+    if snapshot is not None and (engine != "phased" or cache is not None):
+        raise ValueError("a snapshot needs the phased engine without a cache")
+    if max_slowdown is not None and (engine != "ranked" or components):
+        raise ValueError("max_slowdown needs the ranked engine without components")
+    if cache is not None:
+        # the cache runs allocate again without the cache for a trip which it has not solved, with the same options
+        return cache.allocate(preferences, licenses, engine=engine, backend=backend, stats=stats, strict=strict,
+                              components=components, workers=workers, pool=pool, deadline=deadline,
+                              max_slowdown=max_slowdown)
+    if stats is not None:
+        stats.engine = engine
+        stats.begin("precheck")
+
+    try:
+        try:
+            check_trip(preferences, licenses)
+        except InfeasibleTrip as reason:
+            if stats is not None:
+                stats.infeasible = reason.as_dict()
+            if strict or reason.constraint == "destination":
+                raise
+            return None
+
+        check_deadline(deadline)
+        if components and engine != "phased":
+            car_list = allocate_components(preferences, licenses, engine, workers, pool, stats, deadline)
+        elif engine == "phased":
+            car_list = allocate_phased(preferences, licenses, backend, stats, deadline, snapshot)
+        else:
+            options = {}
+            if stats is not None:
+                options["stats"] = stats
+            if deadline is not None:
+                options["deadline"] = deadline
+            if max_slowdown is not None:
+                options["max_slowdown"] = max_slowdown
+            car_list = ENGINES[engine](preferences, licenses, **options)
+
+        if car_list is None:
+            failure = InfeasibleTrip("flow", None, None, "the %s engine found no allocation" % engine)
+            if stats is not None:
+                stats.infeasible = failure.as_dict()
+            if strict:
+                raise failure
+        return car_list
+    finally:
+        if stats is not None:
+            stats.finish()
+
+def choose_engine(preferences, licenses):
+    '''
+    Function description:
+
+    This function returns the name of the engine of allocate(..., engine="auto") for the trip.
+
+    The network is always person -> car -> sink with 2 driver seats per car, so the bipartite b-matching
+    solves every trip, and it is faster than the generic max-flow ("dinic") at every size
+    (see benchmark.py engines and crosscheck). A trip of at most TINY_TRIP people uses the "tiny" engine,
+    the same b-matching without its setup, which is most of the time of a small trip.
+
+    :Time complexity: O(1)
+    :Aux space complexity: O(1)
+    '''
+    if len(preferences) <= TINY_TRIP:
+        return "tiny"
+    return "bipartite"
+
+def choose_backend(preferences):
+    '''
+    Function description:
+
+    This function returns the name of the flow network backend of allocate(..., backend="auto") for the trip.
+    A backend is only used by the "phased" engine, allocate(..., engine="phased"). The default engine
+    (see choose_engine) does not build a flow network, so this choice does not change its time or its memory.
+
+    Every backend gives the same car list. The "compact" backend is faster than the "object" backend
+    at every size, and the "kernel" backend is faster from about 1000 people, but it imports _getaway_kernel,
+    so it is only used from KERNEL_TRIP people. "numpy" is never chosen, importing NumPy takes longer
+    than building a small trip.
+    The lists of the "kernel" backend take about KERNEL_NETWORK_BYTES for every edge and every vertex,
+    so a trip whose network would be bigger than SPILL_BUDGET uses the "spill" backend, which keeps its arrays
+    in files and about SPILL_BUDGET bytes of them in memory. Only the network is bounded, the preferences,
+    the car list and the flags of the people of allocate_phased are still in memory.
+    The chosen backend is kept in AllocationStats.backend, so a caller can see that a solve used the disk,
+    and a caller which must not use the disk passes the backend (e.g. backend="kernel") instead of "auto".
+
+    :Time complexity: O(1), O(N) from KERNEL_TRIP people for the number of the preferences.
+    :Aux space complexity: O(1)
+    '''
+    if len(preferences) < KERNEL_TRIP:
+        return "compact"
+    if isinstance(preferences, PreferenceArrays):
+        edges = len(preferences.targets)
+    else:
+        edges = sum(map(len, preferences))
+    if KERNEL_NETWORK_BYTES * (edges + len(preferences)) > SPILL_BUDGET:
+        return "spill"
+    return "kernel"
+
+def check_deadline(deadline):
+    '''
+    Function description:
+
+    This function raises AllocationTimeout if the deadline (a time.monotonic() value) has passed.
+    The engines call it between their phases, so a solve which is too late stops at the next phase.
+
+    :Time complexity: O(1)
+    :Aux space complexity: O(1)
+    '''
+    if deadline is not None and time.monotonic() > deadline:
+        raise AllocationTimeout("the deadline of the allocation has passed")
+
+def allocate_with_stats(preferences, licenses, callback=None, **options):
+    '''
+    Function description:
+
+    This function runs allocate with a new AllocationStats, and returns it with the car list.
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: callback : called as callback(event, data) at the end of every phase and of the allocation (see AllocationStats)
+        argv4: options : the other arguments of allocate (engine, backend)
+
+    :Output, return: (car_list, stats)
+
+    :Time complexity: the time of allocate, and O(V + E) to measure the memory of the graph.
+    :Aux space complexity: the space of allocate.
+    '''
+    stats = AllocationStats(callback)
+    car_list = allocate(preferences, licenses, stats=stats, **options)
+    return car_list, stats
+
+def check_trip(preferences, licenses):
+    '''
+    Function description:
+
+    This function raises InfeasibleTrip if the trip has obviously no allocation, without the flow network.
+    It is run by allocate before the engine, so most of the infeasible trips are rejected in linear time.
+    A trip which passes can still have no allocation.
+
+    Approach description:
+
+    Every car j needs 2 drivers and takes at most 5 people, so the checks are counts for every destination:
+
+    Step 1: every person has a destination, and every destination is a car.                 ("preferences", "destination")
+    Step 2: every destination has at least 2 people with a license who prefer it.          ("drivers")
+    Step 3: if only 2 people with a license prefer j, they are the drivers of j, so a person
+            can not be one of only 2 candidates of two destinations (Hall's condition for the pairs). ("drivers")
+    Step 4: the people who must go to j (1 destination, or one of its only 2 candidates) fit in the car,
+            unlicensed + max(2, licensed) <= 5.                                             ("seats")
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+
+    :Output, return: None, or raises InfeasibleTrip with the constraint, the destination and the person which failed.
+
+    :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+    :Aux space complexity: O(N)
+    '''
+    n = len(preferences)
+    car_max = math.ceil(n / 5)
+
+    license = bytearray(n)
+    for person in licenses:
+        license[person] = 1
+
+    # the number of people with a license who prefer j, and the last person who was counted for j
+    candidates = [0] * car_max
+    last_seen = [-1] * car_max
+
+    # the destination which person i must go to, or -1
+    required = [-1] * n
+
+    for i in range(n):
+        pref = preferences[i]
+        if len(pref) == 0:
+            raise InfeasibleTrip("preferences", None, i, "person %d has no destination" % i)
+        for j in pref:
+            if j < 0 or j >= car_max:
+                raise InfeasibleTrip("destination", j, i, "person %d prefers destination %d, but there are only %d cars" % (i, j, car_max))
+            if last_seen[j] != i:
+                last_seen[j] = i
+                candidates[j] += license[i]
+        # a person with 1 destination (it can be repeated) must go there
+        if min(pref) == max(pref):
+            required[i] = pref[0]
+
+    for j in range(car_max):
+        if candidates[j] < 2:
+            raise InfeasibleTrip("drivers", j, None, "destination %d has %d people with a license" % (j, candidates[j]))
+
+    # the only 2 candidates of j must drive j
+    for person in licenses:
+        for j in preferences[person]:
+            if candidates[j] == 2 and required[person] != j:
+                if required[person] != -1:
+                    raise InfeasibleTrip("drivers", j, person, "person %d must drive destination %d and go to destination %d"
+                                         % (person, j, required[person]))
+                required[person] = j
+
+    drivers = [0] * car_max
+    passengers = [0] * car_max
+    for i in range(n):
+        j = required[i]
+        if j != -1:
+            if license[i]:
+                drivers[j] += 1
+            else:
+                passengers[j] += 1
+
+    for j in range(car_max):
+        if passengers[j] + max(2, drivers[j]) > 5:
+            raise InfeasibleTrip("seats", j, None, "destination %d must take %d people with a license and %d without, in 5 seats"
+                                 % (j, drivers[j], passengers[j]))
+
+def allocate_phased(preferences, licenses, backend="object", stats=None, deadline=None, snapshot=None):
+    '''
+    Function description:
+
+    This function is the "phased" engine of allocate.
+    It returns the list of cars, or None if there is no allocation.
 
     Approach description:   
 
@@ -34,568 +317,6428 @@ def allocate(preferences, licenses):
     The second loop "while path" will run until there is no path from source to sink. (ONLY DRIVER who have more than 1 Destination)
     The third loop "while path" will run until there is no path from source to sink. (ONLY PASSENGER who doesnt have license)
 
+    Before every loop, the warm start allocates greedily the same people to the same cars as the loop
+    (see FlowNetwork.warm_start), so the loop only runs 1 BFS to check that there is no path left.
+
     During allocation, we will keep add 1 to the maximum_flow.
     After all the allocation, if the maximum_flow is not equal to the number of people, return None.
 
+    The flow network can be built with different backends (see NETWORK_BACKENDS).
+    "object" is the Vertex/Edge object graph, "compact" is the CompactFlowNetwork
+    which keeps the edges in flat arrays, "lazy" is the object graph which only makes the edges
+    of a person when they are needed (see LazyFlowNetwork), "kernel" is the CompactFlowNetwork
+    whose build, warm start and BFS run in _getaway_kernel (see KernelFlowNetwork), "spill" is the CompactFlowNetwork
+    whose arrays are in memory-mapped files (see SpillFlowNetwork). They give the same car list.
+
     :Input:
         argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
         argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: backend : the name of the flow network backend, "object" by default, or "auto" (see choose_backend).
+        argv4: stats : an AllocationStats or None, the phases are "build", "single", "multiple" and "passengers".
+        argv5: deadline : a time.monotonic() value or None, it is checked before every phase (see check_deadline).
+        argv6: snapshot : the path of the snapshot of the network (see save_network), which is written
+                          after the last phase, or when a car has less than 2 drivers, or None.
 
     :Output, return: the list of cars, with the index of the drivers who allocated and the index the people who doesnt have license.
     :Time complexity: O (N^3), which N is the number of people.
     :Aux space complexity: O (N^2), which N is the number of people.
     '''
 
+    if backend == "auto":
+        backend = choose_backend(preferences)
+    if stats is not None:
+        stats.backend = backend
+        stats.begin("build")
+
     # make the flow network
-    getaway = FlowNetwork(preferences)
+    getaway = NETWORK_BACKENDS[backend](preferences)
+    try:
+        getaway.stats = stats
+        if stats is not None:
+            stats.record_graph(getaway.memory_bytes())
 
-    maximum_flow = 0
+        maximum_flow = 0
 
-    # make the car list with the size of the number of car, it will be the output
-    car_list = [[] for _ in range(getaway.car_max)]
+        # make the car list with the size of the number of car, it will be the output
+        car_list = [[] for _ in range(getaway.car_max)]
 
-    # add edges from source to person who have license
-    for i in range(len(licenses)):
+        # initialize license to True for every driver
+        getaway.license.update(licenses)
 
-        driver = licenses[i]
+        # add edges from source to driver if driver has only 1 preference,
+        # in the order of licenses, which decides the paths of the phases (so it is not license & a Bitset)
+        getaway.add_source_edges([driver for driver in licenses if len(preferences[driver]) == 1])
 
-        # initialize license to True for driver
-        getaway.vertices_list[driver].license = True
+        check_deadline(deadline)
+        if stats is not None:
+            stats.begin("single")
 
-        # add edge from source to driver if driver has only 1 preference
-        person_preference = preferences[driver]
-        
-        if len(person_preference) == 1 and getaway.vertices_list[driver].license:
-            getaway.vertices_list[getaway.source_index].add_edge(Edge(getaway.source_index, driver, 1))
+        # allocate the drivers greedily, then augment until there is no path from source to sink
+        maximum_flow += getaway.warm_start(car_list)
+        maximum_flow += augment_all(getaway, car_list)
+
+        # allocate the rest of the people who have more than 1 preference
+        # only add edge from source to driver if driver has more than 1 preference
+        getaway.add_source_edges([driver for driver in licenses if len(preferences[driver]) > 1])
+
+        check_deadline(deadline)
+        if stats is not None:
+            stats.begin("multiple")
+
+        # checking if the car is full of driver
+        # update the capacity with comparing the flow, max(2, edge.f)
+        getaway.freeze_car_capacity(2)
+
+        # augment with updated capacity
+        maximum_flow += getaway.warm_start(car_list)
+        maximum_flow += augment_all(getaway, car_list)
+
+        # check every driver is allocated with enough number of people in the car
+        for i in range(getaway.car_max):
+            if len(car_list[i]) < 2:
+                if snapshot is not None:
+                    save_network(snapshot, getaway)
+                return None
+
+        check_deadline(deadline)
+        if stats is not None:
+            stats.begin("passengers")
+
+        # before allocating the rest of the people who doesnt have license, update the capacity
+        getaway.set_car_capacity(5)
+
+        # now, we have to allocate the rest of people who doesnt have license
+        # make edges from source to person who doesnt have license, the people who are not in the license Bitset
+        getaway.add_source_edges(list(~getaway.license))
+
+        # edmonds karp algorithm (shortest path)
+        maximum_flow += getaway.warm_start(car_list)
+        maximum_flow += augment_all(getaway, car_list)
+
+        if stats is not None:
+            stats.record_graph(getaway.memory_bytes())
+
+        if snapshot is not None:
+            save_network(snapshot, getaway)
+
+        # check every driver is allocated with enough number of people in the car
+        if maximum_flow != getaway.og_vertices:
+            return None
+        else:
+            return car_list
+    finally:
+        # close the files of the "spill" backend now, the other backends have nothing to close
+        close = getattr(getaway, "close", None)
+        if close is not None:
+            close()
+
+def augment_all(getaway, car_list):
+    '''
+    Function description:
+
+    This function keeps augmenting the flow network until there is no path from source to sink.
+    Every person who is allocated on the way is appended to the car list.
+
+    Approach description:
+
+    Step 1: run BFS to find the path from source to sink. (network.find_path)
+    Step 2: if there is a path, find the minimum flow on it, and add it to the edges. (network.augment_path)
+    Step 3: repeat step 1 and step 2 until there is no path.
+
+    :Input:
+        argv1: getaway : the flow network (any of NETWORK_BACKENDS)
+        argv2: car_list : the list of cars, it will be updated with the allocated people
+
+    :Output, return: the total flow that was added to the network
+
+    :Time complexity: O(F * N^2), where F is the flow added and N is the number of people.
+    :Aux space complexity: O(N), where N is the number of people.
+    '''
+    total_flow = 0
+    paths = 0
 
     # do bfs to find the path
-    path = getaway.bfs(getaway.source_index, getaway.sink_index)
+    path = getaway.find_path(getaway.source_index, getaway.sink_index)
 
     # while there is a path from source to sink
-    # we can know this through the bfs function
-    while path:
-        
-        # initialize the minimum flow to infinity
-        minimum_flow = math.inf
+    while path is not None:
 
-        # backtrack and find the minimum flow
-        v = getaway.sink_index
+        # find the minimum flow and add it to the edges
+        total_flow += getaway.augment_path(path, car_list)
+        paths += 1
 
-        # while we are not at the source
-        while v != getaway.source_index:
+        # do bfs to find the path
+        path = getaway.find_path(getaway.source_index, getaway.sink_index)
 
-            # keep track of the previous vertex
-            u = getaway.vertices_list[v].previous
+    if getaway.stats is not None:
+        getaway.stats.augmenting_paths += paths
 
-            # find the edge from u to v
-            for edge in getaway.vertices_list[u].edges:
-                
-                if edge.v == v:
+    return total_flow
 
-                    # if the capacity - flow is smaller than the minimum flow,
-                    # need to update the minimum flow
-                    if edge.c - edge.f < minimum_flow:
-                        minimum_flow = edge.c - edge.f
-                    break
-            v = u
-
-        # add the minimum flow to the edge
-        v = getaway.sink_index
-
-        # while we are not at the source
-        while v!= getaway.source_index:
-            u = getaway.vertices_list[v].previous
-            
-            # find the edge from u to v
-            for edge in getaway.vertices_list[u].edges:
-                if edge.v == v:
-                    # add the minimum flow to the edge
-                    edge.f += minimum_flow
-
-                    # if the edge is from car to sink, add the driver to the car_list
-                    if edge.v >= getaway.og_vertices and edge.v <= getaway.og_vertices + getaway.car_max:
-                        car_list[edge.v - getaway.og_vertices].append(edge.u)
-                        getaway.vertices_list[edge.u].allocated = True
-     
-                    break
-            v = u
+def allocate_dinic(preferences, licenses, stats=None, car_max=None, deadline=None):
+    '''
+    Function description:
 
-        # do bfs to find the path
-        path = getaway.bfs(getaway.source_index, getaway.sink_index)
+    This function is the "dinic" engine of allocate.
+    It returns the list of cars, or None if there is no allocation.
 
-        # add the minimum flow to the maximum_flow
-        maximum_flow += minimum_flow    
+    Approach description:
 
-    # allocate the rest of the people who have more than 1 preference
-    for i in range(len(licenses)):
-        driver = licenses[i]
-   
-        # only add edge from source to driver if driver has more than 1 preference
-        person_preference = preferences[driver]
+    Step 1: make the LowerBoundNetwork, every car needs at least 2 drivers and at most 5 people.
+    Step 2: run Dinic's max-flow from the super source to the super sink.
+    Step 3: if every lower bound and every person is saturated, read the cars from the flow.
 
-        # if the driver has more than 1 preference and has license, add edge from source to driver
-        if len(person_preference) > 1 and getaway.vertices_list[driver].license:
-            
-            # add edge from source to driver
-            getaway.vertices_list[getaway.source_index].add_edge(Edge(getaway.source_index, driver, 1))
+    Because the network has the residual edges, a bad choice can be undone by a later path,
+    so it always finds an allocation if there is one.
 
-    # checking if the car is full of driver
-    for i in range(getaway.car_max):
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: stats : an AllocationStats or None, the phases are "build" and "maxflow".
+        argv4: car_max : the number of cars, ceil(N/5) by default.
+        argv5: deadline : a time.monotonic() value or None, it is checked before every phase of Dinic's algorithm.
 
-        # update the capacity with comparing the flow
-        for edge in getaway.vertices_list[getaway.og_vertices + i].edges:
-            edge.c = max(2, edge.f) 
+    :Output, return: the list of cars, or None if there is no allocation.
+    :Time complexity: O (E * sqrt(N)), where E is the number of preferences and N is the number of people.
+    :Aux space complexity: O (E), where E is the number of preferences.
+    '''
+    if stats is None:
+        network = LowerBoundNetwork(preferences, licenses, car_max)
+        network.graph.deadline = deadline
+        return network.solve()
+
+    stats.begin("build")
+    network = LowerBoundNetwork(preferences, licenses, car_max)
+    network.graph.deadline = deadline
+    network.graph.stats = stats
+    stats.record_graph(network.graph.memory_bytes())
+    stats.begin("maxflow")
+    return network.solve()
+
+def allocate_bipartite(preferences, licenses, stats=None, car_max=None, deadline=None):
+    '''
+    Function description:
 
-    # do bfs to find the path with updated capacity
-    path = getaway.bfs(getaway.source_index, getaway.sink_index)
+    This function returns the list of cars with a bipartite b-matching of the people to the seats of the cars,
+    without a generic flow network.
 
-    # while there is a path from source to sink
-    while path:
-        
-        # initialize the minimum flow to infinity
-        minimum_flow = math.inf
-
-        # backtrack and find the minimum flow
-        v = getaway.sink_index
-
-        # while we are not at the source
-        while v != getaway.source_index:
-            u = getaway.vertices_list[v].previous
-
-            # find the edge from u to v
-            for edge in getaway.vertices_list[u].edges:
-                if edge.v == v:
-                    # if the capacity - flow is smaller than the minimum flow,
-                    # need to update the minimum flow
-                    if edge.c - edge.f < minimum_flow:
-                        minimum_flow = edge.c - edge.f
-                    break
-            v = u
+    Approach description:
+
+    Every car j has 2 driver seats (D_j, only for a person with license) and 3 open seats (O_j, for everyone).
+    A car with at least 2 drivers and at most 5 people is exactly a car whose D_j is full,
+    so there is an allocation if and only if there is a matching which covers every person and every D_j.
+
+    Step 1: seed the people with 1 destination greedily, then Hopcroft-Karp with the people with license
+            and only the driver seats. If D_j is not full for every j, there is no allocation.
+    Step 2: seed the rest of the people greedily, then Hopcroft-Karp with everyone and every seat.
+            An augmenting path never empties a seat group, so D_j stays full.
+            If a person is not matched, there is no allocation.
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: stats : an AllocationStats or None, the phases are "build", "drivers" and "passengers".
+                       There is no flow network, so peak_graph_bytes is not counted.
+        argv4: car_max : the number of cars, ceil(N/5) by default.
+        argv5: deadline : a time.monotonic() value or None, it is checked before every phase of Hopcroft-Karp.
+
+    :Output, return: the list of cars, or None if there is no allocation.
+    :Time complexity: O (E * sqrt(N)), where E is the number of preferences and N is the number of people.
+    :Aux space complexity: O (E), where E is the number of preferences.
+    '''
+    if stats is not None:
+        stats.begin("build")
+    matching = CarMatching(preferences, licenses, car_max)
+    matching.stats = stats
+    matching.deadline = deadline
+
+    if stats is not None:
+        stats.begin("drivers")
+    drivers = list(matching.license)
+    matching.seed([i for i in drivers if len(preferences[i]) == 1], driver_seats=True)
+    if matching.hopcroft_karp(drivers, driver_seats=True) != 2 * matching.car_max:
+        return None
 
-        # add the minimum flow to the edge
-        v = getaway.sink_index
+    if stats is not None:
+        stats.begin("passengers")
+    everyone = range(matching.og_vertices)
+    matching.seed(everyone, driver_seats=False)
+    if matching.hopcroft_karp(everyone, driver_seats=False) != matching.og_vertices:
+        return None
+    return matching.car_list()
 
-        # while we are not at the source
-        while v!= getaway.source_index:
-            u = getaway.vertices_list[v].previous
+def allocate_tiny(preferences, licenses, stats=None, car_max=None, deadline=None):
+    '''
+    Function description:
 
-            # find the edge from u to v
-            for edge in getaway.vertices_list[u].edges:
-                if edge.v == v:
+    This function is the "tiny" engine of allocate, for a trip of a few people (see TINY_TRIP).
+    It is the b-matching of allocate_bipartite, but with a simple augmenting path (Kuhn) for every person
+    on a few flat lists, without CarMatching, Vertex or Edge objects or a BFS, so the setup of a small trip
+    is only a few lists. It is slower than "bipartite" for a big trip, because every person can search every seat,
+    and a trip of more than 200 cars is solved by "bipartite".
 
-                    # add the minimum flow to the edge
-                    edge.f += minimum_flow
+    Approach description:
 
-                    # if the edge is from car to sink, allocate the driver to the car_list
-                    if edge.v >= getaway.og_vertices and edge.v <= getaway.og_vertices + getaway.car_max:
-                        car_list[edge.v - getaway.og_vertices].append(edge.u)
+    The seat groups are D_j = j (2 seats, only for a person with license) and O_j = car_max + j (3 seats).
 
-                        #allocated is True
-                        getaway.vertices_list[edge.u].allocated = True
-                    break
-            v = u
+    Step 1: every person with license searches an augmenting path to a free seat of a D_j,
+            a full group is passed on by moving one of its people to another group of their list.
+            If D_j is not full for every j, there is no allocation.
+    Step 2: every person who is not seated searches an augmenting path to any seat.
+            A path only moves the people of a full group, so D_j stays full.
+            If a person is not seated, there is no allocation.
 
-        # do bfs to find the path
-        path = getaway.bfs(getaway.source_index, getaway.sink_index)
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: stats : an AllocationStats or None, the phases are "drivers" and "passengers",
+                       and every person who is seated counts as an augmenting path (there is no BFS).
+        argv4: car_max : the number of cars, ceil(N/5) by default.
+        argv5: deadline : a time.monotonic() value or None, it is checked before every step.
+
+    :Output, return: the list of cars, or None if there is no allocation.
+    :Time complexity: O (N * E), where N is the number of people and E is the number of preferences.
+    :Aux space complexity: O (N + C), where N is the number of people and C is the number of cars.
+    '''
+    n = len(preferences)
+    if car_max is None:
+        car_max = math.ceil(n / 5)
+
+    # a path can pass every group, keep the recursion far from the limit
+    if car_max > 200:
+        return allocate_bipartite(preferences, licenses, stats, car_max, deadline)
+
+    license = [False] * n
+    for driver in licenses:
+        license[driver] = True
+
+    # the people of every seat group, its capacity, and the group of every person
+    members = [[] for _ in range(2 * car_max)]
+    capacity = [2] * car_max + [3] * car_max
+    group_of = [-1] * n
+
+    def augment(person, driver_seats, visited):
+        # the groups of the person, D_j first, O_j only in step 2
+        for j in preferences[person]:
+            for group in ((j,) if driver_seats else (j, car_max + j)):
+                if group < car_max and not license[person]:
+                    continue
+                if visited[group]:
+                    continue
+                visited[group] = True
+                people = members[group]
+                if len(people) < capacity[group]:
+                    people.append(person)
+                    group_of[person] = group
+                    return True
+                for k in range(len(people)):
+                    other = people[k]
+                    if augment(other, driver_seats, visited):
+                        people[k] = person
+                        group_of[person] = group
+                        return True
+        return False
+
+    check_deadline(deadline)
+    if stats is not None:
+        stats.begin("drivers")
+    for person in range(n):
+        if license[person] and augment(person, True, [False] * car_max) and stats is not None:
+            stats.augmenting_paths += 1
+    for j in range(car_max):
+        if len(members[j]) < 2:
+            return None
+
+    check_deadline(deadline)
+    if stats is not None:
+        stats.begin("passengers")
+    for person in range(n):
+        if group_of[person] == -1:
+            if not augment(person, False, [False] * (2 * car_max)):
+                return None
+            if stats is not None:
+                stats.augmenting_paths += 1
+
+    return [members[j] + members[car_max + j] for j in range(car_max)]
+
+def allocate_scipy(preferences, licenses, stats=None, car_max=None, deadline=None):
+    '''
+    Function description:
 
-        # add the minimum flow to the maximum_flow
-        maximum_flow += minimum_flow    
+    This function returns the list of cars with the same lower-bound flow network as allocate_dinic,
+    but the network is made with NumPy and solved by scipy.sparse.csgraph.maximum_flow (Dinic's algorithm in C).
+    Without SciPy, it is allocate_dinic.
 
-    # check every driver is allocated with enough number of people in the car
-    for i in range(getaway.car_max):
-        if len(car_list[i]) < 2:
+    Approach description:
+
+    The vertices are: person i is i, D_j is N + j, C_j is N + C + j, then sink, super source and super sink.
+
+    Step 1: flatten the preferences, and make the edges of every person to D_j (license) or C_j (no license)
+            with array operations, see LowerBoundNetwork for the other edges.
+    Step 2: make the sparse capacity matrix (a repeated preference is summed, the super source edge is still 1).
+    Step 3: run the max-flow from the super source to the super sink.
+    Step 4: if it is N + 2C, read the car of every person from the flow of the rows of the people.
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: stats : an AllocationStats or None, the phases are "build" and "maxflow".
+                       SciPy does not report its BFS calls or augmenting paths, only the bytes of the graph are counted.
+        argv4: car_max : the number of cars, ceil(N/5) by default.
+        argv5: deadline : a time.monotonic() value or None, it is checked before the max-flow
+                          (SciPy can not be stopped during the max-flow).
+
+    :Output, return: the list of cars, or None if there is no allocation.
+    :Time complexity: O (E * sqrt(N)), where E is the number of preferences and N is the number of people.
+    :Aux space complexity: O (E), where E is the number of preferences.
+    '''
+    try:
+        import numpy
+        from scipy.sparse import coo_matrix  # type: ignore[import-untyped]
+        from scipy.sparse.csgraph import maximum_flow  # type: ignore[import-untyped]
+    except ImportError:
+        return allocate_dinic(preferences, licenses, stats=stats, car_max=car_max, deadline=deadline)
+
+    if stats is not None:
+        stats.begin("build")
+
+    n = len(preferences)
+    if car_max is None:
+        car_max = math.ceil(n / 5)
+    sink = n + 2 * car_max
+    super_source = sink + 1
+    super_sink = sink + 2
+
+    lengths, targets = _flatten_preferences(numpy, preferences)
+    if len(targets) > 0 and (targets.min() < 0 or targets.max() >= car_max):
+        k = int(numpy.argmax((targets < 0) | (targets >= car_max)))
+        i = int(numpy.searchsorted(numpy.cumsum(lengths), k, side="right"))
+        raise ValueError("person %d prefers destination %d, but there are only %d cars" % (i, targets[k], car_max))
+
+    license = numpy.zeros(n, dtype=bool)
+    license[numpy.asarray(licenses, dtype=numpy.int64)] = True
+
+    people = numpy.arange(n, dtype=numpy.int32)
+    drivers = n + numpy.arange(car_max, dtype=numpy.int32)
+    cars = drivers + car_max
+    rows = numpy.repeat(people, lengths)
+
+    # (from, to, capacity) of every group of edges
+    groups = [
+        (numpy.full(n, super_source), people, 1),
+        (rows, numpy.where(license[rows], n + targets, n + car_max + targets), 1),
+        (drivers, cars, 3),
+        (numpy.full(car_max, super_source), cars, 2),
+        (drivers, numpy.full(car_max, super_sink), 2),
+        (cars, numpy.full(car_max, sink), 5),
+        (numpy.array([sink]), numpy.array([super_sink]), n),
+    ]
+    u = numpy.concatenate([group[0] for group in groups]).astype(numpy.int32)
+    v = numpy.concatenate([group[1] for group in groups]).astype(numpy.int32)
+    c = numpy.concatenate([numpy.full(len(group[0]), group[2]) for group in groups]).astype(numpy.int32)
+    graph = coo_matrix((c, (u, v)), shape=(super_sink + 1, super_sink + 1)).tocsr()
+
+    if stats is not None:
+        stats.record_graph(graph.data.nbytes + graph.indices.nbytes + graph.indptr.nbytes)
+        stats.begin("maxflow")
+
+    check_deadline(deadline)
+    result = maximum_flow(graph, super_source, super_sink, method="dinic")
+    if result.flow_value != n + 2 * car_max:
+        return None
+
+    # the edges of the people which carry the flow, in the order of the rows (people)
+    flow = result.flow.tocsr()[:n].tocoo()
+    used = (flow.data > 0) & (flow.col >= n)
+
+    car_list = [[] for _ in range(car_max)]
+    passengers = [[] for _ in range(car_max)]
+    for person, vertex in zip(flow.row[used].tolist(), flow.col[used].tolist()):
+        if vertex < n + car_max:
+            car_list[vertex - n].append(person)
+        else:
+            passengers[vertex - n - car_max].append(person)
+    for j in range(car_max):
+        car_list[j].extend(passengers[j])
+    return car_list
+
+def allocate_ranked(preferences, licenses, stats=None, car_max=None, deadline=None, max_slowdown=None):
+    '''
+    Function description:
+
+    This function is the "ranked" engine of allocate.
+    It returns the list of cars with the smallest sum of the ranks of the cars in the preferences
+    (0 for the first destination of a person), or None if there is no allocation.
+
+    Approach description:
+
+    Step 1: make the RankNetwork, the cost of a person in a car is its rank.
+    Step 2: min-cost max-flow with successive shortest paths, Dijkstra with potentials and a binary heap,
+            and all the shortest paths of a phase at once (see RankNetwork.solve).
+    Step 3: if every person and every driver seat has flow, read the cars from the flow.
+
+    With max_slowdown, the "bipartite" engine runs first, and the ranked allocation gets at most
+    max_slowdown times its time. If it is not done by then, the allocation of "bipartite" is returned,
+    so the extra time is bounded (up to one phase of Dijkstra) and there is always an allocation if one exists.
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: stats : an AllocationStats or None, the phases are "build" and "mincost" ("maxflow" first with max_slowdown).
+        argv4: car_max : the number of cars, ceil(N/5) by default.
+        argv5: deadline : a time.monotonic() value or None, it is checked before every phase.
+        argv6: max_slowdown : the time of the ranked allocation as a multiple of the time of "bipartite", or None.
+
+    :Output, return: the list of cars, or None if there is no allocation.
+    :Time complexity: O (P * E log N), where P is the number of phases, E the number of preferences and N the number of people.
+    :Aux space complexity: O (E), where E is the number of preferences.
+    '''
+    budget = deadline
+    plain = None
+    if max_slowdown is not None:
+        if stats is not None:
+            stats.begin("maxflow")
+        start = time.monotonic()
+        plain = allocate_bipartite(preferences, licenses, car_max=car_max, deadline=deadline)
+        if plain is None:
+            return None
+        budget = time.monotonic() + max_slowdown * (time.monotonic() - start)
+        if deadline is not None:
+            budget = min(budget, deadline)
+
+    if stats is not None:
+        stats.begin("build")
+    network = RankNetwork(preferences, licenses, car_max)
+    network.stats = stats
+    network.deadline = budget
+    if stats is not None:
+        stats.record_graph(network.memory_bytes())
+        stats.begin("mincost")
+
+    try:
+        return network.solve()
+    except AllocationTimeout:
+        if plain is None or (deadline is not None and time.monotonic() >= deadline):
+            raise
+        return plain
+
+def _flatten_preferences(numpy, preferences):
+    '''
+    Function description:
+
+    This function returns the preferences as 2 NumPy arrays, the number of the preferences of every person
+    and the destinations of every person one after another.
+    A PreferenceArrays is read without copying it to Python lists.
+
+    :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+    :Aux space complexity: O(N + E)
+    '''
+    from itertools import chain
+
+    if isinstance(preferences, PreferenceArrays):
+        offsets = numpy.asarray(preferences.offsets, dtype=numpy.int64)
+        targets = numpy.asarray(preferences.targets, dtype="i")
+        return numpy.diff(offsets), targets[offsets[0]:offsets[-1]]
+
+    lengths = numpy.fromiter(map(len, preferences), dtype=numpy.int64, count=len(preferences))
+    targets = numpy.fromiter(chain.from_iterable(preferences), dtype="i", count=int(lengths.sum()))
+    return lengths, targets
+
+def _int_array(values):
+    '''
+    Function description:
+
+    This function returns a copy of the NumPy array as an array("i").
+
+    :Time complexity: O(L), where L is the length of the array.
+    :Aux space complexity: O(L)
+    '''
+    result = array("i")
+    result.frombytes(values.astype("i", copy=False).tobytes())
+    return result
+
+def allocate_components(preferences, licenses, engine="bipartite", workers=None, pool="thread", stats=None, deadline=None):
+    '''
+    Function description:
+
+    This function returns the list of cars, by solving every connected component of the trip on its own.
+
+    Approach description:
+
+    Two destinations are in the same component if a person prefers both of them (find_components).
+    The people of a component can only go to the cars of the component, so the components are independent,
+    and a component with k destinations is a trip with k cars (each car still needs 2 drivers).
+
+    Step 1: find the components with union-find.
+    Step 2: make the trip of every component, with the destinations renumbered 0 .. k-1.
+    Step 3: solve every trip with the engine and an explicit car_max = k, in this thread or on a pool.
+    Step 4: put the cars of every component back to their destinations, if a component has no allocation,
+            the trip has no allocation.
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: engine : the name of an engine which takes car_max, "bipartite", "dinic" or "scipy".
+        argv4: workers : the number of workers of the pool, the components are solved in this thread by default.
+        argv5: pool : "thread" or "process". The engines are pure Python (except "scipy"),
+                      so only a process pool runs them at the same time.
+        argv6: stats : an AllocationStats or None, only when the components are solved in this thread.
+        argv7: deadline : a time.monotonic() value or None, it is passed to the engine of every component.
+
+    :Output, return: the list of cars, or None if there is no allocation.
+    :Time complexity: O(N + E) for the components, and the engine on every component.
+    :Aux space complexity: O(N + E)
+    '''
+    if stats is not None:
+        stats.begin("components")
+
+    car_max = math.ceil(len(preferences) / 5)
+    components = find_components(preferences, car_max)
+
+    license = bytearray(len(preferences))
+    for driver in licenses:
+        license[driver] = 1
+
+    # the trip of every component, with the destinations renumbered
+    local = [0] * car_max
+    jobs = []
+    for destinations, people in components:
+        if not people:
+            return None
+        for k in range(len(destinations)):
+            local[destinations[k]] = k
+        component_preferences = [[local[j] for j in preferences[i]] for i in people]
+        component_licenses = [k for k in range(len(people)) if license[people[k]]]
+        jobs.append((component_preferences, component_licenses, len(destinations)))
+
+    if workers is None or workers <= 1 or len(jobs) <= 1:
+        results = [_solve_component(engine, job, stats, deadline) for job in jobs]
+    else:
+        if pool == "process":
+            from concurrent.futures import ProcessPoolExecutor as Executor
+        else:
+            from concurrent.futures import ThreadPoolExecutor as Executor
+        with Executor(workers) as executor:
+            results = list(executor.map(_solve_component, [engine] * len(jobs), jobs, [None] * len(jobs), [deadline] * len(jobs)))
+
+    if stats is not None:
+        stats.begin("merge")
+
+    car_list = [None] * car_max
+    for (destinations, people), component_car_list in zip(components, results):
+        if component_car_list is None:
             return None
+        for k in range(len(destinations)):
+            car_list[destinations[k]] = [people[x] for x in component_car_list[k]]
+    return car_list
+
+def _solve_component(engine, job, stats=None, deadline=None):
+    '''
+    Function description:
+
+    This function solves the trip (preferences, licenses, car_max) of one component of allocate_components.
+
+    :Time complexity: the engine on the component.
+    :Aux space complexity: the engine on the component.
+    '''
+    preferences, licenses, car_max = job
+    if stats is None:
+        return ENGINES[engine](preferences, licenses, car_max=car_max, deadline=deadline)
+    return ENGINES[engine](preferences, licenses, stats=stats, car_max=car_max, deadline=deadline)
+
+def find_components(preferences, car_max):
+    '''
+    Function description:
+
+    This function returns the connected components of the graph of the people and the destinations.
+
+    Approach description:
+
+    Union-find over the destinations (union by size, path halving):
+    the preferences of every person are joined into one set. Then every destination and every person
+    is put in the list of the root of its set, in increasing order.
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: car_max : the number of destinations
 
-    # before allocating the rest of the people who doesnt have license, update the capacity
-    for i in range(getaway.car_max):
-        for edge in getaway.vertices_list[getaway.og_vertices + i].edges:
-            edge.c = 5
+    :Output, return: the list of (destinations, people) of every component, in the order of their first destination.
+                     A person without preferences is not in any component.
+
+    :Time complexity: O((N + E) * a(C)), where a is the inverse Ackermann function.
+    :Aux space complexity: O(N + C), where C is the number of destinations.
+    '''
+    parent = list(range(car_max))
+    size = [1] * car_max
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for pref in preferences:
+        if len(pref) < 2:
+            continue
+        root = find(pref[0])
+        for j in pref[1:]:
+            other = find(j)
+            if other != root:
+                if size[other] > size[root]:
+                    root, other = other, root
+                parent[other] = root
+                size[root] += size[other]
+
+    # the index of the component of every root, in the order of the first destination
+    index = [-1] * car_max
+    components = []
+    for j in range(car_max):
+        root = find(j)
+        if index[root] == -1:
+            index[root] = len(components)
+            components.append(([], []))
+        components[index[root]][0].append(j)
 
-    # now, we have to allocate the rest of people who doesnt have license
     for i in range(len(preferences)):
+        if len(preferences[i]) > 0:
+            components[index[find(preferences[i][0])]][1].append(i)
+    return components
 
-        # make edges from source to person who doesnt have license
-        if getaway.vertices_list[i].license == False:
-            getaway.vertices_list[getaway.source_index].add_edge(Edge(getaway.source_index, i, 1))
+def allocate_many(jobs, workers=None, chunksize=64, ordered=True, **options):
+    '''
+    Function description:
 
-    # do bfs to find the path
-    path = getaway.bfs(getaway.source_index, getaway.sink_index)
+    This function runs allocate for many independent trips, on a pool of processes.
+    It is a generator, it yields (index, car_list) for every job, where car_list is None
+    if there is no allocation or the job failed, so one bad job does not stop the batch.
 
-    # while there is a path from source to sink 
-    # edmonds karp algorithm (shortest path)
-    while path:
-        
-        # initialize the minimum flow to infinity
-        minimum_flow = math.inf
+    Approach description:
+
+    Step 1: pack every job into flat arrays of bytes (_pack_job), which are small to send to a process.
+    Step 2: group the jobs into chunks of chunksize, so a process gets many jobs at once.
+    Step 3: submit the chunks to the ProcessPoolExecutor, but only 2 chunks per worker at a time,
+            so the jobs can be a generator and are not all packed at once.
+    Step 4: yield the results, in the order of the jobs (ordered=True) or as soon as a chunk is done.
+
+    :Input:
+        argv1: jobs : an iterable of (preferences, licenses)
+        argv2: workers : the number of processes, the number of CPUs by default.
+                         With 1 worker, the jobs are run in this process.
+        argv3: chunksize : the number of jobs which are sent to a process at once
+        argv4: ordered : True to yield the results in the order of the jobs
+        argv5: options : the other arguments of allocate (engine, backend)
+
+    :Output, return: yields (index, car_list) for every job
+
+    :Time complexity: the sum of allocate of every job, divided by the number of workers.
+    :Aux space complexity: O(workers * chunksize * E), where E is the size of the biggest job.
+    '''
+    if workers is None:
+        import os
+        workers = os.cpu_count() or 1
+
+    chunks = _chunk_jobs(jobs, chunksize)
+
+    # run in this process
+    if workers <= 1:
+        for start, chunk in chunks:
+            for k, car_list in enumerate(_allocate_chunk(chunk, options)):
+                yield start + k, car_list
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = {}
+        finished_chunks = {}
+        next_start = 0
+        exhausted = False
+
+        while True:
+
+            # keep 2 chunks per worker in flight
+            while not exhausted and len(pending) < 2 * workers:
+                try:
+                    start, chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[pool.submit(_allocate_chunk, chunk, options)] = (start, len(chunk))
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, size = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception:
+                    # the process failed, every job of the chunk failed
+                    results = [None] * size
+
+                if ordered:
+                    finished_chunks[start] = results
+                else:
+                    for k in range(size):
+                        yield start + k, results[k]
+
+            # yield the chunks which are next in order
+            while next_start in finished_chunks:
+                results = finished_chunks.pop(next_start)
+                for k in range(len(results)):
+                    yield next_start + k, results[k]
+                next_start += len(results)
+
+def _chunk_jobs(jobs, chunksize):
+    '''
+    Function description:
+
+    This function groups the packed jobs into chunks, it yields (index of the first job, chunk).
+    A job which can not be packed (e.g. a destination which is not an integer) is None in the chunk,
+    so only its result is None (see _allocate_chunk), and the other jobs of the batch are still solved.
+
+    :Time complexity: O(E) for every job, where E is the number of preferences.
+    :Aux space complexity: O(chunksize * E)
+    '''
+    chunk = []
+    start = 0
+    for job in jobs:
+        try:
+            preferences, licenses = job
+            packed = _pack_job(preferences, licenses)
+        except (TypeError, ValueError, OverflowError):
+            packed = None
+        chunk.append(packed)
+        if len(chunk) == chunksize:
+            yield start, chunk
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+def _pack_job(preferences, licenses):
+    '''
+    Function description:
+
+    This function packs (preferences, licenses) into 3 strings of bytes:
+    the offsets of every person, the destinations of every person, and the licenses.
+    It is much smaller and faster to pickle than the lists of lists.
+
+    :Time complexity: O(E), where E is the number of preferences.
+    :Aux space complexity: O(E)
+    '''
+    offsets = array("i", [0])
+    targets = array("i")
+    for person_preference in preferences:
+        targets.extend(person_preference)
+        offsets.append(len(targets))
+    return offsets.tobytes(), targets.tobytes(), array("i", licenses).tobytes()
+
+def _unpack_job(packed):
+    '''
+    Function description:
+
+    This function is the reverse of _pack_job, it returns (preferences, licenses).
+
+    :Time complexity: O(E), where E is the number of preferences.
+    :Aux space complexity: O(E)
+    '''
+    offsets = array("i")
+    offsets.frombytes(packed[0])
+    targets = array("i")
+    targets.frombytes(packed[1])
+    licenses = array("i")
+    licenses.frombytes(packed[2])
+    preferences = [targets[offsets[i]:offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+    return preferences, licenses.tolist()
+
+def _allocate_chunk(chunk, options):
+    '''
+    Function description:
 
-        # backtrack and find the minimum flow
-        v = getaway.sink_index
+    This function runs allocate for every packed job of the chunk, in the worker process.
+    A job which raises an exception, or which could not be packed (None), gives None.
 
-        # while we are not at the source
-        while v != getaway.source_index:
+    :Time complexity: the sum of allocate of every job.
+    :Aux space complexity: O(E) for the biggest job.
+    '''
+    results = []
+    for packed in chunk:
+        if packed is None:
+            results.append(None)
+            continue
+        try:
+            preferences, licenses = _unpack_job(packed)
+            results.append(allocate(preferences, licenses, **options))
+        except Exception:
+            results.append(None)
+    return results
+
+def schedule_trips(trips, inventory, engine="bipartite", max_edges=2000000, stats=None, deadline=None):
+    '''
+    Function description:
+
+    This function allocates many trips which share a fleet, where destination j has inventory[j] seats
+    for the people of every trip together. The car j of a trip goes to destination j, so it takes
+    seats of inventory[j]. It returns the list of the car lists of the trips, where a car list is None
+    if the trip has no allocation, or there are not enough seats left for it.
+
+    Approach description:
+
+    Step 1: every trip is solved alone with allocate and the engine, like allocate_many,
+            and the trips are allocated in their order while their cars fit in the seats which are left.
+            A trip which can not fit in the seats which are left with any allocation (see _fleet_need)
+            is not solved.
+    Step 2: the trips which are feasible but do not fit (the conflicts) are solved jointly in a FleetNetwork,
+            where the cars of every trip are connected to a shared vertex of their destination
+            with the capacity of the seats which are left, so a trip can move its people to other cars
+            to make room for another trip. Every trip whose flow is complete is allocated.
+            The trips which are left are solved again with the seats which are left, until a round
+            allocates no trip, and then they are solved one by one, in the order of the trips (_schedule_batch).
+    Step 3: if the FleetNetwork of the conflicts has more than max_edges edges, the conflicts are split
+            into batches of at most max_edges edges (in their order), and the seats of every destination
+            are shared fairly: a batch gets the seats which are left, in proportion to the seats which it can take
+            (min(5, its people who prefer j) for every trip) against the batches which are left.
+            The seats which a batch does not take go to the next batches.
+
+    Solving the trips alone first keeps the fast engine for every trip which fits, and only the conflicts
+    need the max-flow of the shared seats, in one network instead of one network for every trip.
+
+    :Input:
+        argv1: trips : a list of (preferences, licenses)
+        argv2: inventory : a list of integers, inventory[j] is the number of seats of destination j for every trip
+        argv3: engine : the engine of allocate for the trips alone, "bipartite" by default.
+        argv4: max_edges : the most edges of a FleetNetwork, the conflicts are batched above it.
+        argv5: stats : an AllocationStats or None, the phases are "alone" and "joint".
+        argv6: deadline : a time.monotonic() value or None, it is checked before every trip and every round.
+
+    :Output, return: the list of the car lists of the trips, or None for a trip which is not allocated.
+
+    :Time complexity: the sum of allocate of every trip, and O (C * E * sqrt(N)) in the worst case of one conflict
+                      per round, where C is the number of conflicts, E is the number of preferences
+                      and N is the number of people of the conflicts.
+    :Aux space complexity: O (E), or O (max_edges) with the batches.
+    '''
+    results = [None] * len(trips)
+    remaining = list(inventory)
+
+    if stats is not None:
+        stats.begin("alone")
+
+    conflicts = []
+    for t in range(len(trips)):
+        preferences, licenses = trips[t]
+        car_max = math.ceil(len(preferences) / 5)
+        if car_max > len(inventory):
+            raise ValueError("trip %d needs %d destinations, but the inventory has %d" % (t, car_max, len(inventory)))
+        check_deadline(deadline)
+        if not _fleet_fits(_fleet_need(preferences), len(preferences), remaining):
+            continue
+        car_list = allocate(preferences, licenses, engine=engine, deadline=deadline)
+        if car_list is None:
+            continue
+
+        # the trip fits in the seats which are left
+        if all(len(car_list[j]) <= remaining[j] for j in range(car_max)):
+            results[t] = car_list
+            for j in range(car_max):
+                remaining[j] -= len(car_list[j])
+        else:
+            conflicts.append(t)
+
+    if not conflicts:
+        return results
+    if stats is not None:
+        stats.begin("joint")
+
+    # the seats that a conflict can take at every destination
+    most_seats = {}
+    demand = [0] * len(inventory)
+    for t in conflicts:
+        seats = [0] * math.ceil(len(trips[t][0]) / 5)
+        for person_preference in trips[t][0]:
+            for j in set(person_preference):
+                seats[j] += 1
+        for j in range(len(seats)):
+            seats[j] = min(5, seats[j])
+            demand[j] += seats[j]
+        most_seats[t] = seats
+
+    # the batches of the conflicts, by the edges of their FleetNetwork
+    batches = [[]]
+    edges = 0
+    for t in conflicts:
+        trip_edges = _fleet_edges(trips[t][0])
+        if batches[-1] and edges + trip_edges > max_edges:
+            batches.append([])
+            edges = 0
+        batches[-1].append(t)
+        edges += trip_edges
+
+    for batch in batches:
+        batch_demand = [0] * len(inventory)
+        for t in batch:
+            for j in range(len(most_seats[t])):
+                batch_demand[j] += most_seats[t][j]
+
+        # the fair share of the seats, all the seats which are left for the last batch
+        seats = list(remaining)
+        for j in range(len(inventory)):
+            if batch_demand[j] < demand[j]:
+                seats[j] = remaining[j] * batch_demand[j] // demand[j]
+            demand[j] -= batch_demand[j]
+
+        for t, car_list in _schedule_batch(trips, batch, seats, stats, deadline):
+            results[t] = car_list
+            for j in range(len(car_list)):
+                remaining[j] -= len(car_list[j])
+
+    return results
+
+def _schedule_batch(trips, batch, seats, stats=None, deadline=None):
+    '''
+    Function description:
+
+    This function solves the trips of the batch jointly in a FleetNetwork with the seats (see schedule_trips),
+    it yields (trip index, car_list) for every trip which is allocated. seats is updated with the seats which are taken.
 
-            # keep track of the previous vertex
-            u = getaway.vertices_list[v].previous
+    Approach description:
 
-            # find the edge from u to v
-            for edge in getaway.vertices_list[u].edges:
-                if edge.v == v:
-                    
-                    # if the capacity - flow is smaller than the minimum flow,
-                    if edge.c - edge.f < minimum_flow:
-                        minimum_flow = edge.c - edge.f
+    Step 1: the trips which can not fit in the seats which are left are dropped (see _fleet_need).
+    Step 2: the group is the longest prefix of the pending trips whose seats of the drivers, the people
+            who have only 1 destination, and the people can fit in the seats together.
+    Step 3: solve the group in one FleetNetwork, and allocate the trips whose flow is complete.
+    Step 4: if no trip of the group was allocated, solve its first trip alone.
+    Step 5: repeat from step 1 until no trip is pending, every round allocates or drops a trip.
+
+    :Time complexity: O (R * E * sqrt(N)), where R is the number of rounds (at most 2 per trip),
+                      E is the number of preferences and N is the number of people of the batch.
+    :Aux space complexity: O (E)
+    '''
+    need = {t: _fleet_need(trips[t][0]) for t in batch}
+    pending = list(batch)
+    alone = False
+    while pending:
+        check_deadline(deadline)
+        pending = [t for t in pending if _fleet_fits(need[t], len(trips[t][0]), seats)]
+        if not pending:
+            break
+
+        # the longest prefix which can fit together, or the first trip alone
+        group = pending[:1]
+        if not alone:
+            total_need = list(need[pending[0]]) + [0] * (len(seats) - len(need[pending[0]]))
+            people = len(trips[pending[0]][0])
+            for t in pending[1:]:
+                if people + len(trips[t][0]) > sum(seats):
                     break
-            v = u
+                if any(total_need[j] + need[t][j] > seats[j] for j in range(len(need[t]))):
+                    break
+                for j in range(len(need[t])):
+                    total_need[j] += need[t][j]
+                people += len(trips[t][0])
+                group.append(t)
+
+        network = FleetNetwork(seats)
+        network.graph.deadline = deadline
+        network.graph.stats = stats
+        for t in group:
+            network.add_trip(*trips[t])
+        network.solve()
+
+        served = set()
+        for k in range(len(group)):
+            if network.served(k):
+                car_list = network.car_list(k)
+                for j in range(len(car_list)):
+                    seats[j] -= len(car_list[j])
+                served.add(group[k])
+                yield group[k], car_list
+
+        # a trip alone is done, allocated or not, and a group which allocated no trip is solved alone next
+        if len(group) == 1:
+            served.add(group[0])
+        alone = not served
+        pending = [t for t in pending if t not in served]
+
+def _fleet_need(preferences):
+    '''
+    Function description:
+
+    This function returns the fewest seats that every car of the trip needs with any allocation,
+    2 for the drivers, or more if more people have only this destination.
+
+    :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+    :Aux space complexity: O(C), where C is the number of cars.
+    '''
+    car_max = math.ceil(len(preferences) / 5)
+    required = [0] * car_max
+    for person_preference in preferences:
+        # check_trip rejects an empty list or a destination which is not a car
+        if person_preference and min(person_preference) == max(person_preference) and 0 <= person_preference[0] < car_max:
+            required[person_preference[0]] += 1
+    return [max(2, count) for count in required]
+
+def _fleet_fits(need, people, seats):
+    '''
+    Function description:
+
+    This function returns False if the trip can not fit in the seats with any allocation,
+    because a car has less seats than it needs (see _fleet_need), or the seats of its cars are less than its people.
+    A trip which passes can still not fit.
+
+    :Time complexity: O(C), where C is the number of cars.
+    :Aux space complexity: O(1)
+    '''
+    return all(need[j] <= seats[j] for j in range(len(need))) and sum(seats[:len(need)]) >= people
+
+def _fleet_edges(preferences):
+    '''
+    Function description:
+
+    This function returns the number of edges which FleetNetwork.add_trip adds for the trip (with their reverse edges).
+
+    :Time complexity: O(N), where N is the number of people.
+    :Aux space complexity: O(1)
+    '''
+    n = len(preferences)
+    return 2 * (n + sum(len(person_preference) for person_preference in preferences) + 4 * math.ceil(n / 5))
+
+def load_trip(path, format=None):
+    '''
+    Function description:
 
-        # add the minimum flow to the edge
-        v = getaway.sink_index
+    This function reads a trip from a file, one person per record, and returns (preferences, licenses)
+    which can be passed to allocate.
 
-        # while we are not at the source
-        while v!= getaway.source_index:
-            u = getaway.vertices_list[v].previous
+    The records are streamed into the flat arrays of PreferenceArrays, so the list of lists
+    of the preferences is never made, and the file is never read into memory at once.
+
+    Formats:
+    "jsonl": one JSON object per line, {"preferences": [0, 2], "license": true}. "license" is optional.
+    "csv": one row per person, the license (0/1, true/false) and then the destinations, "1,0,2".
+           A first row which does not start with a license is a header and is skipped.
+    "binary": the file written by save_trip, it is memory-mapped, so loading it again is O(1)
+              and the arrays are shared with the page cache.
+
+    :Input:
+        argv1: path : the path of the file
+        argv2: format : "jsonl", "csv" or "binary", by default it is found from the extension
+                        (.jsonl/.ndjson, .csv, anything else is binary)
+
+    :Output, return: (preferences, licenses), a PreferenceArrays and an array of the indices of the drivers
+
+    :Time complexity: O(E), where E is the number of preferences.
+    :Aux space complexity: O(E), 4 bytes per preference and 8 bytes per person, or O(1) for binary.
+    '''
+    if format is None:
+        format = _trip_format(path)
+
+    if format == "binary":
+        return _load_trip_binary(path)
+
+    preferences = PreferenceArrays()
+    licenses = array("i")
+
+    if format == "jsonl":
+        records = _read_jsonl(path)
+    elif format == "csv":
+        records = _read_csv(path)
+    else:
+        raise ValueError("unknown trip format %r" % format)
+
+    for person_preference, license in records:
+        if license:
+            licenses.append(len(preferences))
+        preferences.append(person_preference)
+
+    return preferences, licenses
+
+def save_trip(path, preferences, licenses):
+    '''
+    Function description:
+
+    This function writes the trip in the binary format of load_trip.
+
+    Format (little endian, every array is aligned to its item size):
+    magic b"GTWY", version (uint32), N (uint64), E (uint64),
+    offsets (N + 1 int64), destinations (E int32), license (N bytes, 0 or 1).
+
+    :Input:
+        argv1: path : the path of the file
+        argv2: preferences : a list of lists of integers (or PreferenceArrays)
+        argv3: licenses : a list of the indices of the drivers
+
+    :Time complexity: O(E), where E is the number of preferences.
+    :Aux space complexity: O(N), the destinations are written person by person.
+    '''
+    import struct
+    import sys
+
+    n = len(preferences)
+    offsets = array("q", [0])
+    for person_preference in preferences:
+        offsets.append(offsets[-1] + len(person_preference))
+
+    license = bytearray(n)
+    for driver in licenses:
+        license[driver] = 1
+
+    with open(path, "wb") as file:
+        file.write(struct.pack("<4sIQQ", TRIP_MAGIC, TRIP_VERSION, n, offsets[-1]))
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        file.write(offsets.tobytes())
+        for person_preference in preferences:
+            targets = array("i", person_preference)
+            if sys.byteorder == "big":
+                targets.byteswap()
+            file.write(targets.tobytes())
+        file.write(license)
+
+def _trip_format(path):
+    '''
+    Function description:
+
+    This function returns the format of the trip file from its extension.
+
+    :Time complexity: O(1)
+    :Aux space complexity: O(1)
+    '''
+    name = str(path).lower()
+    if name.endswith(".jsonl") or name.endswith(".ndjson"):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    return "binary"
+
+def _read_jsonl(path):
+    '''
+    Function description:
+
+    This function yields (preferences, license) for every line of the JSON lines file.
+
+    :Time complexity: O(E), where E is the number of preferences.
+    :Aux space complexity: O(P), where P is the length of the longest line.
+    '''
+    import json
+
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield record["preferences"], record.get("license", False)
+
+def _read_csv(path):
+    '''
+    Function description:
+
+    This function yields (preferences, license) for every row of the CSV file.
+
+    :Time complexity: O(E), where E is the number of preferences.
+    :Aux space complexity: O(P), where P is the length of the longest row.
+    '''
+    import csv
+
+    with open(path, newline="") as file:
+        first = True
+        reader = csv.reader(file)
+        for row in reader:
+            if not row:
+                continue
+            flag = row[0].strip().lower()
+            if flag in ("1", "true", "yes"):
+                license = True
+            elif flag in ("0", "false", "no", ""):
+                license = False
+            elif first:
+                # header
+                first = False
+                continue
+            else:
+                raise ValueError("bad license %r in %s" % (row[0], path))
+            first = False
+            try:
+                person_preference = [int(j) for j in row[1:] if j.strip()]
+            except ValueError:
+                raise ValueError("bad destination in line %d of %s: %r" % (reader.line_num, path, row)) from None
+            yield person_preference, license
+
+def _load_trip_binary(path):
+    '''
+    Function description:
+
+    This function memory-maps the file written by save_trip, and returns (preferences, licenses).
+    The offsets and the destinations are views of the mapped file, nothing is copied.
+    A file which is not a trip file, or is shorter than its header says, raises ValueError.
+
+    :Time complexity: O(N) for the licenses, where N is the number of people.
+    :Aux space complexity: O(L), where L is the number of drivers.
+    '''
+    import mmap
+    import os
+    import struct
+    import sys
+
+    header = struct.calcsize("<4sIQQ")
+    with open(path, "rb") as file:
+        # an empty file can not be mapped
+        if os.fstat(file.fileno()).st_size < header:
+            raise ValueError("%s is not a trip file of version %d" % (path, TRIP_VERSION))
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, n, e = struct.unpack_from("<4sIQQ", buffer, 0)
+    if magic != TRIP_MAGIC or version != TRIP_VERSION:
+        raise ValueError("%s is not a trip file of version %d" % (path, TRIP_VERSION))
+
+    # the arrays are read with views, which would be cut short (not an error) at the end of a truncated file
+    if len(buffer) < header + 8 * (n + 1) + 4 * e + n:
+        raise ValueError("%s is truncated, it has %d bytes for %d people and %d preferences" % (path, len(buffer), n, e))
+
+    view = memoryview(buffer)
+    start = header
+    offsets = view[start:start + 8 * (n + 1)]
+    start += 8 * (n + 1)
+    targets = view[start:start + 4 * e]
+    start += 4 * e
+    license = view[start:start + n]
+
+    if sys.byteorder == "big":
+        # the file is little endian, the arrays have to be copied
+        offsets = array("q", offsets.tobytes())
+        offsets.byteswap()
+        targets = array("i", targets.tobytes())
+        targets.byteswap()
+    else:
+        offsets = offsets.cast("q")
+        targets = targets.cast("i")
+
+    licenses = array("i", [i for i in range(n) if license[i]])
+    return PreferenceArrays(offsets, targets, buffer), licenses
+
+def save_network(path, network):
+    '''
+    Function description:
+
+    This function writes a snapshot of the flow network of the "phased" engine, with its flow,
+    so a solved trip can be read again by load_network without building and solving it again.
+
+    Format (little endian, every array is aligned to its item size):
+    magic b"GTWN", version (uint32), N (uint64), car_max (uint64), E (uint64), S (uint64),
+    car_edges_start (uint64), offsets (N + car_max + 3 int32), u, v, c and f (E int32 each),
+    source_edges (S int32), license and allocated ((N + 7) // 8 bytes each, the bits of Bitset).
+    The edges are the ones of CompactFlowNetwork, the edges from source are at the end.
+
+    :Input:
+        argv1: path : the path of the file
+        argv2: network : a FlowNetwork, CompactFlowNetwork, NumpyFlowNetwork, KernelFlowNetwork or SpillFlowNetwork
+
+    :Time complexity: O(N + E), where N is the number of people and E is the number of edges.
+    :Aux space complexity: O(N + E) for a FlowNetwork, O(1) for the others.
+    '''
+    import struct
+    import sys
+
+    if isinstance(network, FlowNetwork):
+        arrays, car_edges_start, license, allocated = _network_arrays(network)
+    else:
+        arrays = [network.offsets, network.u, network.v, network.c, network.f, network.source_edges]
+        car_edges_start, license, allocated = network.car_edges_start, network.license, network.allocated
+
+    with open(path, "wb") as file:
+        file.write(struct.pack(NETWORK_HEADER, NETWORK_MAGIC, NETWORK_VERSION, network.og_vertices, network.car_max,
+                               len(arrays[1]), len(arrays[5]), car_edges_start))
+        for values in arrays:
+            if isinstance(values, (list, range)):
+                # the lists of KernelFlowNetwork, and the source edges of SpillFlowNetwork
+                values = array("i", values)
+            if sys.byteorder == "big":
+                values = array("i", values)
+                values.byteswap()
+            file.write(values)
+        file.write(license.bits)
+        file.write(allocated.bits)
+
+def _network_arrays(network):
+    '''
+    Function description:
+
+    This function returns the arrays of save_network for a FlowNetwork, in the order of the edges of its vertices,
+    which is the order of the edges of CompactFlowNetwork.
+
+    The network is not changed, the index of the first edge from car to sink is returned with the arrays.
+
+    :Output, return: ([offsets, u, v, c, f, source_edges], car_edges_start, license, allocated)
+
+    :Time complexity: O(N + E), where N is the number of people and E is the number of edges.
+    :Aux space complexity: O(N + E)
+    '''
+    offsets = array("i", [0])
+    u = array("i")
+    v = array("i")
+    c = array("i")
+    f = array("i")
+
+    # the rows of the people and the cars, the rows of source and sink are empty
+    for vertex in network.vertices_list[:network.source_index]:
+        for edge in vertex.edges:
+            u.append(edge.u)
+            v.append(edge.v)
+            c.append(edge.c)
+            f.append(edge.f)
+        offsets.append(len(v))
+    offsets.append(len(v))
+    offsets.append(len(v))
+    car_edges_start = offsets[network.og_vertices]
+
+    source_edges = array("i")
+    for edge in network.vertices_list[network.source_index].edges:
+        source_edges.append(len(v))
+        u.append(edge.u)
+        v.append(edge.v)
+        c.append(edge.c)
+        f.append(edge.f)
+
+    return [offsets, u, v, c, f, source_edges], car_edges_start, network.license, network.allocated
+
+def load_network(path, copy=False):
+    '''
+    Function description:
+
+    This function reads the snapshot of save_network, and returns it as a CompactFlowNetwork
+    which can be inspected (car_list) or augmented again.
+
+    The file is memory-mapped copy-on-write (mmap.ACCESS_COPY), and the edge arrays and the flags
+    are views of the mapped file, so loading is O(1) in the size of the edges, and a change of c or f
+    is only in memory, never in the file. A view can not grow, so add_source_edge needs copy=True.
+    The flags of the people are Bitsets over the bits of the file.
+
+    :Input:
+        argv1: path : the path of the file
+        argv2: copy : copy the arrays into array("i") and bytearray, which can grow
+
+    :Output, return: a CompactFlowNetwork
+
+    :Time complexity: O(N + C), where N is the number of people and C the number of cars, for the state
+                      of the vertices of the BFS, O(N + E) with copy=True, where E is the number of edges.
+    :Aux space complexity: O(N + C), O(N + E) with copy=True
+    '''
+    import mmap
+    import struct
+    import sys
+
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    magic, version, n, car_max, e, s, car_edges_start = struct.unpack_from(NETWORK_HEADER, buffer, 0)
+    if magic != NETWORK_MAGIC or version != NETWORK_VERSION:
+        raise ValueError("%s is not a network snapshot of version %d" % (path, NETWORK_VERSION))
+
+    vertex_count = n + car_max + 2
+    view = memoryview(buffer)
+    start = struct.calcsize(NETWORK_HEADER)
+    arrays = []
+    for count in (vertex_count + 1, e, e, e, e, s):
+        values = view[start:start + 4 * count]
+        start += 4 * count
+        if copy or sys.byteorder == "big":
+            values = array("i", values.tobytes())
+            if sys.byteorder == "big":
+                # the file is little endian
+                values.byteswap()
+        else:
+            values = values.cast("i")
+        arrays.append(values)
+    flag_bytes = (n + 7) >> 3
+    license = view[start:start + flag_bytes]
+    allocated = view[start + flag_bytes:start + 2 * flag_bytes]
+
+    if copy:
+        license = bytearray(license)
+        allocated = bytearray(allocated)
+        view.release()
+        buffer.close()
+        buffer = None
+
+    network = CompactFlowNetwork.__new__(CompactFlowNetwork)
+    network.og_vertices = n
+    network.total_vertices = n
+    network.car_max = car_max
+    network.source_index = n + car_max
+    network.sink_index = n + car_max + 1
+    network.vertex_count = vertex_count
+    network.car_edges_start = car_edges_start
+    network.offsets, network.u, network.v, network.c, network.f, network.source_edges = arrays
+    network.license = Bitset(n, bits=license)
+    network.allocated = Bitset(n, bits=allocated)
+
+    # the state of the BFS is not in the file
+    network.previous = array("i", [-1]) * vertex_count
+    network.generation = 0
+    network.stamp = [0] * vertex_count
+    network.queue_buffer = [0] * vertex_count
+    network.stats = None
+
+    # the mmap which the views point to, it is kept open while the network exists
+    network.buffer = buffer
+    return network
+
+def canonical_trip(preferences, licenses, ranked=False):
+    '''
+    Function description:
+
+    This function returns the canonical form of the trip, which is the same for every order of the people.
+
+    Approach description:
+
+    Every person gets the key (license, sorted preferences), and the people are sorted by the key.
+    order[k] is the index (of the caller) of the person k of the canonical trip.
+    With ranked=True, the key has the preferences in their order, which is their rank for the "ranked" engine,
+    so 2 people are only the same if they rank the destinations the same.
+
+    :Input:
+        argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+        argv3: ranked : keep the order of the preferences of every person
+
+    :Output, return: (order, canonical preferences, canonical licenses)
+
+    :Time complexity: O(N log N + E), where N is the number of people and E is the number of preferences.
+    :Aux space complexity: O(N + E)
+    '''
+    n = len(preferences)
+    license = bytearray(n)
+    for driver in licenses:
+        license[driver] = 1
+
+    if ranked:
+        keys = [(license[i], tuple(preferences[i])) for i in range(n)]
+    else:
+        keys = [(license[i], tuple(sorted(preferences[i]))) for i in range(n)]
+    order = sorted(range(n), key=keys.__getitem__)
+
+    canonical_preferences = [list(keys[i][1]) for i in order]
+    canonical_licenses = [k for k in range(n) if license[order[k]]]
+    return order, canonical_preferences, canonical_licenses
+
+def trip_key(preferences, licenses, options):
+    '''
+    Function description:
+
+    This function returns the stable hash (sha256, hex) of the trip and the options of allocate.
+    Two trips have the same key if they have the same people in the same order.
+    The key is kept on disk by SolveCache, so the bytes which are hashed must not change.
+
+    :Time complexity: O(E), where E is the number of preferences.
+    :Aux space complexity: O(E)
+    '''
+    import hashlib
+
+    digest = hashlib.sha256()
+    digest.update(repr(sorted(options.items())).encode())
+    digest.update(array("i", licenses).tobytes())
+    for person_preference in preferences:
+        digest.update(array("i", [len(person_preference)]).tobytes())
+        digest.update(array("i", person_preference).tobytes())
+    return digest.hexdigest()
+
+def request_key(preferences, licenses, options):
+    '''
+    Function description:
+
+    This function returns the hash of the trip and the options for AllocationService,
+    it is only kept in memory, so it is faster than trip_key:
+    the number of preferences of every person and all the preferences are hashed as 2 flat arrays,
+    which are made in C, not with 2 arrays for every person.
+
+    :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+    :Aux space complexity: O(N + E)
+    '''
+    import hashlib
+    from itertools import chain
+
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr(sorted(options.items())).encode())
+    digest.update(array("i", licenses).tobytes())
+    if isinstance(preferences, PreferenceArrays):
+        digest.update(memoryview(preferences.offsets).cast("B"))
+        digest.update(memoryview(preferences.targets).cast("B"))
+    else:
+        digest.update(array("q", map(len, preferences)).tobytes())
+        digest.update(array("i", chain.from_iterable(preferences)).tobytes())
+    return digest.digest()
+
+def _pack_car_list(car_list):
+    '''
+    Function description:
+
+    This function packs the car list into bytes: the number of cars, the size of every car, and the people.
+    None is packed into b"".
+
+    :Time complexity: O(N), where N is the number of people.
+    :Aux space complexity: O(N)
+    '''
+    if car_list is None:
+        return b""
+    packed = array("i", [len(car_list)])
+    packed.extend(len(car) for car in car_list)
+    for car in car_list:
+        packed.extend(car)
+    return packed.tobytes()
+
+def _unpack_car_list(value):
+    '''
+    Function description:
+
+    This function is the reverse of _pack_car_list.
+
+    :Time complexity: O(N), where N is the number of people.
+    :Aux space complexity: O(N)
+    '''
+    if not value:
+        return None
+    packed = array("i")
+    packed.frombytes(value)
+    car_max = packed[0]
+    car_list = []
+    start = 1 + car_max
+    for j in range(car_max):
+        car_list.append(packed[start:start + packed[1 + j]].tolist())
+        start += packed[1 + j]
+    return car_list
+
+class Queue:
+
+    def __init__(self) -> None:
+        '''
+        Function description:
+
+        This function returns the queue.
+
+        Approach description:
+
+        It will make the queue with the deque, so serving from the front is O(1).
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.queue: deque[int] = deque()
+
+    def append(self, item):
+        '''
+        Function description:
+
+        This function append the item to the queue.
+
+        Approach description:
+
+        It will append the item to the queue.
+
+        :Input:
+            argv1: item
+            - the item that will be appended to the queue
+
+        :Output, return: None
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.queue.append(item)
+
+    def serve(self):
+        '''
+        Function description:
+
+        This function serve the item from the queue.
+
+        Approach description:
+
+        It will serve the item from the queue.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return self.queue.popleft()
+
+    def __len__(self):
+        '''
+        Function description:
+
+        This function returns the length of the queue.
+
+        Approach description:
+
+        It will return the length of the queue.
+
+        :Output, return: 
+            return the length of the queue
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return len(self.queue)
+
+class FlowNetwork:
+    def __init__(self,preferences):
+
+        '''
+        Function description:
+
+        This function returns the flownetwork with the given preferences and licenses list.
+
+        Between source and sink, we need to visit person vertices and car vertices.
+
+        During allocating, we need to know about the capacity of the car and need to know about the license of the person.
+
+        Approach description:
+
+        Step 1: make all the vertices for people. 
+        Step 2: find the enough number of car, and make vertices for car.
+        Step 3: add source and sink vertices.
+        Step 4: add edges from person to car.
+        Step 5: add edges from car to sink.
+
+        For finding the path,(from source to sink) we will use the BFS algorithm.
+        during finding the path, it will compare the capacity and flow of the edge.
+  
+        :Input:
+            argv1: preferences
+            preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+        
+        :Output, return: None
+
+        :Time complexity: O (N^2), where N is the number of people. 
+        :Aux space complexity: O (N^2), where N is the number of people. 
+        '''
+        
+        self.og_vertices = len(preferences)
+        self.vertices_list = []
+
+        # make all the vertices for each person
+        for i in range(self.og_vertices):
+            p1_vertex = Vertex(i)
+            self.vertices_list.append(p1_vertex)
+
+        # find the enough number of car , which is 2
+        self.car_max = math.ceil(len(preferences)/5)
+
+        # make all the vertices for car/destination
+        self.total_vertices = len(self.vertices_list)
+        for i in range(self.car_max):
+            c1_vertex = Vertex(self.total_vertices + i)
+            self.vertices_list.append(c1_vertex)
+
+        # add source and sink vertices
+        self.vertices_list.append(Vertex(self.total_vertices + self.car_max))
+        self.vertices_list.append(Vertex(self.total_vertices + self.car_max + 1))
+
+        # add edges from person to car
+        for i in range(self.og_vertices):
+            for j in preferences[i]:
+                self.vertices_list[i].add_edge(Edge(i, self.total_vertices + j,1))
+
+        # add edges from car to sink
+        for i in range(self.car_max):
+            self.vertices_list[self.total_vertices + i].add_edge(Edge(self.total_vertices + i, self.total_vertices + self.car_max + 1,5))
+
+        # add source and sink index
+        self.source_index = self.total_vertices + self.car_max
+        self.sink_index = self.total_vertices + self.car_max + 1
+
+        # for find_path, a vertex is discovered if its stamp is the current generation
+        self.generation = 0
+        self.stamp = [0] * len(self.vertices_list)
+        self.previous_edge = [None] * len(self.vertices_list)
+
+        # every vertex is pushed at most once, so the queue is never longer than the number of vertices
+        self.queue_buffer = [0] * len(self.vertices_list)
+
+        # the flags of the people, 1 bit each (see Bitset)
+        self.license = Bitset(self.og_vertices)
+        self.allocated = Bitset(self.og_vertices)
+
+        # AllocationStats, or None
+        self.stats = None
+
+    def add_edges(self,u,v,c):
+        '''
+        Function description:
+
+        Function for adding edges in the graph.
+
+        Approach description:
+
+        It will make edge between u and v with the capacity of c.
+
+        :Input:
+            u : the first vertex
+            v : the second vertex
+            c : the capacity of the edge
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+
+        my_edge = Edge(u,v,c)
+
+        # add edge to the first vertex
+        self.vertices_list[u].append(my_edge)
+
+    def reset(self):
+        '''
+        Function description:
+
+        Function for reset the vertices before running bfs.
+
+        Approach description:
+
+        It will make all the vertices not visited and their previous edge None.
+
+        :Time complexity: O(N), where N is the number of people.
+        :Aux space complexity: O(N / 8), for the visited Bitset.
+        '''
+        self.visited = Bitset(len(self.vertices_list))
+        self.previous_edge = [None] * len(self.vertices_list)
+
+    def bfs(self, source, sink):
+        '''
+        Function description:
+
+        BFS algorithm to find the path from source to sink, the search before find_path.
+        It resets every vertex, serves the vertices from a Queue, and discovers every vertex
+        which can be reached even after the sink is discovered.
+        It returns the same path as find_path, so either of them can be used with augment_path.
+        It is kept to compare the time of a call with find_path (see benchmark.py bfs).
+
+        Approach description:
+
+        There are 2 main steps in this function.
+        Step 1: make all the vertices undiscovered, visited to False and previous to None.
+        Step 2: discover the vertex and mark it as visited.
+
+        But during finding the path, it will compare the capacity and flow of the edge.
+        If the capacity is bigger than flow, it will go down the path.
+        If the capacity is smaller than flow, it will not go down the path because we consider the flow is already full.
+
+        :Input:
+            argv1: source
+            - vertex index of the source
+            argv2: sink
+            - vertex index of the sink
+
+        :Output, return:
+            return the list of the edges from source to sink, or None if there is no path.
+
+        :Time complexity: O(N^2), where N is the number of people.
+        :Aux space complexity: O(N), where N is the number of people.
+        '''
+        # reset the vertices
+        self.reset()
+        visited = self.visited
+        previous_edge = self.previous_edge
+
+        # make the source vertex discovered and visited
+        discovered = Queue()
+        discovered.append(source)
+        visited.add(source)
+
+        # it will run while there is a vertex in the queue
+        while len(discovered) > 0:
+            u = discovered.serve()
+
+            # it will go through all the edges of the vertex, N neighbours
+            for edge in self.vertices_list[u].edges:
+                v = edge.v
+
+                # if the vertex is not discovered and the capacity is bigger than flow, discover the vertex
+                if v not in visited and edge.c - edge.f > 0:
+                    previous_edge[v] = edge
+                    visited.add(v)
+                    discovered.append(v)
+
+        # there is no path from source to sink
+        if sink not in visited:
+            return None
+
+        # backtrack the path
+        path = []
+        v = sink
+        while v != source:
+            edge = previous_edge[v]
+            path.append(edge)
+            v = edge.u
+        path.reverse()
+        return path
+
+    def find_path(self, source, sink):
+        '''
+        Function description:
+
+        BFS algorithm to find the path from source to sink, it returns the edges on the path.
+
+        Approach description:
+
+        Step 1: it does not reset the vertices, the generation is increased instead,
+                and a vertex is discovered only if its stamp is the current generation.
+        Step 2: the queue is the preallocated queue_buffer with head and tail, nothing is allocated.
+        Step 3: it stops as soon as the sink is discovered, and backtracks the edge which discovered the vertex,
+                so augment_path does not need to scan the edges again.
+
+        :Input:
+            argv1: source
+            - vertex index of the source
+            argv2: sink
+            - vertex index of the sink
+
+        :Output, return:
+            return the list of the edges from source to sink, or None if there is no path.
+
+        :Time complexity: O(N^2), where N is the number of people.
+        :Aux space complexity: O(N), where N is the number of people. (the length of the path)
+        '''
+        vertices_list = self.vertices_list
+        stamp = self.stamp
+        previous_edge = self.previous_edge
+        queue = self.queue_buffer
+
+        # new generation, every vertex is undiscovered
+        self.generation += 1
+        generation = self.generation
+
+        stamp[source] = generation
+        queue[0] = source
+        head = 0
+        tail = 1
+
+        # it will run while there is a vertex in the queue
+        while head < tail:
+            u = queue[head]
+            head += 1
+
+            for edge in vertices_list[u].edges:
+                v = edge.v
+
+                # if the vertex is not discovered and the capacity is bigger than flow, discover the vertex
+                if stamp[v] != generation and edge.c - edge.f > 0:
+                    previous_edge[v] = edge
+
+                    # the sink is found, backtrack the path
+                    if v == sink:
+                        path = []
+                        while v != source:
+                            edge = previous_edge[v]
+                            path.append(edge)
+                            v = edge.u
+                        path.reverse()
+                        if self.stats is not None:
+                            self._record_bfs(head)
+                        return path
+
+                    stamp[v] = generation
+                    queue[tail] = v
+                    tail += 1
+
+        if self.stats is not None:
+            self._record_bfs(head)
+        return None
+
+    def _record_bfs(self, head):
+        '''
+        Function description:
+
+        Function for counting the BFS in stats, the vertices which were served and their edges.
+
+        :Time complexity: O(V), where V is the number of vertices which were served.
+        :Aux space complexity: O(1)
+        '''
+        edges = 0
+        for k in range(head):
+            edges += len(self.vertices_list[self.queue_buffer[k]].edges)
+        self.stats.record_bfs(head, edges)
+
+    def memory_bytes(self):
+        '''
+        Function description:
+
+        Function for the memory (bytes) of the vertices and the edges of the graph.
+
+        :Time complexity: O(V + E)
+        :Aux space complexity: O(1)
+        '''
+        import sys
+
+        total = sys.getsizeof(self.vertices_list) + sys.getsizeof(self.stamp) + sys.getsizeof(self.previous_edge) + sys.getsizeof(self.queue_buffer)
+        for flags in (self.license, self.allocated):
+            total += sys.getsizeof(flags.bits)
+        for vertex in self.vertices_list:
+            total += sys.getsizeof(vertex) + sys.getsizeof(vertex.__dict__) + sys.getsizeof(vertex.edges)
+            for edge in vertex.edges:
+                total += sys.getsizeof(edge) + sys.getsizeof(edge.__dict__)
+        return total
+
+    def augment_path(self, path, car_list):
+        '''
+        Function description:
+
+        Function for adding the flow on the path which is returned by find_path.
+
+        Approach description:
+
+        Step 1: find the minimum flow (capacity - flow) on the path.
+        Step 2: add the minimum flow to the edges.
+         - if the edge is from person to car, the person is allocated to the car_list.
+
+        :Input:
+            argv1: path : the list of the edges from source to sink
+            argv2: car_list : the list of cars, it will be updated with the allocated person
+
+        :Output, return: the minimum flow that was added to the path
+
+        :Time complexity: O(1), the path is source - person - car - sink.
+        :Aux space complexity: O(1)
+        '''
+        minimum_flow = min(edge.c - edge.f for edge in path)
+
+        for edge in path:
+            edge.f += minimum_flow
+
+            # if the edge is from person to car, allocate the person to the car_list
+            if edge.v >= self.og_vertices and edge.v <= self.og_vertices + self.car_max:
+                car_list[edge.v - self.og_vertices].append(edge.u)
+                self.allocated.add(edge.u)
+
+        return minimum_flow
+
+    def warm_start(self, car_list):
+        '''
+        Function description:
+
+        Function for the greedy warm start of a phase, it adds the flow of the paths which find_path would find,
+        without a BFS for every path.
+
+        Approach description:
+
+        There are no backward edges, so every path is source - person - car - sink.
+        find_path serves the people in the order of the edges from source, so the path it finds is the first person
+        (in that order) who still has flow from source and has an edge to a car which is not full,
+        and the car is the first one in the edges of the person.
+        The flow only grows during a phase, so a person who can not be allocated now can not be allocated later
+        in the phase, and one pass over the edges from source allocates the same people to the same cars,
+        in the same order, as augment_all.
+
+        :Input:
+            argv1: car_list : the list of cars, it will be updated with the allocated people
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O(1)
+        '''
+        vertices_list = self.vertices_list
+        sink = self.sink_index
+        total_flow = 0
+
+        for source_edge in vertices_list[self.source_index].edges:
+            if source_edge.c - source_edge.f <= 0:
+                continue
+            for edge in vertices_list[source_edge.v].edges:
+                if edge.c - edge.f <= 0:
+                    continue
+                car_edge = None
+                for candidate in vertices_list[edge.v].edges:
+                    if candidate.v == sink and candidate.c - candidate.f > 0:
+                        car_edge = candidate
+                        break
+                if car_edge is not None:
+                    total_flow += self.augment_path([source_edge, edge, car_edge], car_list)
+                    break
+
+        if self.stats is not None:
+            self.stats.augmenting_paths += total_flow
+        return total_flow
+
+    def set_license(self, person):
+        '''
+        Function description:
+
+        Function for giving the license to the person.
+
+        :Input:
+            argv1: person : the index of the person
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.license.add(person)
+
+    def has_license(self, person):
+        '''
+        Function description:
+
+        Function for checking if the person has the license.
+
+        :Input:
+            argv1: person : the index of the person
+
+        :Output, return: True if the person has the license.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return person in self.license
+
+    def add_source_edge(self, person):
+        '''
+        Function description:
+
+        Function for adding the edge from source to the person, with the capacity of 1.
+
+        :Input:
+            argv1: person : the index of the person
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.vertices_list[self.source_index].add_edge(Edge(self.source_index, person, 1))
+
+    def add_source_edges(self, people):
+        '''
+        Function description:
+
+        Function for adding the edges from source to every person of people, in their order.
+
+        :Input:
+            argv1: people : a list of the indices of the people
+
+        :Time complexity: O(K), where K is the number of people.
+        :Aux space complexity: O(K)
+        '''
+        for person in people:
+            self.add_source_edge(person)
+
+    def freeze_car_capacity(self, minimum):
+        '''
+        Function description:
+
+        Function for updating the capacity of the edges from car to sink with max(minimum, edge.f).
+
+        Approach description:
+
+        After the drivers who have only 1 destination are allocated, a car can only take
+        more drivers until it has the minimum number of drivers.
+
+        :Input:
+            argv1: minimum : the minimum capacity of the car
+
+        :Time complexity: O(C), where C is the number of cars.
+        :Aux space complexity: O(1)
+        '''
+        for i in range(self.car_max):
+            for edge in self.vertices_list[self.og_vertices + i].edges:
+                edge.c = max(minimum, edge.f)
+
+    def set_car_capacity(self, capacity):
+        '''
+        Function description:
+
+        Function for updating the capacity of the edges from car to sink.
+
+        :Input:
+            argv1: capacity : the new capacity of the car
+
+        :Time complexity: O(C), where C is the number of cars.
+        :Aux space complexity: O(1)
+        '''
+        for i in range(self.car_max):
+            for edge in self.vertices_list[self.og_vertices + i].edges:
+                edge.c = capacity
+
+class Vertex:
+    def __init__(self, id) -> None:
+        '''
+        Function description:
+        Initialize a new vertex with the given ID.
+        My reference is from the lecutre and tutorial FIT2004.
+        
+        Approach description:
+        it will initialize the vertex with the given ID with the following attributes.
+
+        Attributes:
+        id : id of vertex.
+
+        edges : A list of the edges.
+
+        The flags of the vertex (license, allocated) are kept in the Bitsets of FlowNetwork.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1) 
+        '''
+        self.id = id
+
+        # list
+        self.edges: list[Edge] = []
+
+    def add_edge(self, edge):
+        '''
+        function description:
+        Add edge to the vertex.
+
+        Approach description:
+        It will add the edge to the vertex.
+
+        Attributes:
+        edge : the edge that will be added to the vertex.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.edges.append(edge)
+
+class Edge:
+    def __init__(self, u, v, c):
+        '''
+        Edge from start vertex u, to vertex v, with capacity c.
+        My reference is from the lecutre and tutorial FIT2004.
+        
+        Attributes:
+        u : The vertex ID that the edge is pointing from.
+        v : The vertex ID that the edge is pointing to.
+        c : The capacity of this edge.
+
+        f : The flow of this edgee, we default first as a 0.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.u = u
+        self.v = v
+        self.c = c
+        self.f = 0
+
+class LazyFlowNetwork(FlowNetwork):
+    def __init__(self, preferences):
+        '''
+        Function description:
+
+        This function returns the same flow network as FlowNetwork, but the edges from a person to the cars
+        are only made when they are needed (the "lazy" backend).
+
+        A person who is allocated by warm_start is never expanded by a BFS again (the edge from source is full,
+        and there are no backward edges), so only the edge with the flow is made for that person.
+        With long preference lists, most of the edges of FlowNetwork are never made.
+
+        Approach description:
+
+        Step 1: make a LazyVertex for every person, it keeps the index of the person and the preferences,
+                and its edges are made from the preferences the first time they are read (a BFS expansion).
+        Step 2: make the vertices of the cars with their edge to sink, and source and sink, as FlowNetwork.
+        Step 3: warm_start walks the preferences of a person who has no edges yet, and makes only the edge
+                to the first car which is not full (see warm_start).
+
+        It gives the same car list as FlowNetwork, the edges of a person are in the order of the preferences.
+
+        :Input:
+            argv1: preferences
+            preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+
+        :Output, return: None
+
+        :Time complexity: O (N), where N is the number of people.
+        :Aux space complexity: O (N)
+        '''
+        self.og_vertices = len(preferences)
+        self.preferences = preferences
+
+        # make all the vertices for each person, without edges
+        self.vertices_list = [LazyVertex(i, preferences, self.og_vertices) for i in range(self.og_vertices)]
+
+        # find the enough number of car
+        self.car_max = math.ceil(len(preferences)/5)
+
+        # make all the vertices for car/destination
+        self.total_vertices = len(self.vertices_list)
+        for i in range(self.car_max):
+            self.vertices_list.append(Vertex(self.total_vertices + i))
+
+        # add source and sink vertices
+        self.vertices_list.append(Vertex(self.total_vertices + self.car_max))
+        self.vertices_list.append(Vertex(self.total_vertices + self.car_max + 1))
+
+        # add edges from car to sink
+        for i in range(self.car_max):
+            self.vertices_list[self.total_vertices + i].add_edge(Edge(self.total_vertices + i, self.total_vertices + self.car_max + 1,5))
+
+        # add source and sink index
+        self.source_index = self.total_vertices + self.car_max
+        self.sink_index = self.total_vertices + self.car_max + 1
+
+        # for find_path, a vertex is discovered if its stamp is the current generation
+        self.generation = 0
+        self.stamp = [0] * len(self.vertices_list)
+        self.previous_edge = [None] * len(self.vertices_list)
+        self.queue_buffer = [0] * len(self.vertices_list)
+
+        # the flags of the people, 1 bit each (see Bitset)
+        self.license = Bitset(self.og_vertices)
+        self.allocated = Bitset(self.og_vertices)
+
+        # AllocationStats, or None
+        self.stats = None
+
+    def warm_start(self, car_list):
+        '''
+        Function description:
+
+        Function for the greedy warm start of a phase, same as FlowNetwork.warm_start.
+
+        Approach description:
+
+        A person who has no edges yet has no flow, so every edge of the person still has capacity - flow = 1,
+        and the first car of the preferences which is not full is the car that FlowNetwork.warm_start finds.
+        Only the edge to that car is made, and it is kept in flow_edge of the LazyVertex,
+        so it is the same edge object when the other edges are made.
+        A person whose edges were made already is checked with its edges, as FlowNetwork.warm_start.
+
+        :Input:
+            argv1: car_list : the list of cars, it will be updated with the allocated people
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O(1)
+        '''
+        vertices_list = self.vertices_list
+        preferences = self.preferences
+        og_vertices = self.og_vertices
+        total_flow = 0
+
+        for source_edge in vertices_list[self.source_index].edges:
+            if source_edge.c - source_edge.f <= 0:
+                continue
+            person = source_edge.v
+            vertex = vertices_list[person]
+            path = None
+
+            if "edges" in vertex.__dict__ or vertex.flow_edge is not None:
+                for edge in vertex.edges:
+                    if edge.c - edge.f <= 0:
+                        continue
+                    car_edge = self._car_edge(edge.v)
+                    if car_edge is not None:
+                        path = [source_edge, edge, car_edge]
+                        break
+            else:
+                # the edges of the person are not made yet, only the edge with the flow is made
+                for k, j in enumerate(preferences[person]):
+                    car_edge = self._car_edge(og_vertices + j)
+                    if car_edge is not None:
+                        edge = Edge(person, og_vertices + j, 1)
+                        vertex.flow_edge = (k, edge)
+                        path = [source_edge, edge, car_edge]
+                        break
+
+            if path is not None:
+                total_flow += self.augment_path(path, car_list)
+
+        if self.stats is not None:
+            self.stats.augmenting_paths += total_flow
+        return total_flow
+
+    def _car_edge(self, car):
+        '''
+        Function description:
+
+        This function returns the edge from the car to sink if the car is not full, or None.
+
+        :Time complexity: O(1), a car has 1 edge.
+        :Aux space complexity: O(1)
+        '''
+        for candidate in self.vertices_list[car].edges:
+            if candidate.v == self.sink_index and candidate.c - candidate.f > 0:
+                return candidate
+        return None
+
+    def memory_bytes(self):
+        '''
+        Function description:
+
+        Function for the memory (bytes) of the vertices and the edges which were made, see FlowNetwork.memory_bytes.
+
+        :Time complexity: O(V + E), where E is the number of edges which were made.
+        :Aux space complexity: O(1)
+        '''
+        import sys
+
+        total = sys.getsizeof(self.vertices_list) + sys.getsizeof(self.stamp) + sys.getsizeof(self.previous_edge) + sys.getsizeof(self.queue_buffer)
+        for flags in (self.license, self.allocated):
+            total += sys.getsizeof(flags.bits)
+        for vertex in self.vertices_list:
+            total += sys.getsizeof(vertex) + sys.getsizeof(vertex.__dict__)
+
+            # the edges are not read with vertex.edges, so they are not made
+            edges = vertex.__dict__.get("edges")
+            if edges is not None:
+                total += sys.getsizeof(edges)
+            elif vertex.flow_edge is not None:
+                edges = [vertex.flow_edge[1]]
+            else:
+                edges = []
+            for edge in edges:
+                total += sys.getsizeof(edge) + sys.getsizeof(edge.__dict__)
+        return total
+
+class LazyVertex(Vertex):
+    def __init__(self, id, preferences, car_offset):
+        '''
+        Function description:
+
+        This function returns the vertex of a person of LazyFlowNetwork, whose edges are made
+        the first time vertex.edges is read.
+
+        Attributes:
+        id : id of vertex, the index of the person.
+        preferences : the preferences of every person, the edges are made from preferences[id].
+        car_offset : the index of the vertex of car 0.
+        flow_edge : (position, edge) of the edge which was made by warm_start, or None.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.id = id
+
+        # edges is not set, so __getattr__ makes it
+        self.preferences = preferences
+        self.car_offset = car_offset
+        self.flow_edge = None
+
+    def __getattr__(self, name):
+        '''
+        Function description:
+
+        This function is only called for an attribute which is not set, it makes the edges of the person
+        from the preferences, with the edge of flow_edge at its position, and keeps them in edges.
+        After that, vertex.edges is a normal attribute.
+
+        :Time complexity: O(P), where P is the number of the preferences of the person.
+        :Aux space complexity: O(P)
+        '''
+        if name != "edges":
+            raise AttributeError(name)
+        edges = [Edge(self.id, self.car_offset + j, 1) for j in self.preferences[self.id]]
+        if self.flow_edge is not None:
+            edges[self.flow_edge[0]] = self.flow_edge[1]
+        self.edges = edges
+        return edges
+
+class CompactFlowNetwork:
+    def __init__(self, preferences):
+        '''
+        Function description:
+
+        This function returns the same flow network as FlowNetwork, but without Vertex and Edge objects.
+
+        Every edge is kept in the parallel arrays u, v, c and f (CSR, compressed adjacency),
+        and the edges of vertex x are the indices offsets[x] .. offsets[x+1] - 1.
+        The state of the vertices is kept in flat arrays too, previous and stamp in arrays and lists and the flags
+        of the people (license, allocated) in Bitsets, so a person costs a few bytes instead of a Vertex with its own __dict__.
+
+        Approach description:
+
+        Step 1: make the edges from person to car, row by row, and keep the row offsets.
+        Step 2: make the edges from car to sink.
+        Step 3: source and sink have no fixed edges, the edges from source are added during allocation
+                to the end of the arrays, and their indices are kept in source_edges.
+        Step 4: make the arrays for the state of the vertices.
+
+        :Input:
+            argv1: preferences
+            preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+
+        :Output, return: None
+
+        :Time complexity: O (N^2), where N is the number of people.
+        :Aux space complexity: O (N^2), where N is the number of people.
+        '''
+        self.og_vertices = len(preferences)
+        self.total_vertices = self.og_vertices
+
+        # find the enough number of car
+        self.car_max = math.ceil(len(preferences)/5)
+
+        # add source and sink index
+        self.source_index = self.total_vertices + self.car_max
+        self.sink_index = self.total_vertices + self.car_max + 1
+        self.vertex_count = self.total_vertices + self.car_max + 2
+
+        self.offsets = array("i", [0])
+        self.u = array("i")
+        self.v = array("i")
+
+        # add edges from person to car
+        for i in range(self.og_vertices):
+            for j in preferences[i]:
+                self.u.append(i)
+                self.v.append(self.total_vertices + j)
+            self.offsets.append(len(self.v))
+
+        # add edges from car to sink
+        self.car_edges_start = len(self.v)
+        for i in range(self.car_max):
+            self.u.append(self.total_vertices + i)
+            self.v.append(self.sink_index)
+            self.offsets.append(len(self.v))
+
+        # source and sink rows are empty
+        self.offsets.append(len(self.v))
+        self.offsets.append(len(self.v))
+
+        # capacity 1 from person to car, 5 from car to sink, and no flow yet
+        self.c = array("i", [1]) * self.car_edges_start + array("i", [5]) * self.car_max
+        self.f = array("i", [0]) * len(self.v)
+
+        # indices of the edges from source, in the order they are added
+        self.source_edges = array("i")
+
+        # state of the vertices, the flags of the people are 1 bit each (see Bitset)
+        self.license = Bitset(self.og_vertices)
+        self.allocated = Bitset(self.og_vertices)
+
+        # backtracking, the index of the edge which discovered the vertex
+        self.previous = array("i", [-1]) * self.vertex_count
+
+        # for find_path, a vertex is discovered if its stamp is the current generation
+        # (lists, because reading a list is faster than reading an array in the BFS loop)
+        self.generation = 0
+        self.stamp = [0] * self.vertex_count
+        self.queue_buffer = [0] * self.vertex_count
+
+        # AllocationStats, or None
+        self.stats = None
+
+    def warm_start(self, car_list):
+        '''
+        Function description:
+
+        Function for the greedy warm start of a phase, it allocates the same people to the same cars
+        as augment_all, without a BFS for every path (see FlowNetwork.warm_start).
+
+        :Input:
+            argv1: car_list : the list of cars, it will be updated with the allocated people
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O(1)
+        '''
+        offsets = self.offsets
+        edge_v = self.v
+        c = self.c
+        f = self.f
+        allocated = self.allocated
+        og_vertices = self.og_vertices
+        car_edges_start = self.car_edges_start
+        total_flow = 0
+
+        for source_edge in self.source_edges:
+            if c[source_edge] - f[source_edge] <= 0:
+                continue
+            person = edge_v[source_edge]
+            for e in range(offsets[person], offsets[person + 1]):
+                if c[e] - f[e] <= 0:
+                    continue
+                car = edge_v[e] - og_vertices
+                car_edge = car_edges_start + car
+                if c[car_edge] - f[car_edge] > 0:
+                    f[source_edge] += 1
+                    f[e] += 1
+                    f[car_edge] += 1
+                    car_list[car].append(person)
+                    allocated.add(person)
+                    total_flow += 1
+                    break
+
+        if self.stats is not None:
+            self.stats.augmenting_paths += total_flow
+        return total_flow
+
+    def set_license(self, person):
+        '''
+        Function description:
+
+        Function for giving the license to the person.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.license.add(person)
+
+    def has_license(self, person):
+        '''
+        Function description:
+
+        Function for checking if the person has the license.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return person in self.license
+
+    def add_source_edge(self, person):
+        '''
+        Function description:
+
+        Function for adding the edge from source to the person, with the capacity of 1.
+        The edge is appended to the end of the edge arrays.
+
+        :Time complexity: O(1) amortized
+        :Aux space complexity: O(1)
+        '''
+        self.source_edges.append(len(self.v))
+        self.u.append(self.source_index)
+        self.v.append(person)
+        self.c.append(1)
+        self.f.append(0)
+
+    def add_source_edges(self, people):
+        '''
+        Function description:
+
+        Function for adding the edges from source to every person of people, in their order,
+        with one extend of every array.
+
+        :Input:
+            argv1: people : a list of the indices of the people
+
+        :Time complexity: O(K) amortized, where K is the number of people.
+        :Aux space complexity: O(K)
+        '''
+        start = len(self.v)
+        self.source_edges.extend(range(start, start + len(people)))
+        self.u.extend(array("i", [self.source_index]) * len(people))
+        self.v.extend(people)
+        self.c.extend(array("i", [1]) * len(people))
+        self.f.extend(array("i", [0]) * len(people))
+
+    def freeze_car_capacity(self, minimum):
+        '''
+        Function description:
+
+        Function for updating the capacity of the edges from car to sink with max(minimum, f).
+
+        :Time complexity: O(C), where C is the number of cars.
+        :Aux space complexity: O(1)
+        '''
+        c = self.c
+        f = self.f
+        for e in range(self.car_edges_start, self.car_edges_start + self.car_max):
+            c[e] = max(minimum, f[e])
+
+    def set_car_capacity(self, capacity):
+        '''
+        Function description:
+
+        Function for updating the capacity of the edges from car to sink.
+
+        :Time complexity: O(C), where C is the number of cars.
+        :Aux space complexity: O(1)
+        '''
+        c = self.c
+        for e in range(self.car_edges_start, self.car_edges_start + self.car_max):
+            c[e] = capacity
+
+    def bfs(self, source, sink):
+        '''
+        Function description:
+
+        BFS algorithm to find the path from source to sink, same as FlowNetwork.bfs,
+        the search before find_path, which is kept to compare the time of a call (see benchmark.py bfs).
+        It returns the same path as find_path.
+
+        Approach description:
+
+        Step 1: clear the visited Bitset.
+        Step 2: discover the vertex with the edges that still have capacity - flow > 0, until the Queue is empty.
+        Step 3: backtrack the edge which discovered the vertex, from the sink.
+
+        :Input:
+            argv1: source
+            - vertex index of the source
+            argv2: sink
+            - vertex index of the sink
+
+        :Output, return:
+            return the list of the edge indices from source to sink, or None if there is no path.
+
+        :Time complexity: O(N^2), where N is the number of people.
+        :Aux space complexity: O(N), where N is the number of people.
+        '''
+        offsets = self.offsets
+        edge_u = self.u
+        edge_v = self.v
+        c = self.c
+        f = self.f
+        previous = self.previous
+
+        # reset the vertices
+        visited = Bitset(self.vertex_count)
+        visited.add(source)
+        discovered = Queue()
+        discovered.append(source)
+
+        # it will run while there is a vertex in the queue
+        while len(discovered) > 0:
+            u = discovered.serve()
+            if u == self.source_index:
+                edges = self.source_edges
+            else:
+                edges = range(offsets[u], offsets[u + 1])
+
+            for e in edges:
+                v = edge_v[e]
+
+                # if the vertex is not discovered and the capacity is bigger than flow, discover the vertex
+                if v not in visited and c[e] - f[e] > 0:
+                    previous[v] = e
+                    visited.add(v)
+                    discovered.append(v)
+
+        # there is no path from source to sink
+        if sink not in visited:
+            return None
+
+        # backtrack the path
+        path = []
+        v = sink
+        while v != source:
+            e = previous[v]
+            path.append(e)
+            v = edge_u[e]
+        path.reverse()
+        return path
+
+    def find_path(self, source, sink):
+        '''
+        Function description:
+
+        BFS algorithm to find the path from source to sink, same as FlowNetwork.find_path.
+        It returns the list of the edge indices on the path, or None if there is no path.
+
+        Approach description:
+
+        The discovered vertices are marked with the current generation in stamp,
+        so nothing is reset or allocated before the search, and it stops as soon as the sink is discovered.
+
+        :Time complexity: O(N^2), where N is the number of people.
+        :Aux space complexity: O(N), where N is the number of people. (the length of the path)
+        '''
+        offsets = self.offsets
+        edge_u = self.u
+        edge_v = self.v
+        c = self.c
+        f = self.f
+        previous = self.previous
+        stamp = self.stamp
+        queue = self.queue_buffer
+
+        # new generation, every vertex is undiscovered
+        self.generation += 1
+        generation = self.generation
+
+        stamp[source] = generation
+        queue[0] = source
+        head = 0
+        tail = 1
+
+        # it will run while there is a vertex in the queue
+        while head < tail:
+            u = queue[head]
+            head += 1
+
+            if u == self.source_index:
+                edges = self.source_edges
+            else:
+                edges = range(offsets[u], offsets[u + 1])
+
+            for e in edges:
+                v = edge_v[e]
+
+                # if the vertex is not discovered and the capacity is bigger than flow, discover the vertex
+                if stamp[v] != generation and c[e] - f[e] > 0:
+                    previous[v] = e
+
+                    # the sink is found, backtrack the path
+                    if v == sink:
+                        path = []
+                        while v != source:
+                            e = previous[v]
+                            path.append(e)
+                            v = edge_u[e]
+                        path.reverse()
+                        if self.stats is not None:
+                            self._record_bfs(head)
+                        return path
+
+                    stamp[v] = generation
+                    queue[tail] = v
+                    tail += 1
+
+        if self.stats is not None:
+            self._record_bfs(head)
+        return None
+
+    def _record_bfs(self, head):
+        '''
+        Function description:
+
+        Function for counting the BFS in stats, the vertices which were served and their edges.
+
+        :Time complexity: O(V), where V is the number of vertices which were served.
+        :Aux space complexity: O(1)
+        '''
+        edges = 0
+        for k in range(head):
+            u = self.queue_buffer[k]
+            if u == self.source_index:
+                edges += len(self.source_edges)
+            else:
+                edges += self.offsets[u + 1] - self.offsets[u]
+        self.stats.record_bfs(head, edges)
+
+    def memory_bytes(self):
+        '''
+        Function description:
+
+        Function for the memory (bytes) of the arrays of the graph.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        import sys
+
+        total = 0
+        for buffer in (self.offsets, self.u, self.v, self.c, self.f, self.source_edges, self.previous,
+                       self.license.bits, self.allocated.bits, self.stamp, self.queue_buffer):
+            total += sys.getsizeof(buffer)
+        return total
+
+    def car_list(self):
+        '''
+        Function description:
+
+        Function for reading the cars from the flow of the edges from person to car,
+        the people of a car are in the order of their index (e.g. of a network of load_network).
+
+        :Output, return: the list of cars
+
+        :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O(N)
+        '''
+        offsets = self.offsets
+        edge_v = self.v
+        f = self.f
+        car_list = [[] for _ in range(self.car_max)]
+        for person in range(self.og_vertices):
+            for e in range(offsets[person], offsets[person + 1]):
+                if f[e] > 0:
+                    car_list[edge_v[e] - self.og_vertices].append(person)
+                    break
+        return car_list
+
+    def augment_path(self, path, car_list):
+        '''
+        Function description:
+
+        Function for adding the flow on the path which is returned by find_path.
+
+        :Input:
+            argv1: path : the list of the edge indices from source to sink
+            argv2: car_list : the list of cars, it will be updated with the allocated person
+
+        :Output, return: the minimum flow that was added to the path
+
+        :Time complexity: O(1), the path is source - person - car - sink.
+        :Aux space complexity: O(1)
+        '''
+        edge_u = self.u
+        edge_v = self.v
+        c = self.c
+        f = self.f
+
+        minimum_flow = min(c[e] - f[e] for e in path)
+
+        for e in path:
+            f[e] += minimum_flow
+
+            # if the edge is from person to car, allocate the person to the car_list
+            if edge_v[e] >= self.og_vertices and edge_v[e] <= self.og_vertices + self.car_max:
+                car_list[edge_v[e] - self.og_vertices].append(edge_u[e])
+                self.allocated.add(edge_u[e])
+
+        return minimum_flow
+
+class NumpyFlowNetwork(CompactFlowNetwork):
+    def __init__(self, preferences):
+        '''
+        Function description:
+
+        This function returns the same flow network as CompactFlowNetwork, but the edge arrays are made
+        with a few NumPy operations instead of a Python loop over every preference,
+        and the capacity of the cars is rewritten with array operations.
+
+        The arrays are still array("i"), so the BFS of CompactFlowNetwork reads them as fast as before,
+        and the allocation is the same. NumPy reads and writes them through np.frombuffer,
+        only for the time of one operation (an array which is exporting its buffer can not be appended).
+        Without NumPy, it is a CompactFlowNetwork.
+
+        Approach description:
+
+        Step 1: flatten the preferences to (lengths, targets), see _flatten_preferences.
+        Step 2: u is every person repeated lengths times, v is the car vertex of every target,
+                and the row offsets are the cumulative sum of the lengths.
+        Step 3: append the edges from car to sink and the capacities, and copy them to the array("i").
+
+        :Input:
+            argv1: preferences
+            preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+
+        :Output, return: None
+
+        :Time complexity: O (E), where E is the number of preferences.
+        :Aux space complexity: O (E), where E is the number of preferences.
+        '''
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+
+        self.numpy = numpy
+        if numpy is None:
+            CompactFlowNetwork.__init__(self, preferences)
+            return
+
+        self.og_vertices = len(preferences)
+        self.total_vertices = self.og_vertices
+
+        # find the enough number of car
+        self.car_max = math.ceil(len(preferences)/5)
+
+        # add source and sink index
+        self.source_index = self.total_vertices + self.car_max
+        self.sink_index = self.total_vertices + self.car_max + 1
+        self.vertex_count = self.total_vertices + self.car_max + 2
+
+        n = self.og_vertices
+        lengths, targets = _flatten_preferences(numpy, preferences)
+        self.car_edges_start = len(targets)
+        cars = numpy.arange(self.car_max, dtype="i")
+
+        # add edges from person to car, and from car to sink
+        u = numpy.concatenate((numpy.repeat(numpy.arange(n, dtype="i"), lengths), n + cars))
+        v = numpy.concatenate((n + targets, numpy.full(self.car_max, self.sink_index, dtype="i")))
+
+        # the rows of the people, the rows of the cars (1 edge each), and the empty rows of source and sink
+        offsets = numpy.empty(self.vertex_count + 1, dtype="i")
+        offsets[0] = 0
+        numpy.cumsum(lengths, out=offsets[1:n + 1])
+        offsets[n + 1:n + 1 + self.car_max] = self.car_edges_start + 1 + cars
+        offsets[n + 1 + self.car_max:] = len(v)
+
+        # capacity 1 from person to car, 5 from car to sink, and no flow yet
+        c = numpy.ones(len(v), dtype="i")
+        c[self.car_edges_start:] = 5
+
+        self.offsets = _int_array(offsets)
+        self.u = _int_array(u)
+        self.v = _int_array(v)
+        self.c = _int_array(c)
+        self.f = array("i", bytes(c.nbytes))
+
+        # indices of the edges from source, in the order they are added
+        self.source_edges = array("i")
+
+        # state of the vertices, the flags of the people are 1 bit each (see Bitset)
+        self.license = Bitset(self.og_vertices)
+        self.allocated = Bitset(self.og_vertices)
+
+        # backtracking, the index of the edge which discovered the vertex
+        self.previous = array("i", [-1]) * self.vertex_count
+
+        # for find_path, a vertex is discovered if its stamp is the current generation
+        self.generation = 0
+        self.stamp = [0] * self.vertex_count
+        self.queue_buffer = [0] * self.vertex_count
+
+        # AllocationStats, or None
+        self.stats = None
+
+    def freeze_car_capacity(self, minimum):
+        '''
+        Function description:
+
+        Function for updating the capacity of the edges from car to sink with max(minimum, f),
+        as one array operation.
+
+        :Time complexity: O(C), where C is the number of cars.
+        :Aux space complexity: O(1)
+        '''
+        if self.numpy is None:
+            return CompactFlowNetwork.freeze_car_capacity(self, minimum)
+        numpy = self.numpy
+        cars = slice(self.car_edges_start, self.car_edges_start + self.car_max)
+        c = numpy.frombuffer(self.c, dtype="i")
+        f = numpy.frombuffer(self.f, dtype="i")
+        numpy.maximum(f[cars], minimum, out=c[cars])
+
+    def set_car_capacity(self, capacity):
+        '''
+        Function description:
+
+        Function for updating the capacity of the edges from car to sink, as one array operation.
+
+        :Time complexity: O(C), where C is the number of cars.
+        :Aux space complexity: O(1)
+        '''
+        if self.numpy is None:
+            return CompactFlowNetwork.set_car_capacity(self, capacity)
+        c = self.numpy.frombuffer(self.c, dtype="i")
+        c[self.car_edges_start:self.car_edges_start + self.car_max] = capacity
+
+class KernelFlowNetwork(CompactFlowNetwork):
+    # the module of the kernel, None to import _getaway_kernel (the extension of mypyc if it is built)
+    kernel = None
+
+    def __init__(self, preferences):
+        '''
+        Function description:
+
+        This function returns the same flow network as CompactFlowNetwork, but the edges are kept in lists,
+        and the build, the warm start and the BFS run in _getaway_kernel, which can be compiled by mypyc
+        (see _getaway_kernel.py). The compiled kernel works on the lists without an attribute lookup
+        or a bytecode for every edge. If it is not compiled, the same code runs in the interpreter,
+        and if _getaway_kernel can not be imported at all, it is a CompactFlowNetwork.
+        Like every backend, it is only used by the "phased" engine, the default engine ("bipartite", see choose_engine)
+        does not build a flow network, so it is not faster with the kernel.
+
+        The edges from source are appended to the end of the lists, so they are the edges from
+        source_start to the end, and every row of the BFS is a range of edge indices.
+
+        Approach description:
+
+        Step 1: make the rows of the edges with kernel.build_edges.
+        Step 2: make the lists of capacity and flow, and the state of the vertices as CompactFlowNetwork.
+
+        :Input:
+            argv1: preferences
+            preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+
+        :Output, return: None
+
+        :Time complexity: O (N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O (N + E), where N is the number of people and E is the number of preferences.
+        '''
+        kernel = self.kernel
+        if kernel is None:
+            try:
+                import _getaway_kernel as kernel
+            except ImportError:
+                kernel = None
+
+        self.kernel = kernel
+        if kernel is None:
+            CompactFlowNetwork.__init__(self, preferences)
+            return
+
+        self.og_vertices = len(preferences)
+        self.total_vertices = self.og_vertices
+
+        # find the enough number of car
+        self.car_max = math.ceil(len(preferences)/5)
+
+        # add source and sink index
+        self.source_index = self.total_vertices + self.car_max
+        self.sink_index = self.total_vertices + self.car_max + 1
+        self.vertex_count = self.total_vertices + self.car_max + 2
+
+        # add edges from person to car, and from car to sink
+        self.offsets, self.u, self.v = kernel.build_edges(preferences, self.og_vertices, self.car_max, self.sink_index)
+        self.car_edges_start = self.offsets[self.og_vertices]
+
+        # capacity 1 from person to car, 5 from car to sink, and no flow yet
+        self.c = [1] * self.car_edges_start + [5] * self.car_max
+        self.f = [0] * len(self.v)
+
+        # the edges from source are appended from here, their indices are kept in source_edges too
+        self.source_start = len(self.v)
+        self.source_edges = []
+
+        # state of the vertices, the flags of the people are 1 bit each (see Bitset)
+        self.license = Bitset(self.og_vertices)
+        self.allocated = Bitset(self.og_vertices)
+
+        # backtracking, the index of the edge which discovered the vertex
+        self.previous = [-1] * self.vertex_count
+
+        # for find_path, a vertex is discovered if its stamp is the current generation
+        self.generation = 0
+        self.stamp = [0] * self.vertex_count
+        self.queue_buffer = [0] * self.vertex_count
+
+        # AllocationStats, or None
+        self.stats = None
+
+    def add_source_edge(self, person):
+        '''
+        Function description:
+
+        Function for adding the edge from source to the person, with the capacity of 1.
+        The edge is appended to the end of the edge lists.
+
+        :Time complexity: O(1) amortized
+        :Aux space complexity: O(1)
+        '''
+        if self.kernel is None:
+            return CompactFlowNetwork.add_source_edge(self, person)
+        self.source_edges.append(len(self.v))
+        self.u.append(self.source_index)
+        self.v.append(person)
+        self.c.append(1)
+        self.f.append(0)
+
+    def add_source_edges(self, people):
+        '''
+        Function description:
+
+        Function for adding the edges from source to every person of people, in their order,
+        with one extend of every list.
+
+        :Time complexity: O(K) amortized, where K is the number of people.
+        :Aux space complexity: O(K)
+        '''
+        if self.kernel is None:
+            return CompactFlowNetwork.add_source_edges(self, people)
+        start = len(self.v)
+        self.source_edges.extend(range(start, start + len(people)))
+        self.u.extend([self.source_index] * len(people))
+        self.v.extend(people)
+        self.c.extend([1] * len(people))
+        self.f.extend([0] * len(people))
+
+    def warm_start(self, car_list):
+        '''
+        Function description:
+
+        Function for the greedy warm start of a phase with kernel.warm_start (see CompactFlowNetwork.warm_start).
+
+        :Input:
+            argv1: car_list : the list of cars, it will be updated with the allocated people
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O(N), where N is the number of people.
+        '''
+        if self.kernel is None:
+            return CompactFlowNetwork.warm_start(self, car_list)
+        allocated = self.kernel.warm_start(self.offsets, self.v, self.c, self.f, self.source_start,
+                                           self.og_vertices, self.car_edges_start, car_list)
+        self.allocated.update(allocated)
+
+        total_flow = len(allocated)
+        if self.stats is not None:
+            self.stats.augmenting_paths += total_flow
+        return total_flow
+
+    def find_path(self, source, sink):
+        '''
+        Function description:
+
+        BFS algorithm to find the path from source to sink with kernel.find_path (see CompactFlowNetwork.find_path).
+        It returns the list of the edge indices on the path, or None if there is no path.
+
+        :Time complexity: O(N^2), where N is the number of people.
+        :Aux space complexity: O(N), where N is the number of people. (the length of the path)
+        '''
+        if self.kernel is None:
+            return CompactFlowNetwork.find_path(self, source, sink)
+
+        # new generation, every vertex is undiscovered
+        self.generation += 1
+        path, head = self.kernel.find_path(self.offsets, self.u, self.v, self.c, self.f, self.source_start,
+                                           self.source_index, source, sink, self.previous, self.stamp,
+                                           self.queue_buffer, self.generation)
+        if self.stats is not None:
+            self._record_bfs(head)
+        return path
+
+class SpillFlowNetwork(CompactFlowNetwork):
+    def __init__(self, preferences, budget=None, directory=None):
+        '''
+        Function description:
+
+        This function returns the same flow network as CompactFlowNetwork, but every array of the edges
+        (offsets, u, v, c and f) and of the state of the BFS (previous, stamp and queue) is kept in a temporary file
+        which is memory-mapped, so a trip with millions of people does not need its edges in memory.
+        Only the Bitsets of the people (2 bits per person) are in memory.
+        The budget is the one of the network only, the preferences and the car list of allocate_phased,
+        and a list of people which is passed to add_source_edges, are not bounded.
+        The files are deleted by close, or at the end of "with SpillFlowNetwork(preferences) as network".
+
+        The pages of the files which are read or written are kept in memory by the operating system,
+        so after about budget bytes of the files were read or written, the pages which were written
+        are written back to the files (flush) and every page is dropped from the memory of the process
+        (madvise MADV_DONTNEED), and they are read again from the page cache or the disk when they are needed.
+        The files are written in pieces of budget bytes too, so the build never has the edges in memory.
+
+        The edges of a vertex are one row of contiguous edge indices (CSR), and the edges from source are
+        the contiguous edges from source_start to the end, so the BFS reads every row in the order of the files.
+        The order of the BFS is the order of CompactFlowNetwork, so the car list is the same.
+
+        Approach description:
+
+        Step 1: write the edges from person to car, row by row, and the edges from car to sink to the files.
+        Step 2: write the capacities, the flow and the state of the BFS are the zeros of the new files.
+        Step 3: map the files, with space for an edge from source to every person.
+
+        :Input:
+            argv1: preferences
+            preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+                          A PreferenceArrays of load_trip (a memory-mapped binary trip) is not read into memory either.
+            argv2: budget : the bytes of the files which are kept in memory, SPILL_BUDGET by default
+            argv3: directory : the directory of the temporary files, SPILL_DIRECTORY by default (None for the one of tempfile)
+
+        :Output, return: None
+
+        :Time complexity: O (N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O (N) bits and O (budget) bytes in memory, O (N + E) on the disk.
+        '''
+        import tempfile
+
+        self.budget = SPILL_BUDGET if budget is None else budget
+        self.directory = SPILL_DIRECTORY if directory is None else directory
+
+        self.og_vertices = len(preferences)
+        self.total_vertices = self.og_vertices
+
+        # find the enough number of car
+        self.car_max = math.ceil(len(preferences)/5)
+
+        # add source and sink index
+        self.source_index = self.total_vertices + self.car_max
+        self.sink_index = self.total_vertices + self.car_max + 1
+        self.vertex_count = self.total_vertices + self.car_max + 2
+
+        # a temporary file for every array, it is deleted when it is closed
+        self.files = {}
+        for name in ("offsets", "u", "v", "c", "f", "previous", "stamp", "queue"):
+            self.files[name] = tempfile.TemporaryFile(dir=self.directory)
+
+        # the number of integers which are written at once
+        piece = max(1024, self.budget // 16)
+        offsets = array("i", [0])
+        edge_u = array("i")
+        edge_v = array("i")
+        written = 0
+
+        # add edges from person to car
+        for i in range(self.og_vertices):
+            for j in preferences[i]:
+                edge_u.append(i)
+                edge_v.append(self.total_vertices + j)
+            offsets.append(written + len(edge_v))
+            if len(edge_v) >= piece:
+                written = self._write_edges(edge_u, edge_v, written)
+            if len(offsets) >= piece:
+                self._write("offsets", offsets)
+
+        # add edges from car to sink
+        self.car_edges_start = written + len(edge_v)
+        for i in range(self.car_max):
+            edge_u.append(self.total_vertices + i)
+            edge_v.append(self.sink_index)
+            offsets.append(written + len(edge_v))
+            if len(edge_v) >= piece:
+                written = self._write_edges(edge_u, edge_v, written)
+        edges = self._write_edges(edge_u, edge_v, written)
+
+        # source and sink rows are empty
+        offsets.append(edges)
+        offsets.append(edges)
+        self._write("offsets", offsets)
+
+        # capacity 1 from person to car, 5 from car to sink
+        for capacity, count in ((1, self.car_edges_start), (5, self.car_max)):
+            while count > 0:
+                self._write("c", array("i", [capacity]) * min(count, piece))
+                count -= piece
+
+        # the edges from source are appended from here, with space for an edge to every person
+        self.source_start = edges
+        self.edge_count = edges
+        self.views = {}
+        self.buffers = {}
+        self._map_edges(edges + self.og_vertices)
+        for name in ("offsets", "previous", "stamp", "queue"):
+            self._map(name, self.vertex_count + 1 if name == "offsets" else self.vertex_count)
+        self.offsets = self.views["offsets"]
+        self.previous = self.views["previous"]
+        self.stamp = self.views["stamp"]
+        self.queue_buffer = self.views["queue"]
+
+        # the edges which are read or written until the pages are dropped, about 12 bytes of u, v, c or f
+        # for every edge and 16 bytes of offsets and the state of the BFS for every vertex
+        self.touched = 0
+        self.release_edges = max(1, self.budget // 16)
+
+        # state of the vertices, the flags of the people are 1 bit each (see Bitset)
+        self.license = Bitset(self.og_vertices)
+        self.allocated = Bitset(self.og_vertices)
+
+        # for find_path, a vertex is discovered if its stamp is the current generation
+        self.generation = 0
+
+        # AllocationStats, or None
+        self.stats = None
+
+    def _write(self, name, values):
+        '''
+        Function description:
+
+        Function for appending the integers of values to the file of the array name, and clearing values.
+
+        :Time complexity: O(K), where K is the number of values.
+        :Aux space complexity: O(1)
+        '''
+        if len(values) > 0:
+            self.files[name].write(values)
+            del values[:]
+
+    def _write_edges(self, edge_u, edge_v, written):
+        '''
+        Function description:
+
+        Function for appending the edges of edge_u and edge_v to their files, after the written edges.
+
+        :Output, return: the number of edges in the files
+
+        :Time complexity: O(K), where K is the number of edges.
+        :Aux space complexity: O(1)
+        '''
+        written += len(edge_v)
+        self._write("u", edge_u)
+        self._write("v", edge_v)
+        return written
+
+    def _map(self, name, count):
+        '''
+        Function description:
+
+        Function for mapping count integers of the file of the array name, the file is made longer
+        with zeros if it is shorter. The view of the integers is kept in views.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        import mmap
+
+        size = 4 * max(count, 1)
+        file = self.files[name]
+        file.truncate(size)
+        self.buffers[name] = mmap.mmap(file.fileno(), size)
+        self.views[name] = memoryview(self.buffers[name]).cast("i")
+
+    def _map_edges(self, capacity):
+        '''
+        Function description:
+
+        Function for mapping the edge arrays with space for capacity edges, and the views of the edges
+        which were added (u, v, c, f and source_edges).
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        # the old maps are closed, so the process does not keep the maps of every size
+        if "u" in self.views:
+            self._unmap(("u", "v", "c", "f"))
+        self.edge_capacity = capacity
+        for name in ("u", "v", "c", "f"):
+            self._map(name, capacity)
+        self._view_edges()
+
+    def _unmap(self, names):
+        '''
+        Function description:
+
+        Function for releasing the views of the arrays names and closing their maps.
+        The views of the edges which were added (u, v, c and f) are released first, they are slices of the maps.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        for name in ("u", "v", "c", "f"):
+            if name in names:
+                getattr(self, name).release()
+        for name in names:
+            self.views.pop(name).release()
+            self.buffers.pop(name).close()
+
+    def _view_edges(self):
+        '''
+        Function description:
+
+        Function for updating the views of the edges which were added, so len(self.v) is the number of edges.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        count = self.edge_count
+        self.u = self.views["u"][:count]
+        self.v = self.views["v"][:count]
+        self.c = self.views["c"][:count]
+        self.f = self.views["f"][:count]
+        self.source_edges = range(self.source_start, count)
+
+    def _touch(self, edges):
+        '''
+        Function description:
+
+        Function for counting the edges which were read or written, and dropping the pages of the files
+        from memory after budget bytes (see release).
+
+        :Time complexity: O(1), O(B) to drop the pages, where B is the budget.
+        :Aux space complexity: O(1)
+        '''
+        self.touched += edges
+        if self.touched >= self.release_edges:
+            self.release()
+
+    def release(self):
+        '''
+        Function description:
+
+        Function for writing back the pages which were written to the files, and dropping every page
+        of the files from the memory of the process. The arrays are the same, they are read again from the files.
+
+        :Time complexity: O(B), where B is the bytes which were read or written since the last release.
+        :Aux space complexity: O(1)
+        '''
+        import mmap
+
+        self.touched = 0
+        for buffer in self.buffers.values():
+            buffer.flush()
+            if hasattr(mmap, "MADV_DONTNEED"):
+                buffer.madvise(mmap.MADV_DONTNEED)
+
+    def close(self):
+        '''
+        Function description:
+
+        Function for closing the maps and the temporary files, which deletes the files.
+        The network can not be used after, a second close does nothing.
+        allocate_phased closes the network at the end of the solve, so the files do not wait for the garbage collector.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        if not self.files:
+            return
+        self._unmap(list(self.views))
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+
+    def __enter__(self):
+        '''
+        Function description:
+
+        Function for "with SpillFlowNetwork(preferences) as network".
+        '''
+        return self
+
+    def __exit__(self, *exc_info):
+        '''
+        Function description:
+
+        Function for closing the network at the end of "with".
+        '''
+        self.close()
+
+    def add_source_edge(self, person):
+        '''
+        Function description:
+
+        Function for adding the edge from source to the person, with the capacity of 1.
+
+        :Time complexity: O(1) amortized
+        :Aux space complexity: O(1)
+        '''
+        self.add_source_edges([person])
+
+    def add_source_edges(self, people):
+        '''
+        Function description:
+
+        Function for adding the edges from source to every person of people, in their order.
+        The edges are written to the end of the mapped edge arrays, which are mapped again twice as long
+        if there is no space (e.g. a person who is in licenses twice).
+
+        :Input:
+            argv1: people : a list of the indices of the people
+
+        :Time complexity: O(K) amortized, where K is the number of people.
+        :Aux space complexity: O(budget)
+        '''
+        start = self.edge_count
+        if start + len(people) > self.edge_capacity:
+            self._map_edges(max(start + len(people), 2 * self.edge_capacity))
+
+        piece = max(1024, self.budget // 16)
+        for first in range(0, len(people), piece):
+            values = array("i", people[first:first + piece])
+            end = start + len(values)
+            self.views["u"][start:end] = array("i", [self.source_index]) * len(values)
+            self.views["v"][start:end] = values
+            self.views["c"][start:end] = array("i", [1]) * len(values)
+            self.views["f"][start:end] = array("i", [0]) * len(values)
+            self._touch(len(values))
+            start = end
+
+        self.edge_count = start
+        self._view_edges()
+
+    def warm_start(self, car_list):
+        '''
+        Function description:
+
+        Function for the greedy warm start of a phase, same as CompactFlowNetwork.warm_start,
+        and the edges which were read are counted for release.
+
+        :Input:
+            argv1: car_list : the list of cars, it will be updated with the allocated people
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O(N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O(1)
+        '''
+        offsets = self.offsets
+        edge_v = self.v
+        c = self.c
+        f = self.f
+        allocated = self.allocated
+        og_vertices = self.og_vertices
+        car_edges_start = self.car_edges_start
+        total_flow = 0
+        touched = 0
+
+        for source_edge in self.source_edges:
+            if c[source_edge] - f[source_edge] <= 0:
+                continue
+            person = edge_v[source_edge]
+            first = offsets[person]
+            last = offsets[person + 1]
+            touched += last - first + 2
+            if touched >= self.release_edges:
+                self._touch(touched)
+                touched = 0
+            for e in range(first, last):
+                if c[e] - f[e] <= 0:
+                    continue
+                car = edge_v[e] - og_vertices
+                car_edge = car_edges_start + car
+                if c[car_edge] - f[car_edge] > 0:
+                    f[source_edge] += 1
+                    f[e] += 1
+                    f[car_edge] += 1
+                    car_list[car].append(person)
+                    allocated.add(person)
+                    total_flow += 1
+                    break
+
+        self._touch(touched)
+        if self.stats is not None:
+            self.stats.augmenting_paths += total_flow
+        return total_flow
+
+    def find_path(self, source, sink):
+        '''
+        Function description:
+
+        BFS algorithm to find the path from source to sink, same as CompactFlowNetwork.find_path,
+        and the edges which were read are counted for release, so a BFS over more edges than the budget
+        drops the pages on the way.
+
+        :Time complexity: O(N^2), where N is the number of people.
+        :Aux space complexity: O(N), where N is the number of people. (the length of the path)
+        '''
+        offsets = self.offsets
+        edge_u = self.u
+        edge_v = self.v
+        c = self.c
+        f = self.f
+        previous = self.previous
+        stamp = self.stamp
+        queue = self.queue_buffer
+        release_edges = self.release_edges
+        touched = 0
+
+        # new generation, every vertex is undiscovered
+        self.generation += 1
+        generation = self.generation
+
+        stamp[source] = generation
+        queue[0] = source
+        head = 0
+        tail = 1
+        path = None
+
+        # it will run while there is a vertex in the queue
+        while head < tail and path is None:
+            u = queue[head]
+            head += 1
+
+            if u == self.source_index:
+                first = self.source_start
+                last = len(edge_v)
+            else:
+                first = offsets[u]
+                last = offsets[u + 1]
+
+            touched += last - first + 1
+            if touched >= release_edges:
+                self._touch(touched)
+                touched = 0
+
+            for e in range(first, last):
+                v = edge_v[e]
+
+                # if the vertex is not discovered and the capacity is bigger than flow, discover the vertex
+                if stamp[v] != generation and c[e] - f[e] > 0:
+                    previous[v] = e
+
+                    # the sink is found, backtrack the path
+                    if v == sink:
+                        path = []
+                        while v != source:
+                            e = previous[v]
+                            path.append(e)
+                            v = edge_u[e]
+                        path.reverse()
+                        break
+
+                    stamp[v] = generation
+                    queue[tail] = v
+                    tail += 1
+
+        self._touch(touched)
+        if self.stats is not None:
+            self._record_bfs(head)
+        return path
+
+    def memory_bytes(self):
+        '''
+        Function description:
+
+        Function for an estimate of the memory (bytes) of the network, the Bitsets and the pages of the files
+        which can be in memory (at most the budget, or the size of the files).
+        It is not the resident memory of the maps, which is decided by the operating system:
+        the pages which were touched since the last release are about the budget, but the pages
+        which the operating system reads ahead, and the page cache of the files, are not counted.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        import sys
+
+        total = 0
+        for buffer in (self.license.bits, self.allocated.bits):
+            total += sys.getsizeof(buffer)
+        mapped = 0
+        for buffer in self.buffers.values():
+            mapped += len(buffer)
+        return total + min(mapped, self.budget)
+
+class ResidualGraph:
+    def __init__(self, vertex_count):
+        '''
+        Function description:
+
+        This function returns an empty residual graph, it is the max-flow engine of allocate.
+
+        Every edge e is added together with its reverse edge e ^ 1, so the flow on an edge
+        can be cancelled later by pushing flow on the reverse edge.
+
+        Attributes:
+        adj : adj[u] is the list of the edge indices which start from u.
+        to  : to[e] is the vertex that the edge e is pointing to.
+        cap : cap[e] is the residual capacity of the edge e.
+
+        :Input:
+            argv1: vertex_count : the number of vertices
+
+        :Time complexity: O(V), where V is the number of vertices.
+        :Aux space complexity: O(V), where V is the number of vertices.
+        '''
+        self.adj = [[] for _ in range(vertex_count)]
+        self.to = []
+        self.cap = []
+        self.level = None
+
+        # for find_path, a vertex is discovered if its stamp is the current generation
+        self.generation = 0
+        self.stamp = [0] * vertex_count
+        self.previous_edge = [0] * vertex_count
+
+        # AllocationStats, or None
+        self.stats = None
+
+        # a time.monotonic() value, max_flow stops at the first phase after it
+        self.deadline = None
+
+    def add_vertex(self):
+        '''
+        Function description:
+
+        Function for adding a new vertex, it returns the index of the vertex.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.adj.append([])
+        self.stamp.append(0)
+        self.previous_edge.append(0)
+        return len(self.adj) - 1
+
+    def add_edge(self, u, v, c):
+        '''
+        Function description:
+
+        Function for adding the edge from u to v with the capacity of c, and its reverse edge with 0.
+
+        :Input:
+            u : the first vertex
+            v : the second vertex
+            c : the capacity of the edge
+
+        :Output, return: the index of the edge, the reverse edge is index ^ 1.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        e = len(self.to)
+        self.to.append(v)
+        self.cap.append(c)
+        self.adj[u].append(e)
+        self.to.append(u)
+        self.cap.append(0)
+        self.adj[v].append(e + 1)
+        return e
+
+    def flow(self, e):
+        '''
+        Function description:
+
+        Function for the flow on the edge e, which is the residual capacity of its reverse edge.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return self.cap[e ^ 1]
+
+    def push(self, e, amount):
+        '''
+        Function description:
+
+        Function for adding the amount of flow to the edge e, a negative amount cancels the flow.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.cap[e] -= amount
+        self.cap[e ^ 1] += amount
+
+    def set_capacity(self, e, c):
+        '''
+        Function description:
+
+        Function for changing the capacity of the edge e to c, the flow on the edge stays.
+        The flow must not be bigger than c.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.cap[e] = c - self.cap[e ^ 1]
+
+    def find_path(self, source, sink, blocked=-1):
+        '''
+        Function description:
+
+        BFS algorithm to find a residual path from source to sink, it stops as soon as the sink is discovered.
+        The vertex blocked is never used on the path.
+
+        :Output, return: the list of the edge indices from source to sink, or None if there is no path.
+
+        :Time complexity: O(V + E), but only the part of the graph which is discovered before the sink.
+        :Aux space complexity: O(V)
+        '''
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+        stamp = self.stamp
+        previous_edge = self.previous_edge
+
+        self.generation += 1
+        generation = self.generation
+        stamp[source] = generation
+        if blocked >= 0:
+            stamp[blocked] = generation
+
+        discovered = [source]
+        for u in discovered:
+            for e in adj[u]:
+                v = to[e]
+                if cap[e] > 0 and stamp[v] != generation:
+                    previous_edge[v] = e
+
+                    # the sink is found, backtrack the path
+                    if v == sink:
+                        path = []
+                        while v != source:
+                            e = previous_edge[v]
+                            path.append(e)
+                            v = to[e ^ 1]
+                        path.reverse()
+                        return path
+
+                    stamp[v] = generation
+                    discovered.append(v)
+
+        return None
+
+    def bfs_levels(self, source, sink):
+        '''
+        Function description:
+
+        Function for making the level graph of Dinic's algorithm.
+        level[v] is the number of edges on the shortest residual path from source to v, or -1.
+
+        :Output, return: True if the sink can be reached from the source.
+
+        :Time complexity: O(V + E)
+        :Aux space complexity: O(V)
+        '''
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+
+        level = [-1] * len(adj)
+        level[source] = 0
+
+        # the discovered list is used as the queue
+        discovered = [source]
+        for u in discovered:
+            next_level = level[u] + 1
+            for e in adj[u]:
+                v = to[e]
+                if cap[e] > 0 and level[v] < 0:
+                    level[v] = next_level
+                    discovered.append(v)
+
+        self.level = level
+        if self.stats is not None:
+            self.stats.record_bfs(len(discovered), sum(len(adj[u]) for u in discovered))
+        return level[sink] >= 0
+
+    def blocking_flow(self, source, sink):
+        '''
+        Function description:
+
+        Function for finding the blocking flow in the level graph.
+
+        Approach description:
+
+        It is the DFS of Dinic's algorithm, but with a stack of edge indices instead of recursion,
+        so the parent of a vertex on the path is the edge on the stack.
+
+        Step 1: from the last vertex of the path, take the next edge which goes one level down and has capacity.
+        Step 2: if there is no such edge, the vertex is a dead end, remove it from the path.
+        Step 3: if the path reaches the sink, add the minimum residual capacity to the path,
+                and go back to the first saturated edge.
+
+        it[u] is the current edge of u, an edge which is skipped once is never tried again in this phase.
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O(V * E)
+        :Aux space complexity: O(V)
+        '''
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+        level = self.level
+
+        it = [0] * len(adj)
+        path = []
+        total_flow = 0
+        paths = 0
+        u = source
+
+        while True:
+            if u == sink:
+
+                # find the minimum residual capacity on the path
+                minimum_flow = min(cap[e] for e in path)
+
+                # add the minimum flow, and go back to the first saturated edge
+                first_saturated = -1
+                for k in range(len(path)):
+                    e = path[k]
+                    cap[e] -= minimum_flow
+                    cap[e ^ 1] += minimum_flow
+                    if cap[e] == 0 and first_saturated < 0:
+                        first_saturated = k
+
+                total_flow += minimum_flow
+                paths += 1
+                del path[first_saturated:]
+                u = to[path[-1]] if path else source
+                continue
+
+            edges = adj[u]
+            i = it[u]
+            next_level = level[u] + 1
+            while i < len(edges):
+                e = edges[i]
+                if cap[e] > 0 and level[to[e]] == next_level:
+                    break
+                i += 1
+            it[u] = i
+
+            if i < len(edges):
+                # go down the level graph
+                path.append(edges[i])
+                u = to[edges[i]]
+            elif u == source:
+                break
+            else:
+                # dead end, go back and skip the edge
+                e = path.pop()
+                u = to[e ^ 1]
+                it[u] += 1
+
+        if self.stats is not None:
+            self.stats.augmenting_paths += paths
+        return total_flow
+
+    def memory_bytes(self):
+        '''
+        Function description:
+
+        Function for the memory (bytes) of the lists of the graph.
+
+        :Time complexity: O(V)
+        :Aux space complexity: O(1)
+        '''
+        import sys
+
+        total = sys.getsizeof(self.adj) + sys.getsizeof(self.to) + sys.getsizeof(self.cap)
+        total += sys.getsizeof(self.stamp) + sys.getsizeof(self.previous_edge)
+        for edges in self.adj:
+            total += sys.getsizeof(edges)
+        return total
+
+    def max_flow(self, source, sink):
+        '''
+        Function description:
+
+        Function for the maximum flow from source to sink with Dinic's algorithm.
+        The flow is added to the flow which is already in the graph.
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O(E * sqrt(V)) on the unit capacity networks of allocate.
+        :Aux space complexity: O(V)
+        '''
+        total_flow = 0
+        while self.bfs_levels(source, sink):
+            check_deadline(self.deadline)
+            total_flow += self.blocking_flow(source, sink)
+        return total_flow
+
+class CarMatching:
+    def __init__(self, preferences, licenses, car_max=None):
+        '''
+        Function description:
+
+        This function returns the b-matching of allocate_bipartite, of the people to the seat groups of the cars.
+
+        The seat group D_j (index j) has capacity 2 and only takes a person with license,
+        the seat group O_j (index car_max + j) has capacity 3 and takes everyone.
+        seat_of[i] is the seat group of person i or -1, and members[r] is the list of the people in r.
+
+        :Input:
+            argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+            argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+            argv3: car_max : the number of cars, ceil(N/5) by default.
+
+        :Time complexity: O (N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O (N + E)
+        '''
+        self.og_vertices = len(preferences)
+        self.car_max = math.ceil(self.og_vertices / 5) if car_max is None else car_max
+        self.preferences = preferences
+
+        self.license = Bitset(self.og_vertices, licenses)
+
+        for i in range(self.og_vertices):
+            for j in preferences[i]:
+                if j < 0 or j >= self.car_max:
+                    raise ValueError("person %d prefers destination %d, but there are only %d cars" % (i, j, self.car_max))
+
+        self.capacity = [2] * self.car_max + [3] * self.car_max
+        self.members = [[] for _ in range(2 * self.car_max)]
+        self.seat_of = [-1] * self.og_vertices
+        self.matched = 0
+
+        # the seat groups of every person, for the driver seats only and for every seat
+        self.driver_seats = None
+        self.seats = None
+
+        # AllocationStats, or None
+        self.stats = None
+
+        # a time.monotonic() value, hopcroft_karp stops at the first phase after it
+        self.deadline = None
+
+        # True if the last hopcroft_karp stopped because its budget was spent,
+        # and (free, position) of the phase it stopped in
+        self.interrupted = False
+        self.phase = None
+
+    def adjacency(self, driver_seats):
+        '''
+        Function description:
+
+        Function for the seat groups of every person, a person with license prefers D_j to O_j.
+
+        :Time complexity: O (N + E), the first time, O(1) after.
+        :Aux space complexity: O (N + E)
+        '''
+        car_max = self.car_max
+        if driver_seats:
+            if self.driver_seats is None:
+                self.driver_seats = [list(self.preferences[i]) if self.license[i] else []
+                                     for i in range(self.og_vertices)]
+            return self.driver_seats
+
+        if self.seats is None:
+            self.seats = []
+            for i in range(self.og_vertices):
+                if self.license[i]:
+                    self.seats.append([r for j in self.preferences[i] for r in (j, car_max + j)])
+                else:
+                    self.seats.append([car_max + j for j in self.preferences[i]])
+        return self.seats
+
+    def seed(self, people, driver_seats):
+        '''
+        Function description:
+
+        Function for the greedy warm start, every person who is not matched takes the first seat group
+        which is not full.
+
+        :Time complexity: O (E), where E is the number of the preferences of the people.
+        :Aux space complexity: O(1)
+        '''
+        adj = self.adjacency(driver_seats)
+        capacity = self.capacity
+        members = self.members
+        seat_of = self.seat_of
+        for i in people:
+            if seat_of[i] != -1:
+                continue
+            for r in adj[i]:
+                if len(members[r]) < capacity[r]:
+                    members[r].append(i)
+                    seat_of[i] = r
+                    self.matched += 1
+                    break
+
+    def hopcroft_karp(self, people, driver_seats, budget=None):
+        '''
+        Function description:
+
+        Function for the maximum b-matching of the people, from the current matching.
+
+        Approach description:
+
+        Step 1: BFS from every person who is not matched. A seat group which is full leads to its members
+                on the next layer, and the BFS stops at the layer which reaches a seat group which is not full.
+        Step 2: DFS from every person who is not matched, down the layers, for disjoint shortest augmenting paths.
+        Step 3: repeat until the BFS reaches no seat group which is not full.
+
+        With a Budget, it is checked before every BFS and every DFS. When it is spent, it stops
+        with interrupted = True and keeps the phase, and the next call goes on with the same phase,
+        so the matching at the end is the same as without a budget.
+
+        :Output, return: the number of matched people.
+
+        :Time complexity: O (E * sqrt(N)), where E is the number of preferences and N is the number of people.
+        :Aux space complexity: O (N)
+        '''
+        adj = self.adjacency(driver_seats)
+        self.interrupted = False
+
+        # position is the next DFS of the phase, or None before its BFS
+        if self.phase is None:
+            free = [i for i in people if self.seat_of[i] == -1]
+            position = None
+        else:
+            free, position = self.phase
+            self.phase = None
+
+        while free:
+            if position is None:
+                check_deadline(self.deadline)
+                if budget is not None and budget.spent():
+                    self.phase = (free, None)
+                    self.interrupted = True
+                    break
+                if not self.bfs_layers(free, adj):
+                    break
+                position = 0
+            while position < len(free):
+                if budget is not None and budget.spent():
+                    self.phase = (free, position)
+                    self.interrupted = True
+                    break
+                if self.augment(free[position], adj):
+                    self.matched += 1
+                position += 1
+            if self.interrupted:
+                break
+            free = [i for i in free if self.seat_of[i] == -1]
+            position = None
+        return self.matched
+
+    def bfs_layers(self, free, adj):
+        '''
+        Function description:
+
+        Function for the layers of Hopcroft-Karp, layer[i] is the length of the shortest alternating path
+        from a person who is not matched to person i, or -1.
+
+        :Output, return: True if a seat group which is not full can be reached.
+
+        :Time complexity: O (N + E)
+        :Aux space complexity: O (N)
+        '''
+        capacity = self.capacity
+        members = self.members
+        seat_of = self.seat_of
+
+        layer = [-1] * self.og_vertices
+        for i in free:
+            layer[i] = 0
+
+        # the discovered list is used as the queue
+        discovered = list(free)
+        limit = -1
+        for u in discovered:
+            if limit >= 0 and layer[u] >= limit:
+                break
+            next_layer = layer[u] + 1
+            for r in adj[u]:
+                if r == seat_of[u]:
+                    continue
+                if len(members[r]) < capacity[r]:
+                    limit = next_layer
+                    continue
+                for w in members[r]:
+                    if layer[w] < 0:
+                        layer[w] = next_layer
+                        discovered.append(w)
+
+        self.layer = layer
+        self.edge_pointer = [0] * self.og_vertices
+        self.member_pointer = [0] * self.og_vertices
+        if self.stats is not None:
+            self.stats.record_bfs(len(discovered), sum(len(adj[u]) for u in discovered))
+        return limit >= 0
+
+    def augment(self, root, adj):
+        '''
+        Function description:
+
+        Function for the DFS of Hopcroft-Karp from the person root, down the layers.
+
+        Approach description:
+
+        The path is a stack of people, the seat group of a person on the path is adj[u][edge_pointer[u]].
+        A person whose DFS fails gets layer -1, so it is not tried again in this phase.
+        When a seat group which is not full is found, every person on the path moves to its seat group,
+        from the last one to root, so every group keeps its size except the last one.
+
+        :Output, return: True if root was matched.
+
+        :Time complexity: O (E), O(E) for all the augment of a phase together.
+        :Aux space complexity: O (N)
+        '''
+        capacity = self.capacity
+        members = self.members
+        seat_of = self.seat_of
+        layer = self.layer
+        edge_pointer = self.edge_pointer
+        member_pointer = self.member_pointer
+
+        path = [root]
+        while path:
+            u = path[-1]
+            edges = adj[u]
+            advanced = False
+            while edge_pointer[u] < len(edges):
+                r = edges[edge_pointer[u]]
+                if r != seat_of[u]:
+                    group = members[r]
+                    if len(group) < capacity[r]:
+                        # move every person on the path to its seat group, from the end of the path
+                        for k in range(len(path) - 1, -1, -1):
+                            w = path[k]
+                            target = adj[w][edge_pointer[w]]
+                            if seat_of[w] != -1:
+                                members[seat_of[w]].remove(w)
+                            members[target].append(w)
+                            seat_of[w] = target
+                        if self.stats is not None:
+                            self.stats.augmenting_paths += 1
+                        return True
+
+                    while member_pointer[u] < len(group):
+                        w = group[member_pointer[u]]
+                        member_pointer[u] += 1
+                        if layer[w] == layer[u] + 1:
+                            path.append(w)
+                            advanced = True
+                            break
+                    if advanced:
+                        break
+
+                edge_pointer[u] += 1
+                member_pointer[u] = 0
+
+            if not advanced:
+                layer[u] = -1
+                path.pop()
+        return False
+
+    def car_list(self):
+        '''
+        Function description:
+
+        Function for reading the cars from the matching, the drivers of a car come before the passengers.
+        A person who is not matched is in no car.
+
+        :Output, return: the list of cars
+
+        :Time complexity: O (N), where N is the number of people.
+        :Aux space complexity: O (N)
+        '''
+        car_max = self.car_max
+        drivers = [[] for _ in range(car_max)]
+        passengers = [[] for _ in range(car_max)]
+        for i in range(self.og_vertices):
+            j = self.seat_of[i]
+            if j == -1:
+                continue
+            if j >= car_max:
+                j -= car_max
+            if self.license[i]:
+                drivers[j].append(i)
+            else:
+                passengers[j].append(i)
+        return [drivers[j] + passengers[j] for j in range(car_max)]
+
+class AnytimeAllocator:
+    def __init__(self, preferences, licenses):
+        '''
+        Function description:
+
+        This function returns the anytime mode of the "bipartite" engine, for a trip which is too big
+        to wait for: run it with a budget of seconds or iterations, and it returns the best allocation so far,
+        then run it again with more budget to go on from there.
+
+        The allocation so far is always valid for the people in it (every person is in a car of their preferences,
+        at most 5 people per car), but a car can have less than 2 drivers until the status is "feasible".
+
+        Approach description:
+
+        It is allocate_bipartite, split into stages, and the matching is kept between the runs.
+        Stage "drivers": the greedy warm start of the drivers with 1 destination, and Hopcroft-Karp of the drivers
+                         and the driver seats. If a driver seat is empty at the end, the status is "infeasible".
+        Stage "passengers": the greedy warm start of everyone, and Hopcroft-Karp of everyone and every seat.
+                            If a person is not matched at the end, the status is "infeasible", if not "feasible".
+        The budget is checked before every BFS and every DFS of Hopcroft-Karp (see CarMatching.hopcroft_karp),
+        and between the stages, so a run stops inside a stage, and the next run goes on with the same phase.
+        So the cars at the end are the same as allocate_bipartite, however the budget is split.
+
+        Attributes:
+        status : "partial" (the budget was spent), "feasible" or "infeasible".
+        stage : "drivers", "passengers" or "done".
+
+        :Input:
+            argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+            argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+
+        :Time complexity: O (N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O (N + E)
+        '''
+        self.preferences = preferences
+        self.matching = CarMatching(preferences, licenses)
+        self.stage = "drivers"
+        self.status = "partial"
+        self.seeded = False
+
+    def run(self, seconds=None, iterations=None):
+        '''
+        Function description:
+
+        Function for going on with the allocation until it is done or the budget is spent.
+
+        :Input:
+            argv1: seconds : the wall time of this run, no limit by default
+            argv2: iterations : the number of BFS and DFS of this run, no limit by default
+
+        :Output, return: (car_list, unallocated, status),
+                         the cars so far, the list of the people who are not in a car, and the status.
+
+        :Time complexity: O (E * sqrt(N)) for all the runs together, where E is the number of preferences and N is the number of people.
+        :Aux space complexity: O (N + E)
+        '''
+        matching = self.matching
+        budget = Budget(seconds, iterations)
+        stage = self.stage
+
+        if self.stage == "drivers":
+            drivers = list(matching.license)
+            if not self.seeded:
+                matching.seed([i for i in drivers if len(self.preferences[i]) == 1], driver_seats=True)
+                self.seeded = True
+            matching.hopcroft_karp(drivers, driver_seats=True, budget=budget)
+            if not matching.interrupted:
+                if matching.matched != 2 * matching.car_max:
+                    self.stage = "done"
+                    self.status = "infeasible"
+                else:
+                    self.stage = "passengers"
+                    self.seeded = False
+
+        # the budget is checked between the stages too, but not before a run which starts with the passengers,
+        # so a run of 1 iteration always goes on with the matching
+        if self.stage == "passengers" and (stage == "passengers" or not budget.spent()):
+            everyone = range(matching.og_vertices)
+            if not self.seeded:
+                matching.seed(everyone, driver_seats=False)
+                self.seeded = True
+            matching.hopcroft_karp(everyone, driver_seats=False, budget=budget)
+            if not matching.interrupted:
+                self.stage = "done"
+                self.status = "feasible" if matching.matched == matching.og_vertices else "infeasible"
+
+        return self.result()
+
+    def result(self):
+        '''
+        Function description:
+
+        Function for the allocation so far, see run.
+
+        :Output, return: (car_list, unallocated, status)
+
+        :Time complexity: O (N), where N is the number of people.
+        :Aux space complexity: O (N)
+        '''
+        seat_of = self.matching.seat_of
+        unallocated = [i for i in range(self.matching.og_vertices) if seat_of[i] == -1]
+        return self.matching.car_list(), unallocated, self.status
+
+class Budget:
+    def __init__(self, seconds=None, iterations=None):
+        '''
+        Function description:
+
+        This function returns the budget of a run of AnytimeAllocator, in seconds and in iterations.
+
+        :Input:
+            argv1: seconds : the wall time, no limit by default
+            argv2: iterations : the number of calls of spent, no limit by default
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.iterations = iterations
+        self.used = 0
+
+    def spent(self):
+        '''
+        Function description:
+
+        Function for using 1 iteration, it returns True if the budget is spent.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.used += 1
+        if self.iterations is not None and self.used > self.iterations:
+            return True
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+class RankNetwork:
+    def __init__(self, preferences, licenses, car_max=None):
+        '''
+        Function description:
+
+        This function returns the min-cost flow network of allocate_ranked, where the cost of an edge
+        from a person to a car is the rank of the car in the preferences of the person (0 for the first).
+
+        The seat groups are the same as CarMatching: D_j has capacity 2 and only takes a person with license,
+        O_j has capacity 3 and takes everyone. The edge from D_j to sink has the cost -M, where M is more than
+        the cost of every allocation, so a min-cost max-flow fills every driver seat before it looks at the ranks,
+        and it fills them all if there is an allocation.
+
+        Vertices: the people 0 .. N-1, D_j = N + j, O_j = N + car_max + j, source and sink.
+        Every edge e is added together with its reverse edge e ^ 1, with the cost -cost[e] (see ResidualGraph).
+
+        Approach description:
+
+        Step 1: make the edges, a destination which is repeated in the preferences keeps its first rank.
+        Step 2: the potentials are the shortest distances from source, the network has no cycle,
+                so they are found in one pass over the edges (the costs of D_j to sink are negative).
+
+        :Input:
+            argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+                                 The first destination is the one which the person wants the most.
+            argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+            argv3: car_max : the number of cars, ceil(N/5) by default.
+
+        :Time complexity: O (N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O (N + E)
+        '''
+        n = len(preferences)
+        self.og_vertices = n
+        self.car_max = math.ceil(n / 5) if car_max is None else car_max
+        car_max = self.car_max
+        self.source = n + 2 * car_max
+        self.sink = self.source + 1
+        vertex_count = self.sink + 1
+
+        self.license = Bitset(n, licenses)
+        self.adj = [[] for _ in range(vertex_count)]
+        self.to = []
+        self.cap = []
+        self.cost = []
+
+        longest = 1
+        for i in range(n):
+            longest = max(longest, len(preferences[i]))
+        self.big = n * longest + 1
+
+        # the potentials, the shortest distances from source in the first network
+        infinity = math.inf
+        potential = [infinity] * vertex_count
+        potential[self.source] = 0
+
+        for i in range(n):
+            self.add_edge(self.source, i, 1, 0)
+            potential[i] = 0
+            licensed = i in self.license
+            seen = set()
+            for rank, j in enumerate(preferences[i]):
+                if j < 0 or j >= car_max:
+                    raise ValueError("person %d prefers destination %d, but there are only %d cars" % (i, j, car_max))
+                if j in seen:
+                    continue
+                seen.add(j)
+                if licensed:
+                    self.add_edge(i, n + j, 1, rank)
+                    potential[n + j] = min(potential[n + j], rank)
+                self.add_edge(i, n + car_max + j, 1, rank)
+                potential[n + car_max + j] = min(potential[n + car_max + j], rank)
+
+        # the edges from the seat groups to sink
+        self.group_edges = []
+        for j in range(car_max):
+            self.group_edges.append(self.add_edge(n + j, self.sink, 2, -self.big))
+        for j in range(car_max):
+            self.add_edge(n + car_max + j, self.sink, 3, 0)
+
+        sink_potential = 0
+        for j in range(car_max):
+            sink_potential = min(sink_potential, potential[n + j] - self.big, potential[n + car_max + j])
+        potential[self.sink] = sink_potential
+
+        # a seat group which nobody prefers is never reached
+        self.potential = [0 if p == infinity else p for p in potential]
+
+        # AllocationStats, or None
+        self.stats = None
+
+        # a time.monotonic() value, solve stops at the first phase after it
+        self.deadline = None
+
+    def memory_bytes(self):
+        '''
+        Function description:
+
+        Function for the memory (bytes) of the lists of the graph.
+
+        :Time complexity: O(V)
+        :Aux space complexity: O(1)
+        '''
+        import sys
+
+        total = sys.getsizeof(self.adj) + sys.getsizeof(self.to) + sys.getsizeof(self.cap) + sys.getsizeof(self.cost)
+        total += sys.getsizeof(self.potential) + sys.getsizeof(self.license.bits)
+        for edges in self.adj:
+            total += sys.getsizeof(edges)
+        return total
+
+    def add_edge(self, u, v, c, cost):
+        '''
+        Function description:
+
+        Function for adding the edge from u to v with the capacity c and the cost, and its reverse edge.
+
+        :Output, return: the index of the edge, the reverse edge is index ^ 1.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        e = len(self.to)
+        self.to.append(v)
+        self.cap.append(c)
+        self.cost.append(cost)
+        self.adj[u].append(e)
+        self.to.append(u)
+        self.cap.append(0)
+        self.cost.append(-cost)
+        self.adj[v].append(e + 1)
+        return e
+
+    def dijkstra(self):
+        '''
+        Function description:
+
+        Function for the shortest residual path from source to sink with the reduced costs
+        cost[e] + potential[u] - potential[v], which are never negative, and a binary heap.
+
+        Approach description:
+
+        It stops when the sink is taken from the heap. Then every vertex which was taken gets
+        potential += distance, and every other vertex gets potential += distance of sink,
+        so the reduced costs are still not negative, and the edges on the shortest paths have the reduced cost 0.
+
+        :Output, return: True if the sink can be reached from the source.
+
+        :Time complexity: O(E log V)
+        :Aux space complexity: O(V)
+        '''
+        import heapq
+
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+        cost = self.cost
+        potential = self.potential
+        sink = self.sink
+
+        infinity = math.inf
+        distance = [infinity] * len(adj)
+        done = bytearray(len(adj))
+        distance[self.source] = 0
+        heap = [(0, self.source)]
+        scanned = 0
+        edges = 0
+
+        while heap:
+            d, u = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = 1
+            scanned += 1
+            if u == sink:
+                break
+            base = d + potential[u]
+            edges += len(adj[u])
+            for e in adj[u]:
+                if cap[e] > 0:
+                    v = to[e]
+                    candidate = base + cost[e] - potential[v]
+                    if candidate < distance[v]:
+                        distance[v] = candidate
+                        heapq.heappush(heap, (candidate, v))
+
+        if self.stats is not None:
+            self.stats.record_bfs(scanned, edges)
+        if not done[sink]:
+            return False
+
+        sink_distance = distance[sink]
+        for v in range(len(adj)):
+            potential[v] += distance[v] if done[v] else sink_distance
+        return True
+
+    def admissible_flow(self):
+        '''
+        Function description:
+
+        Function for the maximum flow on the edges with the reduced cost 0 (the admissible edges).
+        Every path on them has the same cost, the distance of sink, so it does not need to be the shortest
+        in the number of edges. A path with the reduced cost 0 makes a reverse edge with the reduced cost 0,
+        so the potentials stay valid.
+
+        Approach description:
+
+        The potentials do not change during the phase, so the admissible edges of a vertex are found once,
+        the first time it is reached, and only the residual capacity is checked after that.
+        Step 1: DFS from source on the admissible edges with capacity, with a stack of edges
+                (see ResidualGraph.blocking_flow). A vertex is marked when it is reached,
+                and it is not tried again in this pass, so a pass is O(E).
+        Step 2: when the DFS reaches sink, push 1 on the path and unmark the vertices of the path,
+                a seat group can take more people, then go on from source.
+        Step 3: repeat the passes until a pass finds no path, which is a search of every vertex
+                that can be reached, so there is no admissible path left.
+
+        It finds the long alternating paths in the same pass, where the levels of Dinic's algorithm
+        would need a round for every length.
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O(E * F) for F paths, in practice a few passes of O(E).
+        :Aux space complexity: O(E)
+        '''
+        adj = self.adj
+        to = self.to
+        cap = self.cap
+        cost = self.cost
+        potential = self.potential
+        source = self.source
+        sink = self.sink
+        total_flow = 0
+
+        # the admissible edges of every vertex which was reached, or None
+        tight = [None] * len(adj)
+
+        while True:
+            found = 0
+            marked = bytearray(len(adj))
+            marked[source] = 1
+            it = [0] * len(adj)
+            path = []
+            u = source
+            while True:
+                if u == sink:
+                    for e in path:
+                        cap[e] -= 1
+                        cap[e ^ 1] += 1
+                        marked[to[e]] = 0
+                    found += 1
+                    del path[:]
+                    u = source
+                    continue
+
+                edges = tight[u]
+                if edges is None:
+                    pu = potential[u]
+                    edges = tight[u] = [e for e in adj[u] if cost[e] + pu == potential[to[e]]]
+                i = it[u]
+                count = len(edges)
+                while i < count:
+                    e = edges[i]
+                    if cap[e] > 0 and not marked[to[e]]:
+                        break
+                    i += 1
+                it[u] = i
+
+                if i < count:
+                    e = edges[i]
+                    path.append(e)
+                    u = to[e]
+                    marked[u] = 1
+                elif u == source:
+                    break
+                else:
+                    # dead end, go back, the vertex stays marked in this pass
+                    e = path.pop()
+                    u = to[e ^ 1]
+                    it[u] += 1
+
+            if self.stats is not None:
+                self.stats.record_bfs(len(adj) - marked.count(0), 0)
+                self.stats.augmenting_paths += found
+            if found == 0:
+                return total_flow
+            total_flow += found
+
+    def solve(self):
+        '''
+        Function description:
+
+        Function for the min-cost max-flow with successive shortest paths (primal-dual):
+        a Dijkstra for the potentials, then the maximum flow on the admissible edges, until the sink can not be reached.
+        The deadline is checked before every phase.
+
+        :Output, return: the list of cars, or None if there is no allocation.
+
+        :Time complexity: O (P * E log V), where P is the number of phases, which is at most the number of
+                          different costs of the shortest paths, a few times the length of the preferences.
+        :Aux space complexity: O (V)
+        '''
+        flow = 0
+        while True:
+            check_deadline(self.deadline)
+            if not self.dijkstra():
+                break
+            flow += self.admissible_flow()
+
+        if flow != self.og_vertices:
+            return None
+        for e in self.group_edges:
+            if self.cap[e] != 0:
+                return None
+        return self.car_list()
+
+    def car_list(self):
+        '''
+        Function description:
+
+        Function for reading the cars from the flow, the drivers of a car come before the passengers.
+
+        :Output, return: the list of cars
+
+        :Time complexity: O (N + E)
+        :Aux space complexity: O (N)
+        '''
+        n = self.og_vertices
+        car_max = self.car_max
+        drivers = [[] for _ in range(car_max)]
+        passengers = [[] for _ in range(car_max)]
+        for i in range(n):
+            for e in self.adj[i]:
+                # a forward edge from the person to a seat group, with flow
+                if e & 1 == 0 and self.cap[e ^ 1] > 0:
+                    j = (self.to[e] - n) % car_max
+                    if i in self.license:
+                        drivers[j].append(i)
+                    else:
+                        passengers[j].append(i)
+                    break
+        return [drivers[j] + passengers[j] for j in range(car_max)]
+
+class LowerBoundNetwork:
+    def __init__(self, preferences, licenses, car_max=None):
+        '''
+        Function description:
+
+        This function returns the flow network of allocate with a lower bound of 2 drivers per car.
+
+        Approach description:
+
+        Every car j has a driver vertex D_j and a car vertex C_j.
+        A person with license goes to D_j, a person without license goes to C_j.
+        D_j -> C_j must carry at least 2 and C_j -> sink at most 5.
+        Every person must carry exactly 1, so it is a lower bound as well.
+
+        The lower bounds are removed with a super source and a super sink:
+        an edge u -> v with lower bound l gets the capacity (c - l),
+        and super source -> v and u -> super sink get the capacity l.
+
+        Step 1: sink -> super sink capacity N. (sink -> source merged with source -> super sink)
+        Step 2: for every car (add_car),
+                D_j -> C_j capacity 3, super source -> C_j capacity 2, D_j -> super sink capacity 2,
+                C_j -> sink capacity 5.
+        Step 3: for every person (add_person),
+                super source -> person capacity 1, (source -> person, lower bound 1)
+                person -> D_j or C_j capacity 1.
+
+        There is an allocation if and only if the max-flow saturates every edge from the super source,
+        which is N + 2 * car_max.
+
+        :Input:
+            argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+            argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+            argv3: car_max : the number of cars, ceil(N/5) by default.
+
+        :Time complexity: O (E), where E is the number of preferences.
+        :Aux space complexity: O (E), where E is the number of preferences.
+        '''
+        self.og_vertices = len(preferences)
+        self.car_max = 0
+
+        self.graph = ResidualGraph(0)
+        self.sink_index = self.graph.add_vertex()
+        self.source_index = self.graph.add_vertex()
+        self.super_sink_index = self.graph.add_vertex()
+        self.sink_edge = self.graph.add_edge(self.sink_index, self.super_sink_index, self.og_vertices)
+
+        # the vertices of the cars, and the edges (D_j -> C_j, super source -> C_j, D_j -> super sink, C_j -> sink)
+        self.driver_nodes = []
+        self.car_nodes = []
+        self.car_edges = []
+        if car_max is None:
+            car_max = math.ceil(len(preferences)/5)
+        for _ in range(car_max):
+            self.add_car()
+
+        license = bytearray(self.og_vertices)
+        for driver in licenses:
+            license[driver] = 1
+
+        # the vertex of every person, its edge from super source,
+        # and (edge index, car) of the edges to the cars
+        self.license = bytearray()
+        self.person_nodes = []
+        self.source_edges = []
+        self.person_edges = []
+        for i in range(self.og_vertices):
+            for j in preferences[i]:
+                if j < 0 or j >= self.car_max:
+                    raise ValueError("person %d prefers destination %d, but there are only %d cars" % (i, j, self.car_max))
+            self.add_person(preferences[i], license[i])
+
+        self.demand = self.og_vertices + 2 * self.car_max
+        self.maximum_flow = 0
+
+    def add_car(self):
+        '''
+        Function description:
+
+        Function for adding a car with its driver vertex and car vertex, it returns the index of the car.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        graph = self.graph
+        driver = graph.add_vertex()
+        car = graph.add_vertex()
+        self.driver_nodes.append(driver)
+        self.car_nodes.append(car)
+        self.car_edges.append((
+            graph.add_edge(driver, car, 3),
+            graph.add_edge(self.source_index, car, 2),
+            graph.add_edge(driver, self.super_sink_index, 2),
+            graph.add_edge(car, self.sink_index, 5),
+        ))
+        self.car_max += 1
+        return self.car_max - 1
+
+    def add_person(self, person_preference, license):
+        '''
+        Function description:
+
+        Function for adding a person with the edge from super source and the edges to the cars,
+        it returns the index of the person.
+
+        :Input:
+            argv1: person_preference : the list of the destinations of the person
+            argv2: license : True if the person has the license
+
+        :Time complexity: O(P), where P is the number of the preferences of the person.
+        :Aux space complexity: O(P)
+        '''
+        node = self.graph.add_vertex()
+        self.license.append(1 if license else 0)
+        self.person_nodes.append(node)
+        self.source_edges.append(self.graph.add_edge(self.source_index, node, 1))
+        self.person_edges.append([])
+
+        i = len(self.person_nodes) - 1
+        for j in person_preference:
+            self.add_person_edge(i, j)
+        return i
+
+    def add_person_edge(self, person, j):
+        '''
+        Function description:
+
+        Function for adding the edge from the person to the car j,
+        to D_j if the person has the license, or to C_j if not.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        if self.license[person]:
+            target = self.driver_nodes[j]
+        else:
+            target = self.car_nodes[j]
+        e = self.graph.add_edge(self.person_nodes[person], target, 1)
+        self.person_edges[person].append((e, j))
+        return e
+
+    def solve(self):
+        '''
+        Function description:
+
+        Function for running the max-flow and reading the cars from it.
+
+        :Output, return: the list of cars, or None if there is no allocation.
+
+        :Time complexity: O (E * sqrt(N)), where E is the number of preferences and N is the number of people.
+        :Aux space complexity: O (N), where N is the number of people.
+        '''
+        self.maximum_flow += self.graph.max_flow(self.source_index, self.super_sink_index)
+        if self.maximum_flow != self.demand:
+            return None
+        return self.car_list()
+
+    def car_of(self, person):
+        '''
+        Function description:
+
+        Function for the car of the person in the flow, or None.
+
+        :Time complexity: O(P), where P is the number of the preferences of the person.
+        :Aux space complexity: O(1)
+        '''
+        for e, j in self.person_edges[person]:
+            if self.graph.flow(e) > 0:
+                return j
+        return None
+
+    def car_list(self):
+        '''
+        Function description:
+
+        Function for reading the cars from the flow, the drivers of a car come before the passengers.
+
+        :Output, return: the list of cars
+
+        :Time complexity: O (E), where E is the number of preferences.
+        :Aux space complexity: O (N), where N is the number of people.
+        '''
+        drivers = [[] for _ in range(self.car_max)]
+        passengers = [[] for _ in range(self.car_max)]
+        for i in range(len(self.person_nodes)):
+            j = self.car_of(i)
+            if j is None:
+                continue
+            if self.license[i]:
+                drivers[j].append(i)
+            else:
+                passengers[j].append(i)
+        return [drivers[j] + passengers[j] for j in range(self.car_max)]
+
+class FleetNetwork:
+    def __init__(self, inventory):
+        '''
+        Function description:
+
+        This function returns the flow network of schedule_trips, many trips which share the seats
+        of the destinations. It is the LowerBoundNetwork of every trip, but the cars of destination j
+        of every trip go to one shared vertex P_j, and P_j -> sink has the capacity of the seats of j.
+
+        Approach description:
+
+        Step 1: sink -> super sink, its capacity is the number of people of every trip.
+        Step 2: for every destination j, P_j -> sink with the capacity inventory[j].
+        Step 3: for every trip (add_trip), the cars and the people of LowerBoundNetwork,
+                where C_j -> P_j has the capacity 5 instead of C_j -> sink.
+
+        A trip is allocated if the flow saturates every edge of its lower bounds (served),
+        which are the edges from super source to its people and its C_j, and D_j -> super sink.
+        The flow of the other trips can be removed without breaking it, because P_j only takes
+        the flow of the trips, so a max-flow which is not complete still allocates these trips.
+
+        :Input:
+            argv1: inventory : a list of integers, inventory[j] is the number of seats of destination j
+
+        :Time complexity: O(D), where D is the number of destinations.
+        :Aux space complexity: O(D), where D is the number of destinations.
+        '''
+        self.graph = ResidualGraph(0)
+        self.sink_index = self.graph.add_vertex()
+        self.source_index = self.graph.add_vertex()
+        self.super_sink_index = self.graph.add_vertex()
+        self.sink_edge = self.graph.add_edge(self.sink_index, self.super_sink_index, 0)
+        self.people = 0
+
+        # the shared vertex of every destination, and its edge to sink
+        self.pool_nodes = []
+        self.pool_edges = []
+        for seats in inventory:
+            node = self.graph.add_vertex()
+            self.pool_nodes.append(node)
+            self.pool_edges.append(self.graph.add_edge(node, self.sink_index, seats))
+
+        # for every trip, (license, the (edge index, car) of the edges of every person, the edges of the lower bounds)
+        self.trips = []
+
+    def add_trip(self, preferences, licenses):
+        '''
+        Function description:
+
+        Function for adding the cars and the people of a trip, it returns the index of the trip.
+
+        :Input:
+            argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+            argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+
+        :Time complexity: O (N + E), where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O (N + E)
+        '''
+        graph = self.graph
+        n = len(preferences)
+        car_max = math.ceil(n / 5)
+        if car_max > len(self.pool_nodes):
+            raise ValueError("the trip needs %d destinations, but there are only %d" % (car_max, len(self.pool_nodes)))
+
+        # the lower bounds, super source -> C_j and D_j -> super sink of every car, super source -> person
+        lower_edges = []
+        driver_nodes = []
+        car_nodes = []
+        for j in range(car_max):
+            driver = graph.add_vertex()
+            car = graph.add_vertex()
+            driver_nodes.append(driver)
+            car_nodes.append(car)
+            graph.add_edge(driver, car, 3)
+            lower_edges.append(graph.add_edge(self.source_index, car, 2))
+            lower_edges.append(graph.add_edge(driver, self.super_sink_index, 2))
+            graph.add_edge(car, self.pool_nodes[j], 5)
+
+        license = bytearray(n)
+        for driver in licenses:
+            license[driver] = 1
+
+        person_edges = []
+        for i in range(n):
+            node = graph.add_vertex()
+            lower_edges.append(graph.add_edge(self.source_index, node, 1))
+            edges = []
+            for j in preferences[i]:
+                if j < 0 or j >= car_max:
+                    raise ValueError("person %d prefers destination %d, but there are only %d cars" % (i, j, car_max))
+                target = driver_nodes[j] if license[i] else car_nodes[j]
+                edges.append((graph.add_edge(node, target, 1), j))
+            person_edges.append(edges)
+
+        self.people += n
+        graph.set_capacity(self.sink_edge, self.people)
+        self.trips.append((license, person_edges, lower_edges, car_max))
+        return len(self.trips) - 1
+
+    def solve(self):
+        '''
+        Function description:
+
+        Function for running the max-flow of every trip together.
+
+        :Output, return: the flow that was added
+
+        :Time complexity: O (E * sqrt(N)), where E is the number of edges and N is the number of people.
+        :Aux space complexity: O (N)
+        '''
+        return self.graph.max_flow(self.source_index, self.super_sink_index)
+
+    def served(self, trip):
+        '''
+        Function description:
+
+        Function for checking if the flow saturates every lower bound of the trip, so the trip is allocated.
+
+        :Time complexity: O(N), where N is the number of people of the trip.
+        :Aux space complexity: O(1)
+        '''
+        cap = self.graph.cap
+        for e in self.trips[trip][2]:
+            if cap[e] != 0:
+                return False
+        return True
+
+    def car_list(self, trip):
+        '''
+        Function description:
+
+        Function for reading the cars of the trip from the flow, the drivers of a car come before the passengers.
+
+        :Output, return: the list of cars
+
+        :Time complexity: O (E), where E is the number of preferences of the trip.
+        :Aux space complexity: O (N), where N is the number of people of the trip.
+        '''
+        license, person_edges, _, car_max = self.trips[trip]
+        drivers = [[] for _ in range(car_max)]
+        passengers = [[] for _ in range(car_max)]
+        for i in range(len(person_edges)):
+            for e, j in person_edges[i]:
+                if self.graph.flow(e) > 0:
+                    if license[i]:
+                        drivers[j].append(i)
+                    else:
+                        passengers[j].append(i)
+                    break
+        return [drivers[j] + passengers[j] for j in range(car_max)]
+
+class Allocator:
+    def __init__(self, preferences, licenses):
+        '''
+        Function description:
+
+        This function returns an allocator which keeps the solved flow network of allocate,
+        so the allocation can be repaired after a small change, instead of solving it again.
+
+        The changes are add_person, remove_person, change_preferences and set_license (toggle_license).
+        A removed person keeps its index, and add_person gives the next index.
+        The number of cars is always ceil(N/5), where N is the number of people who are not removed.
+
+        Approach description:
+
+        Step 1: make the LowerBoundNetwork and solve it with Dinic's algorithm, like allocate_dinic.
+        Step 2: for every change, cancel the flow of the person (one path super source -> person -> ... -> super sink),
+                and change the edges of the person.
+                The edges from super source which are no longer saturated are kept in the open set.
+        Step 3: repair, for every open edge, find a residual path from its vertex to the super sink
+                and add the flow on it. Only the part of the graph around the change is discovered.
+
+        The allocation is possible if and only if there is no open edge after the repair.
+        While it is not, every change searches from every open edge again (see _repair).
+
+        :Input:
+            argv1: preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
+            argv2: licenses : a list of integers, where licenses[i] is the index of the person who has the license of person i.
+
+        :Time complexity: O (E * sqrt(N)), where E is the number of preferences and N is the number of people.
+        :Aux space complexity: O (E), where E is the number of preferences.
+        '''
+        n = len(preferences)
+        car_max = math.ceil(n/5)
+
+        self.preferences = [list(person_preference) for person_preference in preferences]
+        self.active = bytearray(b"\x01") * n
+        self.active_count = n
+
+        # a destination which is not a car yet gets its edges when the car is added
+        self.network = LowerBoundNetwork(
+            [[j for j in person_preference if 0 <= j < car_max] for person_preference in self.preferences],
+            licenses,
+        )
+        self.graph = self.network.graph
+
+        # wanting[j] is the set of the people who prefer the destination j
+        self.wanting = {}
+        for i in range(n):
+            for j in self.preferences[i]:
+                self.wanting.setdefault(j, set()).add(i)
+
+        # the person and the car of every edge from a person to a car
+        self.edge_owner = {}
+        for i in range(n):
+            for e, j in self.network.person_edges[i]:
+                self.edge_owner[e] = (i, j)
+
+        self.network.solve()
+        self.car_of = [self.network.car_of(i) for i in range(n)]
+
+        # the edges from super source which are not saturated
+        self.open = set()
+        for e in self.network.source_edges:
+            if self.graph.cap[e] > 0:
+                self.open.add(e)
+        for edges in self.network.car_edges:
+            if self.graph.cap[edges[1]] > 0:
+                self.open.add(edges[1])
+
+    @property
+    def feasible(self):
+        '''
+        Function description:
+
+        True if every person and every lower bound is saturated, which means there is an allocation.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return len(self.open) == 0
+
+    def car_list(self):
+        '''
+        Function description:
+
+        Function for the current allocation, the drivers of a car come before the passengers.
+
+        :Output, return: the list of cars, or None if there is no allocation.
+
+        :Time complexity: O(N), where N is the number of people.
+        :Aux space complexity: O(N)
+        '''
+        if not self.feasible:
+            return None
+        drivers = [[] for _ in range(self.network.car_max)]
+        passengers = [[] for _ in range(self.network.car_max)]
+        for i in range(len(self.car_of)):
+            j = self.car_of[i]
+            if j is None or not self.active[i]:
+                continue
+            if self.network.license[i]:
+                drivers[j].append(i)
+            else:
+                passengers[j].append(i)
+        return [drivers[j] + passengers[j] for j in range(self.network.car_max)]
+
+    def add_person(self, person_preference, license=False):
+        '''
+        Function description:
+
+        Function for adding a new person, it returns the index of the person.
+
+        :Time complexity: O(P + R), where P is the number of the preferences and R is the work of the repair.
+        :Aux space complexity: O(P)
+        '''
+        person_preference = list(person_preference)
+        i = self.network.add_person([j for j in person_preference if 0 <= j < self.network.car_max], license)
+
+        self.preferences.append(person_preference)
+        self.active.append(1)
+        self.active_count += 1
+        self.car_of.append(None)
+        for j in person_preference:
+            self.wanting.setdefault(j, set()).add(i)
+        for e, j in self.network.person_edges[i]:
+            self.edge_owner[e] = (i, j)
+        self.open.add(self.network.source_edges[i])
+
+        self._update_cars()
+        self._repair()
+        return i
+
+    def remove_person(self, person):
+        '''
+        Function description:
+
+        Function for removing the person (the person drops out).
+
+        :Time complexity: O(P + R), where P is the number of the preferences and R is the work of the repair.
+        :Aux space complexity: O(1)
+        '''
+        self._check_active(person)
+        self._cancel_person(person)
+        self._close_person_edges(person)
+
+        e = self.network.source_edges[person]
+        self.graph.set_capacity(e, 0)
+        self.open.discard(e)
+
+        for j in self.preferences[person]:
+            self.wanting[j].discard(person)
+        self.active[person] = 0
+        self.active_count -= 1
+
+        self._update_cars()
+        self._repair()
+
+    def change_preferences(self, person, person_preference):
+        '''
+        Function description:
+
+        Function for changing the preferences of the person.
+
+        :Time complexity: O(P + R), where P is the number of the preferences and R is the work of the repair.
+        :Aux space complexity: O(P)
+        '''
+        self._check_active(person)
+        self._cancel_person(person)
+        self._close_person_edges(person)
+
+        for j in self.preferences[person]:
+            self.wanting[j].discard(person)
+        self.preferences[person] = list(person_preference)
+        for j in self.preferences[person]:
+            self.wanting.setdefault(j, set()).add(person)
+
+        self._open_person_edges(person)
+        self._repair()
+
+    def set_license(self, person, license):
+        '''
+        Function description:
+
+        Function for giving (or taking) the license of the person.
+
+        :Time complexity: O(P + R), where P is the number of the preferences and R is the work of the repair.
+        :Aux space complexity: O(P)
+        '''
+        self._check_active(person)
+        self._cancel_person(person)
+        self._close_person_edges(person)
+        self.network.license[person] = 1 if license else 0
+        self._open_person_edges(person)
+        self._repair()
+
+    def toggle_license(self, person):
+        '''
+        Function description:
+
+        Function for toggling the license of the person.
+
+        :Time complexity: O(P + R), where P is the number of the preferences and R is the work of the repair.
+        :Aux space complexity: O(P)
+        '''
+        self.set_license(person, not self.network.license[person])
+
+    def _check_active(self, person):
+        '''
+        Function description:
+
+        Function for checking that the person exists and is not removed, it raises ValueError if not.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        if person < 0 or person >= len(self.active) or not self.active[person]:
+            raise ValueError("person %d is not in the trip" % person)
+
+    def _open_person_edges(self, person):
+        '''
+        Function description:
+
+        Function for adding the edges from the person to the cars which exist, and opening its edge from super source.
+
+        :Time complexity: O(P), where P is the number of the preferences of the person.
+        :Aux space complexity: O(P)
+        '''
+        for j in self.preferences[person]:
+            if 0 <= j < self.network.car_max:
+                self.edge_owner[self.network.add_person_edge(person, j)] = (person, j)
+        self.open.add(self.network.source_edges[person])
+
+    def _close_person_edges(self, person, car=None):
+        '''
+        Function description:
+
+        Function for closing the edges from the person to the cars (or only to the car), they must have no flow.
+        A closed edge stays in the graph with capacity 0.
+
+        :Time complexity: O(P), where P is the number of the preferences of the person.
+        :Aux space complexity: O(1)
+        '''
+        kept = []
+        for e, j in self.network.person_edges[person]:
+            if car is None or j == car:
+                self.graph.set_capacity(e, 0)
+                del self.edge_owner[e]
+            else:
+                kept.append((e, j))
+        self.network.person_edges[person] = kept
+
+    def _cancel_person(self, person):
+        '''
+        Function description:
+
+        Function for cancelling the flow of the person, if the person is allocated.
+
+        :Time complexity: O(D), where D is the degree of the vertices on the path.
+        :Aux space complexity: O(1)
+        '''
+        if self.car_of[person] is not None:
+            self._cancel_through(self.network.source_edges[person])
+
+    def _cancel_through(self, edge):
+        '''
+        Function description:
+
+        Function for cancelling one unit of flow on a path super source -> ... -> super sink through the edge.
+
+        Approach description:
+
+        Step 1: go back from the edge to the super source, on the edges which have flow.
+        Step 2: go forward from the edge to the super sink, on the edges which have flow.
+        Step 3: remove 1 flow from every edge on the path, the first edge is not saturated anymore so it is open.
+
+        The network has no cycle, so both walks always end.
+
+        :Time complexity: O(D), where D is the degree of the vertices on the path.
+        :Aux space complexity: O(1)
+        '''
+        graph = self.graph
+        adj = graph.adj
+        to = graph.to
+        cap = graph.cap
+        source = self.network.source_index
+        super_sink = self.network.super_sink_index
+
+        path = [edge]
+
+        # go back to the super source, an odd edge with capacity is the reverse of an edge with flow
+        u = to[edge ^ 1]
+        while u != source:
+            for e in adj[u]:
+                if e & 1 and cap[e] > 0:
+                    path.append(e ^ 1)
+                    u = to[e]
+                    break
+
+        path.reverse()
+
+        # go forward to the super sink, an even edge is an original edge
+        u = to[edge]
+        while u != super_sink:
+            for e in adj[u]:
+                if not e & 1 and cap[e ^ 1] > 0:
+                    path.append(e)
+                    u = to[e]
+                    break
+
+        for e in path:
+            graph.push(e, -1)
+            owner = self.edge_owner.get(e)
+            if owner is not None and self.car_of[owner[0]] == owner[1]:
+                self.car_of[owner[0]] = None
+
+        self.open.add(path[0])
+
+    def _update_cars(self):
+        '''
+        Function description:
+
+        Function for adding or removing the last cars, so that there are ceil(N/5) cars,
+        and updating the capacity sink -> super sink to N.
+
+        :Time complexity: O(W), where W is the number of the people who prefer the added or removed cars.
+        :Aux space complexity: O(W)
+        '''
+        network = self.network
+        car_max = math.ceil(self.active_count/5)
+
+        while network.car_max < car_max:
+            j = network.add_car()
+            self.open.add(network.car_edges[j][1])
+            for person in self.wanting.get(j, ()):
+                self.edge_owner[network.add_person_edge(person, j)] = (person, j)
+
+        while network.car_max > car_max:
+            self._remove_last_car()
+
+        # the flow on sink -> super sink can not be more than N
+        while self.graph.flow(network.sink_edge) > self.active_count:
+            self._cancel_through(network.sink_edge)
+        self.graph.set_capacity(network.sink_edge, self.active_count)
+
+    def _remove_last_car(self):
+        '''
+        Function description:
+
+        Function for removing the last car, the people in it are cancelled and will be repaired into the other cars.
+
+        :Time complexity: O(W), where W is the number of the people who prefer the car.
+        :Aux space complexity: O(1)
+        '''
+        network = self.network
+        graph = self.graph
+        j = network.car_max - 1
+
+        for person in list(self.wanting.get(j, ())):
+            if self.car_of[person] == j:
+                self._cancel_through(network.source_edges[person])
+            self._close_person_edges(person, j)
+
+        # cancel the lower bound of the car, and close its edges
+        driver_car, source_car, driver_sink, car_sink = network.car_edges[j]
+        while graph.flow(source_car) > 0:
+            self._cancel_through(source_car)
+        self.open.discard(source_car)
+        for e in network.car_edges[j]:
+            graph.set_capacity(e, 0)
+
+        network.driver_nodes.pop()
+        network.car_nodes.pop()
+        network.car_edges.pop()
+        network.car_max -= 1
+
+    def _repair(self):
+        '''
+        Function description:
+
+        Function for saturating the open edges again.
+
+        Approach description:
+
+        For every open edge super source -> x, find a residual path from x to the super sink
+        which does not go back through the super source, and add 1 flow on it.
+        An edge which has no path stays open, then there is no allocation.
+
+        Every open edge is searched again at every change, not only the edges of the change,
+        because the change can make a path for any of them. While the trip is infeasible the open edges
+        which have no path stay open, so each change costs a full search from every one of them.
+        After many changes of an infeasible trip, solving it again with allocate can be faster.
+
+        :Time complexity: O(K * (V + E)) in the worst case, where K is the number of open edges,
+                          but a path is usually found close to the change when the trip is feasible.
+        :Aux space complexity: O(V)
+        '''
+        graph = self.graph
+        source = self.network.source_index
+        super_sink = self.network.super_sink_index
+
+        for edge in list(self.open):
+            while graph.cap[edge] > 0:
+                path = graph.find_path(graph.to[edge], super_sink, source)
+                if path is None:
+                    break
+                path.insert(0, edge)
+                for e in path:
+                    graph.push(e, 1)
+
+                    # update the car of the person, the reverse edge is before the new edge on the path
+                    owner = self.edge_owner.get(e & ~1)
+                    if owner is not None:
+                        if e & 1:
+                            if self.car_of[owner[0]] == owner[1]:
+                                self.car_of[owner[0]] = None
+                        else:
+                            self.car_of[owner[0]] = owner[1]
+
+            if graph.cap[edge] == 0:
+                self.open.discard(edge)
+
+class SolveCache:
+    def __init__(self, maxsize=1024, max_bytes=None, path=None):
+        '''
+        Function description:
+
+        This function returns a cache of the results of allocate, for the trips which are solved again.
+
+        Two trips are the same if they only differ in the order of the people:
+        the trip is canonicalised (the people are sorted by their license and their sorted preferences)
+        before it is hashed and solved, and the cached car list is mapped back to the indices of the caller.
+        The people with the same license and preferences can be swapped, so the car list is still valid.
+
+        The results are kept in an LRU in memory, and optionally in a sqlite file on disk.
+        A result which is evicted from memory stays on disk.
+
+        Attributes:
+        hits, misses, evictions : the counters of the memory LRU.
+        disk_hits : the misses of the memory LRU which were found on disk.
+
+        :Input:
+            argv1: maxsize : the maximum number of results in memory
+            argv2: max_bytes : the maximum size in bytes of the results in memory, no limit by default
+            argv3: path : the path of the sqlite file, no disk cache by default
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        from collections import OrderedDict
+
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+        self.database = None
+        if path is not None:
+            import sqlite3
+            self.database = sqlite3.connect(str(path))
+            self.database.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)")
+            self.database.commit()
+
+    def allocate(self, preferences, licenses, **options):
+        '''
+        Function description:
+
+        Function for allocate with the cache, the options are the other arguments of allocate.
+
+        The options which can change the car list (engine, backend, components, max_slowdown) are hashed with the trip.
+        For the "ranked" engine, the order of the preferences of every person is kept (see canonical_trip).
+        The others (stats, strict, workers, pool, deadline) are only used to solve the trip:
+        a hit has the "cache" phase in stats, and raises InfeasibleTrip with strict=True if there is no allocation.
+
+        Approach description:
+
+        Step 1: canonicalise the trip and hash it with the options.
+        Step 2: if the hash is in memory or on disk, unpack the car list.
+        Step 3: if not, solve the canonical trip and keep the car list.
+        Step 4: map the people of the car list back to the indices of the caller.
+
+        :Output, return: the list of cars, or None if there is no allocation.
+
+        :Time complexity: O(N log N + E) for a hit, where N is the number of people and E is the number of preferences.
+        :Aux space complexity: O(N + E)
+        '''
+        # the options which do not change the car list are not in the key,
+        # and components=False and max_slowdown=None are left out, so the keys are the same as the keys of before
+        run = {}
+        for name in ("stats", "strict", "workers", "pool", "deadline"):
+            if name in options:
+                run[name] = options.pop(name)
+        if not options.get("components", True):
+            del options["components"]
+        if "max_slowdown" in options and options["max_slowdown"] is None:
+            del options["max_slowdown"]
+
+        ranked = options.get("engine") == "ranked"
+        order, canonical_preferences, canonical_licenses = canonical_trip(preferences, licenses, ranked)
+        key = self.key(canonical_preferences, canonical_licenses, options)
+
+        value = self.get(key)
+        if value is None:
+            car_list = allocate(canonical_preferences, canonical_licenses, **options, **run)
+            value = _pack_car_list(car_list)
+            self.put(key, value)
+        else:
+            car_list = _unpack_car_list(value)
+            stats = run.get("stats")
+            if stats is not None:
+                stats.engine = options.get("engine")
+                stats.begin("cache")
+                stats.finish()
+            if car_list is None and run.get("strict"):
+                raise InfeasibleTrip("flow", None, None, "the cached allocation of the trip is None")
+
+        if car_list is None:
+            return None
+        return [[order[k] for k in car] for car in car_list]
+
+    def key(self, canonical_preferences, canonical_licenses, options):
+        '''
+        Function description:
+
+        Function for the stable hash (sha256) of the canonical trip and the options of allocate (see trip_key).
+
+        :Time complexity: O(E), where E is the number of preferences.
+        :Aux space complexity: O(E)
+        '''
+        return trip_key(canonical_preferences, canonical_licenses, options)
+
+    def get(self, key):
+        '''
+        Function description:
+
+        Function for the packed result of the key, from memory and then from disk, or None.
+
+        :Time complexity: O(1) in memory.
+        :Aux space complexity: O(1)
+        '''
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        if self.database is not None:
+            row = self.database.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                value = bytes(row[0])
+                self._remember(key, value)
+                return value
+        return None
+
+    def put(self, key, value):
+        '''
+        Function description:
+
+        Function for keeping the packed result of the key, in memory and on disk.
+
+        :Time complexity: O(1) amortized.
+        :Aux space complexity: O(R), where R is the size of the result.
+        '''
+        self._remember(key, value)
+        if self.database is not None:
+            self.database.execute("INSERT OR REPLACE INTO results VALUES (?, ?)", (key, value))
+            self.database.commit()
+
+    def _remember(self, key, value):
+        '''
+        Function description:
+
+        Function for adding the result to the memory LRU, and evicting the least recently used results
+        while there are more than maxsize results or more than max_bytes bytes.
+
+        :Time complexity: O(1) amortized.
+        :Aux space complexity: O(R), where R is the size of the result.
+        '''
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = value
+        self.size += len(value)
+
+        while self.entries and (len(self.entries) > self.maxsize
+                                or (self.max_bytes is not None and self.size > self.max_bytes)):
+            self.size -= len(self.entries.popitem(last=False)[1])
+            self.evictions += 1
+
+    def close(self):
+        '''
+        Function description:
+
+        Function for closing the disk cache.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+class AllocationService:
+    def __init__(self, max_concurrency=4, max_pending=None, executor=None, **options):
+        '''
+        Function description:
+
+        This function returns an asyncio front-end of allocate, for a server which must not block its event loop.
+
+        Every solve runs in an executor (a thread pool of max_concurrency threads by default).
+        The requests with the same trip and options which arrive while it is solved are coalesced,
+        they wait for the same solve instead of solving it again.
+        At most max_concurrency solves run at once, the others wait for their turn (backpressure),
+        and if max_pending requests are already waiting or running, ServiceBusy is raised at once.
+        A request can have a timeout, then AllocationTimeout is raised when the time is over,
+        and the solve stops at its next phase (see check_deadline).
+
+        Attributes:
+        requests, coalesced, solves, timeouts, rejected : the counters of the service.
+
+        :Input:
+            argv1: max_concurrency : the number of solves at once
+            argv2: max_pending : the number of different trips which can wait or run at once, no limit by default
+            argv3: executor : a concurrent.futures executor, a ThreadPoolExecutor by default.
+                              With a ProcessPoolExecutor, the deadline stops the solve in the process too.
+            argv4: options : the default options of allocate, e.g. engine
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.options = options
+
+        self.own_executor = executor is None
+        if executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_concurrency)
+        self.executor = executor
+
+        # the semaphore is made in the event loop, by the first request
+        self.semaphore = None
+
+        # key of the trip -> the future of its solve
+        self.inflight = {}
+
+        self.requests = 0
+        self.coalesced = 0
+        self.solves = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    async def allocate(self, preferences, licenses, timeout=None, **options):
+        '''
+        Function description:
+
+        Function for allocate in the executor, it returns the list of cars, or None if there is no allocation.
+
+        Approach description:
+
+        Step 1: hash the trip and the options (request_key), in the default executor of the event loop
+                if the trip has 1000 people or more.
+        Step 2: if the same key is being solved, wait for it, if not, start the solve (_solve).
+        Step 3: wait for the solve with asyncio.shield, so a request which is cancelled or too late
+                does not cancel the solve of the other requests.
+        Step 4: if the solve stopped at the deadline of another request, but this request has time left,
+                solve it again.
+
+        :Input:
+            argv1: preferences, licenses : the trip
+            argv2: timeout : the seconds which the request can wait, no limit by default
+            argv3: options : the options of allocate, they replace the default options of the service
+
+        :Output, return: the list of cars, or None
+
+        :Time complexity: O(E) to hash the trip, and the solve.
+        :Aux space complexity: O(E)
+        '''
+        import asyncio
+
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        options = dict(self.options, **options)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.requests += 1
+
+        # hash a big trip in a thread, so a burst of big trips does not block the event loop
+        if len(preferences) < 1000:
+            key = request_key(preferences, licenses, options)
+        else:
+            key = await asyncio.get_running_loop().run_in_executor(None, request_key, preferences, licenses, options)
+
+        while True:
+            future = self.inflight.get(key)
+            if future is None:
+                if self.max_pending is not None and len(self.inflight) >= self.max_pending:
+                    self.rejected += 1
+                    raise ServiceBusy("%d trips are already waiting or running" % len(self.inflight))
+                future = asyncio.ensure_future(self._solve(preferences, licenses, deadline, options))
+                future.add_done_callback(lambda done, key=key: self._forget(key, done))
+                self.inflight[key] = future
+            else:
+                self.coalesced += 1
+
+            try:
+                if deadline is None:
+                    return await asyncio.shield(future)
+                return await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+            except AllocationTimeout:
+                # the solve was started by a request with an earlier deadline
+                self._forget(key, future)
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.timeouts += 1
+                    raise
+            except asyncio.TimeoutError:
+                # asyncio.TimeoutError is the builtin TimeoutError only from Python 3.11
+                self.timeouts += 1
+                raise AllocationTimeout("the request did not finish in %s seconds" % timeout) from None
+
+    async def _solve(self, preferences, licenses, deadline, options):
+        '''
+        Function description:
+
+        Function for one solve in the executor, when the semaphore lets it run.
+
+        :Time complexity: the time of allocate.
+        :Aux space complexity: the space of allocate.
+        '''
+        import asyncio
+        from functools import partial
+
+        async with self.semaphore:
+            check_deadline(deadline)
+            self.solves += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(allocate, preferences, licenses, deadline=deadline, **options))
+
+    def _forget(self, key, future):
+        '''
+        Function description:
+
+        Function for removing the finished solve of the key, so the next request solves it again.
+        Its exception is read, so asyncio does not warn about it if every request has already timed out.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+        if future.done() and not future.cancelled():
+            future.exception()
+
+    def close(self):
+        '''
+        Function description:
+
+        Function for shutting down the executor, if it was made by the service.
+
+        :Time complexity: O(1), it does not wait for the running solves.
+        :Aux space complexity: O(1)
+        '''
+        if self.own_executor:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        '''
+        Function description:
+
+        Function for "async with AllocationService() as service".
+        '''
+        return self
+
+    async def __aexit__(self, *exc_info):
+        '''
+        Function description:
+
+        Function for closing the service at the end of "async with".
+        '''
+        self.close()
+
+class InfeasibleTrip(ValueError):
+    def __init__(self, constraint, destination, person, message):
+        '''
+        Function description:
+
+        The exception of check_trip, and of allocate(..., strict=True), for a trip which has no allocation.
+
+        Attributes:
+        constraint : which check failed, "preferences", "destination", "drivers", "seats",
+                     or "flow" if it was found by the engine.
+        destination : the index of the destination which failed, or None.
+        person : the index of the person which failed, or None.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        ValueError.__init__(self, message)
+        self.constraint = constraint
+        self.destination = destination
+        self.person = person
+
+    def as_dict(self):
+        '''
+        Function description:
+
+        Function for the reason as a dictionary, which is kept in AllocationStats.infeasible.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return {"constraint": self.constraint, "destination": self.destination, "person": self.person, "message": str(self)}
+
+class AllocationTimeout(TimeoutError):
+    '''
+    The exception of allocate(..., deadline=...) and AllocationService, for a solve which was too late.
+    '''
+
+class ServiceBusy(RuntimeError):
+    '''
+    The exception of AllocationService, when max_pending trips are already waiting or running.
+    '''
+
+class AllocationStats:
+    def __init__(self, callback=None):
+        '''
+        Function description:
 
-            # find the edge from u to v
-            for edge in getaway.vertices_list[u].edges:
-                if edge.v == v:
-                    edge.f += minimum_flow
+        This function returns the counters of an allocation, which are filled by allocate(..., stats=stats).
+        Without stats, allocate and the flow networks count nothing.
 
-                    # if the edge is from car to sink, allocate the driver to the car_list
-                    if edge.v >= getaway.og_vertices and edge.v <= getaway.og_vertices + getaway.car_max:
-                        car_list[edge.v - getaway.og_vertices].append(edge.u)
+        Attributes:
+        engine : the name of the engine.
+        phase_times : the wall time (seconds) of every phase, in the order of the phases.
+        bfs_calls : the number of BFS calls in every phase.
+        vertices_scanned, edges_scanned : the vertices served by the BFS calls, and their edges.
+        augmenting_paths : the number of augmenting paths.
+        backend : the name of the flow network backend of the "phased" engine, after choose_backend, or None.
+                  It is "spill" when the network is in temporary files (see SpillFlowNetwork).
+        peak_graph_bytes : the largest memory (bytes) of the flow network, an estimate for the "spill" backend
+                           (see SpillFlowNetwork.memory_bytes).
+        infeasible : None, or the reason of an infeasible trip (see InfeasibleTrip.as_dict).
 
-                        #allocated is True
-                        getaway.vertices_list[edge.u].allocated = True
-                    break
-            v = u
-        
-        # do bfs to find the path
-        path = getaway.bfs(getaway.source_index, getaway.sink_index)
+        :Input:
+            argv1: callback : called as callback("phase", data) at the end of every phase,
+                              where data has the name, the seconds and the BFS calls of the phase,
+                              and as callback("done", stats.as_dict()) at the end of the allocation.
 
-        # add the minimum flow to the maximum_flow
-        maximum_flow += minimum_flow
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.callback = callback
+        self.engine = None
+        self.backend = None
+        self.phase = None
+        self.phase_start = 0.0
+        self.phase_times = {}
+        self.bfs_calls = {}
+        self.vertices_scanned = 0
+        self.edges_scanned = 0
+        self.augmenting_paths = 0
+        self.peak_graph_bytes = 0
+        self.infeasible = None
+
+    def begin(self, phase):
+        '''
+        Function description:
 
-    # check every driver is allocated with enough number of people in the car
-    if maximum_flow != getaway.og_vertices:
-        return None
-    else:
-        return car_list
+        Function for ending the current phase (if any) and starting the next one.
+        A phase which is started again (e.g. for every component) adds to its time and BFS calls.
 
-class Queue:
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.end()
+        self.phase = phase
+        self.phase_times.setdefault(phase, 0.0)
+        self.bfs_calls.setdefault(phase, 0)
+        self.phase_start = time.perf_counter()
 
-    def __init__(self) -> None:
+    def end(self):
         '''
         Function description:
 
-        This function returns the queue.
+        Function for ending the current phase, its time is kept and it is sent to the callback.
 
-        Approach description:
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        if self.phase is None:
+            return
+        phase = self.phase
+        self.phase = None
+        self.phase_times[phase] += time.perf_counter() - self.phase_start
+        if self.callback is not None:
+            self.callback("phase", {"phase": phase, "seconds": self.phase_times[phase], "bfs_calls": self.bfs_calls[phase]})
+
+    def finish(self):
+        '''
+        Function description:
 
-        It will make the queue with the list.
+        Function for ending the allocation, all the counters are sent to the callback.
 
         :Time complexity: O(1)
         :Aux space complexity: O(1)
         '''
-        self.queue = []
+        self.end()
+        if self.callback is not None:
+            self.callback("done", self.as_dict())
 
-    def append(self, item):
+    def record_bfs(self, vertices, edges):
         '''
         Function description:
 
-        This function append the item to the queue.
-
-        Approach description:
+        Function for counting a BFS call of the current phase, with the vertices and the edges it scanned.
 
-        It will append the item to the queue.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        if self.phase is not None:
+            self.bfs_calls[self.phase] += 1
+        self.vertices_scanned += vertices
+        self.edges_scanned += edges
 
-        :Input:
-            argv1: item
-            - the item that will be appended to the queue
+    def record_graph(self, nbytes):
+        '''
+        Function description:
 
-        :Output, return: None
+        Function for keeping the largest memory of the flow network.
 
         :Time complexity: O(1)
         :Aux space complexity: O(1)
         '''
-        self.queue.append(item)
+        self.peak_graph_bytes = max(self.peak_graph_bytes, nbytes)
 
-    def serve(self):
+    def as_dict(self):
         '''
         Function description:
 
-        This function serve the item from the queue.
+        Function for the counters as a dictionary, for the metrics system or json.
 
-        Approach description:
+        :Time complexity: O(P), where P is the number of phases.
+        :Aux space complexity: O(P)
+        '''
+        return {
+            "engine": self.engine,
+            "backend": self.backend,
+            "phase_times": dict(self.phase_times),
+            "bfs_calls": dict(self.bfs_calls),
+            "total_bfs_calls": sum(self.bfs_calls.values()),
+            "vertices_scanned": self.vertices_scanned,
+            "edges_scanned": self.edges_scanned,
+            "augmenting_paths": self.augmenting_paths,
+            "peak_graph_bytes": self.peak_graph_bytes,
+            "infeasible": self.infeasible,
+        }
+
+class PreferenceArrays:
+    def __init__(self, offsets=None, targets=None, buffer=None):
+        '''
+        Function description:
 
-        It will serve the item from the queue.
+        This function returns the preferences of every person in 2 flat arrays (CSR),
+        it can be used instead of the list of lists everywhere.
+
+        The preferences of person i are targets[offsets[i] : offsets[i+1]].
+
+        Attributes:
+        offsets : array (or memoryview) of N + 1 integers.
+        targets : array (or memoryview) of the destinations of every person, one after another.
+        buffer  : the mmap which the memoryviews point to, it is kept open while this object exists.
 
         :Time complexity: O(1)
         :Aux space complexity: O(1)
         '''
-        return self.queue.pop(0)
+        self.offsets = offsets if offsets is not None else array("q", [0])
+        self.targets = targets if targets is not None else array("i")
+        self.buffer = buffer
 
-    def __len__(self):
+    def append(self, person_preference):
         '''
         Function description:
 
-        This function returns the length of the queue.
+        Function for adding the preferences of the next person.
 
-        Approach description:
+        :Time complexity: O(P), where P is the number of the preferences of the person.
+        :Aux space complexity: O(P)
+        '''
+        self.targets.extend(person_preference)
+        self.offsets.append(len(self.targets))
 
-        It will return the length of the queue.
+    def __len__(self):
+        '''
+        Function description:
 
-        :Output, return: 
-            return the length of the queue
+        This function returns the number of people.
 
         :Time complexity: O(1)
         :Aux space complexity: O(1)
         '''
-        return len(self.queue)
-
-class FlowNetwork:
-    def __init__(self,preferences):
+        return len(self.offsets) - 1
 
+    def __getitem__(self, i):
         '''
         Function description:
 
-        This function returns the flownetwork with the given preferences and licenses list.
-
-        Between source and sink, we need to visit person vertices and car vertices.
-
-        During allocating, we need to know about the capacity of the car and need to know about the license of the person.
+        This function returns the preferences of person i, as a slice of targets.
 
-        Approach description:
+        :Time complexity: O(P), O(1) for a memoryview, where P is the number of the preferences of the person.
+        :Aux space complexity: O(P), O(1) for a memoryview.
+        '''
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("person index out of range")
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
 
-        Step 1: make all the vertices for people. 
-        Step 2: find the enough number of car, and make vertices for car.
-        Step 3: add source and sink vertices.
-        Step 4: add edges from person to car.
-        Step 5: add edges from car to sink.
+    def __iter__(self):
+        '''
+        Function description:
 
-        For finding the path,(from source to sink) we will use the BFS algorithm.
-        during finding the path, it will compare the capacity and flow of the edge.
-  
-        :Input:
-            argv1: preferences
-            preferences : a list of lists of integers, where preferences[i] is a list of integers representing the preferences of person i.
-        
-        :Output, return: None
+        This function yields the preferences of every person.
 
-        :Time complexity: O (N^2), where N is the number of people. 
-        :Aux space complexity: O (N^2), where N is the number of people. 
+        :Time complexity: O(E), where E is the number of preferences.
+        :Aux space complexity: O(1)
         '''
-        
-        self.og_vertices = len(preferences)
-        self.vertices_list = []
-
-        # make all the vertices for each person
-        for i in range(self.og_vertices):
-            p1_vertex = Vertex(i)
-            self.vertices_list.append(p1_vertex)
+        for i in range(len(self)):
+            yield self.targets[self.offsets[i]:self.offsets[i + 1]]
 
-        # find the enough number of car , which is 2
-        self.car_max = math.ceil(len(preferences)/5)
+class Bitset:
+    def __init__(self, size, indices=(), bits=None):
+        '''
+        Function description:
 
-        # make all the vertices for car/destination
-        self.total_vertices = len(self.vertices_list)
-        for i in range(self.car_max):
-            c1_vertex = Vertex(self.total_vertices + i)
-            self.vertices_list.append(c1_vertex)
+        This function returns a set of the integers 0 .. size - 1, 1 bit per integer in a bytearray,
+        for the flags of the people (license, allocated), the passengers of allocate_phased (~license),
+        and the visited vertices of bfs.
 
-        # add source and sink vertices
-        self.vertices_list.append(Vertex(self.total_vertices + self.car_max))
-        self.vertices_list.append(Vertex(self.total_vertices + self.car_max + 1))
+        A flag can be read and written like a bytearray of 0 and 1 (bitset[i], bitset[i] = 1),
+        and a whole set is combined with &, |, - and ~, which run on the machine words of a Python int
+        instead of a Python loop for every person.
 
-        # add edges from person to car
-        for i in range(self.og_vertices):
-            for j in preferences[i]:
-                self.vertices_list[i].add_edge(Edge(i, self.total_vertices + j,1))
+        Attributes:
+        size : the number of integers.
+        bits : the bytearray (or writable memoryview) of (size + 7) // 8 bytes, bit i % 8 of byte i // 8 is i.
 
-        # add edges from car to sink
-        for i in range(self.car_max):
-            self.vertices_list[self.total_vertices + i].add_edge(Edge(self.total_vertices + i, self.total_vertices + self.car_max + 1,5))
+        :Input:
+            argv1: size : the number of integers
+            argv2: indices : the integers which are in the set at the start
+            argv3: bits : the bytes of the set, they are used without a copy (e.g. a view of load_network)
 
-        # add source and sink index
-        self.source_index = self.total_vertices + self.car_max
-        self.sink_index = self.total_vertices + self.car_max + 1
+        :Time complexity: O(size / 8 + K), where K is the number of indices.
+        :Aux space complexity: O(size / 8)
+        '''
+        self.size = size
+        self.bits = bits if bits is not None else bytearray((size + 7) >> 3)
+        for i in indices:
+            self.bits[i >> 3] |= 1 << (i & 7)
 
-    def add_edges(self,u,v,c):
+    def __getitem__(self, i):
         '''
         Function description:
 
-        Function for adding edges in the graph.
+        This function returns 1 if i is in the set, 0 if not.
 
-        Approach description:
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return (self.bits[i >> 3] >> (i & 7)) & 1
 
-        It will make edge between u and v with the capacity of c.
+    def __setitem__(self, i, value):
+        '''
+        Function description:
 
-        :Input:
-            u : the first vertex
-            v : the second vertex
-            c : the capacity of the edge
+        This function adds i to the set if value is true, and removes it if not.
 
         :Time complexity: O(1)
         :Aux space complexity: O(1)
         '''
+        if value:
+            self.bits[i >> 3] |= 1 << (i & 7)
+        else:
+            self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
 
-        my_edge = Edge(u,v,c)
-
-        # add edge to the first vertex
-        self.vertices_list[u].append(my_edge)
-
-    def reset(self):
+    def __contains__(self, i):
         '''
         Function description:
 
-        Function for reset the vertices before running BFS.
+        This function returns True if i is in the set.
 
-        Approach description:
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        return (self.bits[i >> 3] >> (i & 7)) & 1 == 1
 
-        It will make all the vertices undiscovered, visited to False and previous to None.
+    def add(self, i):
+        '''
+        Function description:
 
-        :Time complexity: O(N), where N is the number of people.
+        Function for adding i to the set.
+
+        :Time complexity: O(1)
         :Aux space complexity: O(1)
         '''
-        for vertex in self.vertices_list:
-            vertex.discovered = False
-            vertex.visited = False
-            vertex.previous = None
+        self.bits[i >> 3] |= 1 << (i & 7)
 
-    def bfs(self, source, sink):
+    def discard(self, i):
         '''
         Function description:
 
-        A method that runs this function is BFS algorithm to find the path from source to sink.
-        It uses queue from the source and discover the shortest next vertex with the weight but in here, all the weight is 1..
-        After discovering the vertex, it will mark the vertex as visited.
+        Function for removing i from the set, if it is in the set.
 
-        Approach description:
-
-        There are 2 main steps in this function.
-        Step 1: make all the vertices undiscovered, visited to False and previous to None.
-        Step 2: discover the vertex and mark it as visited.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        '''
+        self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
 
-        But during finding the path, it will compare the capacity and flow of the edge.
-        If the capacity is bigger than flow, it will go down the path.
-        If the capacity is smaller than flow, it will not go down the path because we consider the flow is already full.
+    def update(self, indices):
+        '''
+        Function description:
 
-        :Input:
-            argv1: source
-            - vertex index of the source
-            argv2: sink
-            - vertex index of the sink
+        Function for adding every integer of indices to the set.
 
-        :Output, return:
-            return True if there is a path from source to sink.
+        :Time complexity: O(K), where K is the number of indices.
+        :Aux space complexity: O(1)
+        '''
+        bits = self.bits
+        for i in indices:
+            bits[i >> 3] |= 1 << (i & 7)
 
-        :Time complexity: O(N^2), where N is the number of people.
-        :Aux space complexity: O(N), where N is the number of people.
+    def __len__(self):
         '''
-        # reset the vertices
-        self.reset()
+        Function description:
 
-        # make the source vertex discovered and visited
-        discovered = Queue()
-        discovered.append(source)
-        self.vertices_list[source].visited = True
+        This function returns the number of integers in the set (popcount).
 
+        :Time complexity: O(size / 64)
+        :Aux space complexity: O(size / 8)
+        '''
+        return int.from_bytes(self.bits, "little").bit_count()
 
-        # it will run while there is a vertex in the queue
-        while len(discovered) > 0 :
-            u = discovered.serve() 
+    def __iter__(self):
+        '''
+        Function description:
 
-            # it will go through all the edges of the vertex, N neighbours
-            for edge in self.vertices_list[u].edges:
+        This function yields the integers of the set in increasing order, a byte which is 0 is skipped
+        with 1 comparison, so a sparse set costs O(size / 8) and not O(size).
 
-                v = edge.v
+        :Time complexity: O(size / 8 + K), where K is the number of integers in the set.
+        :Aux space complexity: O(1)
+        '''
+        positions = BYTE_POSITIONS
+        for k, byte in enumerate(self.bits):
+            if byte:
+                base = k << 3
+                for bit in positions[byte]:
+                    yield base + bit
+
+    def _combine(self, value):
+        '''
+        Function description:
 
-                # if the vertex is not discovered and the capacity is bigger than flow, discover the vertex
-                if self.vertices_list[v].visited == False and edge.c - edge.f > 0 :
+        This function returns a new Bitset of the same size from an int, the bits above size are cleared.
 
-                    self.vertices_list[v].previous = u
+        :Time complexity: O(size / 64)
+        :Aux space complexity: O(size / 8)
+        '''
+        value &= (1 << self.size) - 1
+        return Bitset(self.size, bits=bytearray(value.to_bytes(len(self.bits), "little")))
 
-                    self.vertices_list[v].visited = True
-                
-                    discovered.append(v)
+    def __and__(self, other):
+        '''
+        Function description:
 
-        # return True if there is a path from source to sink
-        return self.vertices_list[sink].visited
+        This function returns the integers which are in both sets.
 
-class Vertex:
-    def __init__(self, id) -> None:
+        :Time complexity: O(size / 64)
+        :Aux space complexity: O(size / 8)
         '''
-        Function description:
-        Initialize a new vertex with the given ID.
-        My reference is from the lecutre and tutorial FIT2004.
-        
-        Approach description:
-        it will initialize the vertex with the given ID with the following attributes.
+        return self._combine(int.from_bytes(self.bits, "little") & int.from_bytes(other.bits, "little"))
 
-        Attributes:
-        id : id of vertex.
+    def __or__(self, other):
+        '''
+        Function description:
 
-        edges : A list of the edges.
+        This function returns the integers which are in one of the sets.
 
-        discovered : True if the vertex is found (pushed).
-        visited : True if the vertex is visited (poped).
+        :Time complexity: O(size / 64)
+        :Aux space complexity: O(size / 8)
+        '''
+        return self._combine(int.from_bytes(self.bits, "little") | int.from_bytes(other.bits, "little"))
 
-        previous : The previous vertex in the bfs's shortest path.
-        license  : True if the vertex has license.
+    def __sub__(self, other):
+        '''
+        Function description:
 
-        allocated: True if the vertex is allocated.
+        This function returns the integers which are in this set and not in other.
 
-        :Time complexity: O(1)
-        :Aux space complexity: O(1) 
+        :Time complexity: O(size / 64)
+        :Aux space complexity: O(size / 8)
         '''
-        self.id = id
+        return self._combine(int.from_bytes(self.bits, "little") & ~int.from_bytes(other.bits, "little"))
 
-        # list
-        self.edges = []
+    def __invert__(self):
+        '''
+        Function description:
 
-        # for traversal
-        self.discovered = False
-        self.visited = False
+        This function returns the integers 0 .. size - 1 which are not in the set.
 
-        # backtracking
-        self.previous = None
+        :Time complexity: O(size / 64)
+        :Aux space complexity: O(size / 8)
+        '''
+        return self._combine(~int.from_bytes(self.bits, "little"))
 
-        # license
-        self.license = False
+    def tobytes(self):
+        '''
+        Function description:
 
-        self.allocated = False
+        This function returns the bytes of the set, for save_network.
 
-    def add_edge(self, edge):
+        :Time complexity: O(size / 8)
+        :Aux space complexity: O(size / 8)
         '''
-        function description:
-        Add edge to the vertex.
+        return bytes(self.bits)
+
+# the bits which are set in every byte, for Bitset.__iter__
+BYTE_POSITIONS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+# the binary trip file of save_trip and load_trip
+TRIP_MAGIC = b"GTWY"
+TRIP_VERSION = 1
+
+# the network snapshot of save_network and load_network
+NETWORK_MAGIC = b"GTWN"
+NETWORK_VERSION = 2
+NETWORK_HEADER = "<4sIQQQQQ"
+
+# the number of people up to which allocate(..., engine="auto") uses the "tiny" engine (see choose_engine)
+TINY_TRIP = 30
+
+# the number of people from which allocate(..., backend="auto") uses the "kernel" backend (see choose_backend),
+# so _getaway_kernel is only imported for a trip which is big enough to pay for it
+KERNEL_TRIP = 1000
+
+# the bytes of the flow network of the "phased" engine which are kept in memory by SpillFlowNetwork,
+# allocate(..., backend="auto") uses the "spill" backend for a trip whose network is bigger (see choose_backend).
+# It only bounds the edge arrays and the state of the BFS, not the preferences, the car list or the other engines
+SPILL_BUDGET = 256 << 20
+
+# the bytes of KernelFlowNetwork for every edge and every vertex, rounded up from the 110 to 115 which were measured with
+# "python benchmark.py backends" (the lists of Python integers of the edges, the offsets and the state of the BFS)
+KERNEL_NETWORK_BYTES = 120
+
+# the directory of the files of SpillFlowNetwork, None for the temporary directory of tempfile
+SPILL_DIRECTORY = None
+
+# the flow networks which can be used by allocate
+NETWORK_BACKENDS = {
+    "object": FlowNetwork,
+    "lazy": LazyFlowNetwork,
+    "compact": CompactFlowNetwork,
+    "numpy": NumpyFlowNetwork,
+    "kernel": KernelFlowNetwork,
+    "spill": SpillFlowNetwork,
+}
+
+# the max-flow engines which can be used by allocate
+ENGINES = {
+    "dinic": allocate_dinic,
+    "phased": allocate_phased,
+    "scipy": allocate_scipy,
+    "bipartite": allocate_bipartite,
+    "ranked": allocate_ranked,
+    "tiny": allocate_tiny,
+}
+
+def main(argv=None, stdin=None, stdout=None):
+    '''
+    Function description:
 
-        Approach description:
-        It will add the edge to the vertex.
+    This function is the command line of getaway, for a short-lived worker which allocates one trip:
 
-        Attributes:
-        edge : the edge that will be added to the vertex.
+        python -m getaway [--engine E] [--backend B] [--strict] < trip.json > car_list.json
 
-        :Time complexity: O(1)
-        :Aux space complexity: O(1)
-        '''
-        self.edges.append(edge)
+    It reads the trip from stdin as JSON, {"preferences": [[0, 1], [1], ...], "licenses": [0, 3, ...]},
+    and writes the car list to stdout as JSON, or null if there is no allocation.
+    The arguments are read without argparse, and only json is imported, because the imports are most of the time
+    of a small trip after the start of Python (see benchmark.py startup). A small trip uses the "tiny" engine
+    (see choose_engine). --backend and the backend of choose_backend are only used with --engine phased.
+    A worker whose files are read-only should compile them when it is built (python -m compileall getaway.py),
+    or every start compiles getaway.py again.
 
-class Edge:
-    def __init__(self, u, v, c):
-        '''
-        Edge from start vertex u, to vertex v, with capacity c.
-        My reference is from the lecutre and tutorial FIT2004.
-        
-        Attributes:
-        u : The vertex ID that the edge is pointing from.
-        v : The vertex ID that the edge is pointing to.
-        c : The capacity of this edge.
+    :Input:
+        argv1: argv : the arguments, sys.argv[1:] by default
+        argv2: stdin : the file of the trip, sys.stdin by default
+        argv3: stdout : the file of the car list, sys.stdout by default
 
-        f : The flow of this edgee, we default first as a 0.
+    :Output, return: the exit status, 0 if there is an allocation, 1 if not, 2 if the arguments or the trip are wrong.
 
-        :Time complexity: O(1)
-        :Aux space complexity: O(1)
-        '''
-        self.u = u
-        self.v = v
-        self.c = c
-        self.f = 0
+    :Time complexity: the time of allocate.
+    :Aux space complexity: O(N + E), where N is the number of people and E is the number of preferences.
+    '''
+    import json
+    import sys
+
+    argv = sys.argv[1:] if argv is None else argv
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+    usage = "usage: python -m getaway [--engine E] [--backend B] [--strict] < trip.json\n"
+
+    options = {}
+    k = 0
+    while k < len(argv):
+        if argv[k] in ("-h", "--help"):
+            stdout.write(usage)
+            return 0
+        if argv[k] == "--strict":
+            options["strict"] = True
+            k += 1
+        elif argv[k] in ("--engine", "--backend") and k + 1 < len(argv):
+            options[argv[k][2:]] = argv[k + 1]
+            k += 2
+        else:
+            sys.stderr.write(usage + "getaway: unknown argument %s\n" % argv[k])
+            return 2
+
+    engine = options.get("engine", "auto")
+    if engine != "auto" and engine not in ENGINES:
+        sys.stderr.write("getaway: the engine is one of auto, %s\n" % ", ".join(ENGINES))
+        return 2
+    backend = options.get("backend", "auto")
+    if backend != "auto" and backend not in NETWORK_BACKENDS:
+        sys.stderr.write("getaway: the backend is one of auto, %s\n" % ", ".join(NETWORK_BACKENDS))
+        return 2
+
+    try:
+        trip = json.load(stdin)
+        car_list = allocate(trip["preferences"], trip["licenses"], **options)
+    except InfeasibleTrip as reason:
+        if reason.constraint != "destination":
+            # --strict, the reason is written instead of null
+            json.dump(reason.as_dict(), sys.stderr)
+            sys.stderr.write("\n")
+            stdout.write("null\n")
+            return 1
+        sys.stderr.write("getaway: %s\n" % reason)
+        return 2
+    except (ValueError, KeyError, TypeError, IndexError) as error:
+        sys.stderr.write("getaway: the trip is not valid, %s: %s\n" % (type(error).__name__, error))
+        return 2
+
+    json.dump(car_list, stdout)
+    stdout.write("\n")
+    return 0 if car_list is not None else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
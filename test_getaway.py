@@ -0,0 +1,982 @@
+'''
+Tests for getaway.py, run with:
+
+    python -m pytest -q
+'''
+
+import random
+
+import pytest
+
+import getaway
+
+
+def valid_allocation(preferences, licenses, car_list):
+    '''
+    Function description:
+
+    This function returns None if car_list is a valid allocation of the trip, or the reason why not.
+    '''
+    n = len(preferences)
+    licensed = set(licenses)
+    if len(car_list) != -(-n // 5):
+        return "%d cars instead of %d" % (len(car_list), -(-n // 5))
+    seen = set()
+    for j, car in enumerate(car_list):
+        if len(car) > 5:
+            return "car %d has %d people" % (j, len(car))
+        if sum(1 for person in car if person in licensed) < 2:
+            return "car %d has less than 2 drivers" % j
+        for person in car:
+            if person in seen:
+                return "person %d is in 2 cars" % person
+            if j not in preferences[person]:
+                return "person %d does not prefer car %d" % (person, j)
+            seen.add(person)
+    if len(seen) != n:
+        return "%d people are not allocated" % (n - len(seen))
+    return None
+
+
+def random_trip(rng, n):
+    '''
+    Function description:
+
+    This function returns a random trip of n people, with a random number of destinations and licenses.
+    '''
+    car_max = -(-n // 5)
+    preferences = [rng.sample(range(car_max), rng.randint(1, car_max)) for _ in range(n)]
+    licenses = sorted(rng.sample(range(n), rng.randint(0, n)))
+    return preferences, licenses
+
+
+def brute_force(preferences, licenses):
+    '''
+    Function description:
+
+    This function returns True if the trip has an allocation, by trying every car of every person.
+    '''
+    n = len(preferences)
+    car_max = -(-n // 5)
+    licensed = set(licenses)
+    people = [0] * car_max
+    drivers = [0] * car_max
+
+    def place(person):
+        if person == n:
+            return all(count >= 2 for count in drivers)
+        for j in preferences[person]:
+            if people[j] < 5:
+                people[j] += 1
+                drivers[j] += person in licensed
+                if place(person + 1):
+                    return True
+                people[j] -= 1
+                drivers[j] -= person in licensed
+        return False
+
+    return place(0)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_allocate_many_bad_job(workers):
+    # a job which can not be packed is None, the other jobs of its chunk are still solved
+    good = ([[0], [0], [0], [0], [0]], [0, 1])
+    jobs = [good, ([["x"]], [0]), good, None, ([[0], [0]], [0, 1])]
+    results = dict(getaway.allocate_many(jobs, workers=workers, chunksize=2))
+    assert sorted(results) == [0, 1, 2, 3, 4]
+    assert results[1] is None and results[3] is None
+    for k in (0, 2, 4):
+        preferences, licenses = jobs[k]
+        assert valid_allocation(preferences, licenses, results[k]) is None
+
+
+def test_cache_forwards_options():
+    # stats, components and strict reach the solve of a miss, and a hit is counted in stats
+    preferences = [[0], [0], [0], [0], [0], [1], [1], [1], [1], [1]]
+    licenses = [0, 1, 5, 6]
+    cache = getaway.SolveCache()
+
+    stats = getaway.AllocationStats()
+    car_list = getaway.allocate(preferences, licenses, cache=cache, stats=stats, components=True)
+    assert valid_allocation(preferences, licenses, car_list) is None
+    assert "components" in stats.phase_times
+
+    stats = getaway.AllocationStats()
+    assert getaway.allocate(preferences, licenses, cache=cache, stats=stats, components=True) == car_list
+    assert list(stats.phase_times) == ["cache"] and cache.hits == 1
+
+    getaway.allocate([[0]] * 5, [0], cache=cache)
+    with pytest.raises(getaway.InfeasibleTrip):
+        getaway.allocate([[0]] * 5, [0], cache=cache, strict=True)
+
+
+@pytest.mark.parametrize("engine, phases, counted", [
+    ("dinic", ["build", "maxflow"], ["bfs", "paths", "graph"]),
+    ("phased", ["build", "single", "multiple", "passengers"], ["bfs", "paths", "graph"]),
+    ("scipy", ["build", "maxflow"], ["graph"]),
+    ("bipartite", ["build", "drivers", "passengers"], ["bfs", "paths"]),
+    ("ranked", ["build", "mincost"], ["bfs", "paths", "graph"]),
+    ("tiny", ["drivers", "passengers"], ["paths"]),
+])
+def test_stats(engine, phases, counted):
+    # the phases and the counters of every engine, and the reason of a trip which check_trip passes but has no flow
+    preferences = [[0], [1, 0], [0], [1, 0], [0, 1], [0], [1, 0], [0, 1], [1], [0, 1]]
+    licenses = [0, 2, 3, 4, 8, 9]
+    stats = getaway.AllocationStats()
+    assert valid_allocation(preferences, licenses, getaway.allocate(preferences, licenses, engine=engine, stats=stats)) is None
+    assert stats.engine == engine and list(stats.phase_times) == ["precheck"] + phases
+    assert (sum(stats.bfs_calls.values()) > 0 and stats.vertices_scanned > 0 and stats.edges_scanned > 0) == ("bfs" in counted)
+    assert (stats.augmenting_paths > 0) == ("paths" in counted)
+    assert (stats.peak_graph_bytes > 0) == ("graph" in counted)
+    assert stats.infeasible is None
+
+    preferences = [[0, 1], [2, 0, 1], [1, 2, 0], [0, 2, 1], [1, 2], [2, 1], [2, 1], [0], [0, 2], [1, 0, 2],
+                   [0, 1, 2], [0], [2, 1], [0], [0, 1, 2]]
+    licenses = [0, 3, 10, 11, 12]
+    getaway.check_trip(preferences, licenses)
+    stats = getaway.AllocationStats()
+    assert getaway.allocate(preferences, licenses, engine=engine, stats=stats) is None
+    assert stats.infeasible["constraint"] == "flow" and engine in stats.infeasible["message"]
+
+
+@pytest.mark.parametrize("engine", sorted(getaway.ENGINES))
+def test_engine_against_brute_force(engine):
+    # every car list is valid, and every engine but "phased" finds an allocation when there is one
+    rng = random.Random(engine)
+    for _ in range(300):
+        preferences, licenses = random_trip(rng, rng.randint(1, 10))
+        feasible = brute_force(preferences, licenses)
+        car_list = getaway.allocate(preferences, licenses, engine=engine)
+        if car_list is None:
+            assert not feasible or engine == "phased"
+        else:
+            assert feasible
+            assert valid_allocation(preferences, licenses, car_list) is None
+
+
+@pytest.mark.parametrize("n", [50, 500])
+def test_engines_agree(n):
+    # the engines agree with "dinic" on bigger trips, which are too big for brute_force
+    rng = random.Random(n)
+    for _ in range(10):
+        preferences, licenses = random_trip(rng, n)
+        expected = getaway.allocate(preferences, licenses, engine="dinic") is not None
+        for engine in getaway.ENGINES:
+            car_list = getaway.allocate(preferences, licenses, engine=engine)
+            if car_list is None:
+                assert not expected or engine == "phased"
+            else:
+                assert expected
+                assert valid_allocation(preferences, licenses, car_list) is None
+
+
+@pytest.mark.parametrize("backend", sorted(getaway.NETWORK_BACKENDS))
+def test_bfs_same_path(backend):
+    # the bfs before find_path finds the same path, on a network with flow in it
+    rng = random.Random(3)
+    for _ in range(30):
+        preferences, licenses = random_trip(rng, rng.randint(1, 40))
+        network = getaway.NETWORK_BACKENDS[backend](preferences)
+        network.add_source_edges(list(range(len(preferences))))
+        car_list = [[] for _ in range(network.car_max)]
+        while True:
+            path = network.bfs(network.source_index, network.sink_index)
+            assert path == network.find_path(network.source_index, network.sink_index)
+            if path is None:
+                break
+            network.augment_path(path, car_list)
+
+
+def test_queue():
+    queue = getaway.Queue()
+    for item in range(5):
+        queue.append(item)
+    assert [queue.serve() for _ in range(3)] == [0, 1, 2]
+    queue.append(5)
+    assert len(queue) == 3 and [queue.serve() for _ in range(3)] == [3, 4, 5]
+
+
+def slow_allocate(monkeypatch, seconds):
+    '''
+    Function description:
+
+    This function replaces getaway.allocate (which AllocationService runs in its executor) with one which sleeps
+    for seconds before it checks the deadline and solves. It returns the list of the calls, and the most calls
+    which were running at once, in a dict.
+    '''
+    import threading
+    import time
+
+    allocate = getaway.allocate
+    lock = threading.Lock()
+    calls = {"calls": 0, "running": 0, "most": 0}
+
+    def slow(preferences, licenses, deadline=None, **options):
+        with lock:
+            calls["calls"] += 1
+            calls["running"] += 1
+            calls["most"] = max(calls["most"], calls["running"])
+        try:
+            time.sleep(seconds)
+            getaway.check_deadline(deadline)
+            return allocate(preferences, licenses, **options)
+        finally:
+            with lock:
+                calls["running"] -= 1
+
+    monkeypatch.setattr(getaway, "allocate", slow)
+    return calls
+
+
+def test_service_coalesces(monkeypatch):
+    # the same trip which is requested 5 times at once is solved once
+    import asyncio
+
+    calls = slow_allocate(monkeypatch, 0.05)
+    preferences = [[0], [0], [0], [0], [0]]
+    licenses = [0, 1]
+
+    async def run():
+        async with getaway.AllocationService() as service:
+            results = await asyncio.gather(*[service.allocate(preferences, licenses) for _ in range(5)])
+            return service, results
+
+    service, results = asyncio.run(run())
+    assert calls["calls"] == 1 and service.solves == 1 and service.coalesced == 4
+    for car_list in results:
+        assert valid_allocation(preferences, licenses, car_list) is None
+
+
+def test_service_backpressure(monkeypatch):
+    # max_concurrency solves run at once, even with more threads, and a request over max_pending is rejected
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = slow_allocate(monkeypatch, 0.05)
+    trips = [([[0]] * 5, [k, k + 1]) for k in range(3)]
+
+    async def run(**options):
+        async with getaway.AllocationService(**options) as service:
+            results = await asyncio.gather(*[service.allocate(*trip) for trip in trips], return_exceptions=True)
+            return service, results
+
+    with ThreadPoolExecutor(4) as executor:
+        service, results = asyncio.run(run(max_concurrency=1, executor=executor))
+    assert calls["most"] == 1 and service.solves == 3
+    for (preferences, licenses), car_list in zip(trips, results):
+        assert valid_allocation(preferences, licenses, car_list) is None
+
+    service, results = asyncio.run(run(max_pending=1))
+    assert valid_allocation(*trips[0], results[0]) is None
+    assert all(isinstance(result, getaway.ServiceBusy) for result in results[1:])
+    assert service.rejected == 2
+
+
+def test_service_timeout(monkeypatch):
+    # a request which is too late raises AllocationTimeout, and it does not stop a request of the same trip
+    # which has more time, the solve which stopped at the earlier deadline is solved again
+    import asyncio
+
+    calls = slow_allocate(monkeypatch, 0.2)
+    preferences = [[0], [0], [0], [0], [0]]
+    licenses = [0, 1]
+
+    async def run():
+        async with getaway.AllocationService() as service:
+            results = await asyncio.gather(service.allocate(preferences, licenses, timeout=0.05),
+                                           service.allocate(preferences, licenses, timeout=5),
+                                           return_exceptions=True)
+            return service, results
+
+    service, (early, late) = asyncio.run(run())
+    assert isinstance(early, getaway.AllocationTimeout)
+    assert valid_allocation(preferences, licenses, late) is None
+    assert calls["calls"] == 2 and service.solves == 2 and service.timeouts == 1
+
+
+def check_allocator(allocator, preferences, licensed):
+    '''
+    Function description:
+
+    This function checks the car list of the allocator against the trip of the people who are not removed,
+    preferences[i] is None for a removed person. It returns True if the trip has an allocation.
+    '''
+    people = [i for i in range(len(preferences)) if preferences[i] is not None]
+    index = {person: k for k, person in enumerate(people)}
+    trip = [preferences[person] for person in people]
+    licenses = [index[person] for person in people if person in licensed]
+    car_max = -(-len(people) // 5)
+
+    car_list = allocator.car_list()
+    feasible = brute_force([[j for j in person_preference if j < car_max] for person_preference in trip], licenses)
+    assert allocator.feasible == feasible
+    if car_list is not None:
+        car_list = [[index[person] for person in car] for car in car_list]
+        assert valid_allocation(trip, licenses, car_list) is None
+    return feasible
+
+
+def test_allocator_edits():
+    # every edit gives a valid car list, or None when the trip has no allocation
+    rng = random.Random(5)
+    transitions = 0
+    for _ in range(60):
+        preferences, licenses = random_trip(rng, rng.randint(1, 10))
+        allocator = getaway.Allocator(preferences, licenses)
+        preferences = [list(person_preference) for person_preference in preferences]
+        licensed = set(licenses)
+        feasible = check_allocator(allocator, preferences, licensed)
+
+        for _ in range(25):
+            people = [i for i in range(len(preferences)) if preferences[i] is not None]
+            car_max = -(-len(people) // 5)
+            edit = rng.choice(["add", "remove", "change", "license"])
+            person = rng.choice(people)
+            person_preference = rng.sample(range(car_max + 1), rng.randint(1, car_max + 1))
+            if edit == "add" and len(people) < 12:
+                license = rng.random() < 0.5
+                person = allocator.add_person(person_preference, license)
+                assert person == len(preferences)
+                preferences.append(person_preference)
+                if license:
+                    licensed.add(person)
+            elif edit == "remove" and len(people) > 1:
+                allocator.remove_person(person)
+                preferences[person] = None
+                licensed.discard(person)
+            elif edit == "change":
+                allocator.change_preferences(person, person_preference)
+                preferences[person] = person_preference
+            elif edit == "license":
+                allocator.toggle_license(person)
+                licensed ^= {person}
+
+            was_feasible, feasible = feasible, check_allocator(allocator, preferences, licensed)
+            transitions += feasible and not was_feasible
+    assert transitions > 0
+
+    # a removed person can not be changed
+    allocator = getaway.Allocator([[0]] * 5, [0, 1])
+    allocator.remove_person(4)
+    with pytest.raises(ValueError):
+        allocator.toggle_license(4)
+
+
+def test_allocator_infeasible_then_feasible():
+    # a car with 1 driver has no allocation, until a second person gets a license
+    allocator = getaway.Allocator([[0]] * 5, [0])
+    assert allocator.car_list() is None and not allocator.feasible
+    allocator.set_license(3, True)
+    assert valid_allocation([[0]] * 5, [0, 3], allocator.car_list()) is None
+
+    # a sixth person opens car 1, which has no driver, removing the person closes it again
+    person = allocator.add_person([0, 1])
+    assert allocator.car_list() is None
+    allocator.remove_person(person)
+    assert valid_allocation([[0]] * 5, [0, 3], allocator.car_list()) is None
+
+
+def check_schedule(trips, inventory, results):
+    '''
+    Function description:
+
+    This function checks that every car list of schedule_trips is valid for its trip,
+    and that the trips together take at most inventory[j] seats of every destination j.
+    '''
+    taken = [0] * len(inventory)
+    for (preferences, licenses), car_list in zip(trips, results):
+        if car_list is not None:
+            assert valid_allocation(preferences, licenses, car_list) is None
+            for j in range(len(car_list)):
+                taken[j] += len(car_list[j])
+    assert all(taken[j] <= inventory[j] for j in range(len(inventory)))
+
+
+def fleet_trips(rng, count):
+    '''
+    Function description:
+
+    This function returns count random trips of 11 to 15 people (3 cars) who all have a license.
+    '''
+    trips = []
+    for _ in range(count):
+        n = rng.randint(11, 15)
+        trips.append(([rng.sample(range(3), rng.randint(1, 3)) for _ in range(n)], list(range(n))))
+    return trips
+
+
+def test_schedule_trips_one_car():
+    # 2 trips want the 5 seats of one destination, the first one gets them and the second one is reported as None
+    trip = ([[0]] * 5, [0, 1])
+    assert getaway.schedule_trips([trip, trip], [5]) == [[[0, 1, 2, 3, 4]], None]
+    results = getaway.schedule_trips([trip, trip], [10])
+    check_schedule([trip, trip], [10], results)
+    assert None not in results
+
+    # a trip which has no allocation is None, and it takes no seats from the next trip
+    results = getaway.schedule_trips([([[0]] * 5, [0]), trip], [5])
+    assert results[0] is None and results[1] is not None
+
+    with pytest.raises(ValueError):
+        getaway.schedule_trips([([[0]] * 6, [0, 1]), trip], [10])
+
+
+def test_schedule_trips_inventory():
+    # the seats of a destination are never taken twice, with the batches of max_edges too
+    rng = random.Random(22)
+    for _ in range(50):
+        trips = fleet_trips(rng, 6)
+        inventory = [rng.randint(10, 25) for _ in range(3)]
+        for max_edges in (1, 2000000):
+            check_schedule(trips, inventory, getaway.schedule_trips(trips, inventory, max_edges=max_edges))
+
+
+def test_schedule_trips_batches(monkeypatch):
+    # with max_edges=1 every conflict is a batch of its own, without it the conflicts are one batch
+    schedule_batch = getaway._schedule_batch
+    batches = []
+
+    def logged(trips, batch, seats, *args):
+        batches.append(list(batch))
+        return schedule_batch(trips, batch, seats, *args)
+
+    monkeypatch.setattr(getaway, "_schedule_batch", logged)
+    rng = random.Random(0)
+    trips = fleet_trips(rng, 6)
+    inventory = [rng.randint(10, 25) for _ in range(3)]
+
+    check_schedule(trips, inventory, getaway.schedule_trips(trips, inventory))
+    assert len(batches) == 1 and len(batches[0]) >= 2
+    conflicts = batches.pop()
+
+    check_schedule(trips, inventory, getaway.schedule_trips(trips, inventory, max_edges=1))
+    assert batches == [[t] for t in conflicts]
+
+
+def check_partial(preferences, car_list, unallocated):
+    '''
+    Function description:
+
+    This function checks an allocation so far of AnytimeAllocator: every person in a car prefers it,
+    a car has at most 5 people, and the people who are not in a car are unallocated.
+    It returns the number of people in a car.
+    '''
+    seen = set()
+    for j, car in enumerate(car_list):
+        assert len(car) <= 5
+        for person in car:
+            assert person not in seen and j in preferences[person]
+            seen.add(person)
+    assert sorted(unallocated) == sorted(set(range(len(preferences))) - seen)
+    return len(seen)
+
+
+def test_anytime_allocator():
+    # a run of 1 iteration at a time only adds people, and the end is the car list of "bipartite"
+    rng = random.Random(16)
+    for n in [rng.randint(1, 30) for _ in range(100)] + [500]:
+        preferences, licenses = random_trip(rng, n)
+        anytime = getaway.AnytimeAllocator(preferences, licenses)
+        allocated = 0
+        runs = 0
+        while anytime.stage != "done":
+            car_list, unallocated, status = anytime.run(iterations=1)
+            count = check_partial(preferences, car_list, unallocated)
+            assert count >= allocated
+            allocated = count
+            runs += 1
+            assert runs <= 100 * (n + 1)
+        expected = getaway.allocate(preferences, licenses, engine="bipartite")
+        if status == "feasible":
+            assert valid_allocation(preferences, licenses, car_list) is None
+            assert car_list == expected
+        else:
+            assert status == "infeasible" and expected is None
+
+
+def test_anytime_allocator_no_time():
+    # a budget of 0 seconds or 0 iterations gives the allocation so far, it does not raise
+    rng = random.Random(160)
+    preferences, licenses = random_trip(rng, 2000)
+    anytime = getaway.AnytimeAllocator(preferences, licenses)
+    for options in ({"seconds": 0}, {"iterations": 0}):
+        car_list, unallocated, status = anytime.run(**options)
+        check_partial(preferences, car_list, unallocated)
+        assert status == "partial"
+
+    # short runs only add people, until the allocation is done
+    allocated = 0
+    while status == "partial":
+        car_list, unallocated, status = anytime.run(seconds=0.001)
+        count = check_partial(preferences, car_list, unallocated)
+        assert count >= allocated
+        allocated = count
+    assert anytime.stage == "done"
+    assert (status == "feasible") == (getaway.allocate(preferences, licenses, engine="bipartite") is not None)
+
+
+@pytest.mark.parametrize("size", [0, 1, 7, 8, 9, 63, 64, 65, 1001])
+def test_bitset(size):
+    # a Bitset is the same as a set of 0 .. size - 1, the bits above size are never set
+    rng = random.Random(size)
+    expected = set(rng.sample(range(size), size // 2))
+    bitset = getaway.Bitset(size, expected)
+    for i in rng.sample(range(size), size // 3):
+        if rng.random() < 0.5:
+            bitset.add(i)
+            expected.add(i)
+        else:
+            bitset.discard(i)
+            expected.discard(i)
+    if size:
+        bitset[size - 1] = 1
+        expected.add(size - 1)
+        bitset[0] = 0
+        expected.discard(0)
+
+    assert list(bitset) == sorted(expected) and len(bitset) == len(expected)
+    assert all((i in bitset) == (i in expected) and bitset[i] == (i in expected) for i in range(size))
+    assert len(bitset.bits) == (size + 7) // 8
+
+    other = set(rng.sample(range(size), size // 2))
+    bitset_other = getaway.Bitset(size, other)
+    assert list(bitset & bitset_other) == sorted(expected & other)
+    assert list(bitset | bitset_other) == sorted(expected | other)
+    assert list(bitset - bitset_other) == sorted(expected - other)
+    assert list(~bitset) == sorted(set(range(size)) - expected) and len(~bitset) == size - len(expected)
+    assert getaway.Bitset(size, bits=bytearray(bitset.tobytes())).tobytes() == bitset.tobytes()
+
+
+@pytest.mark.parametrize("preferences, licenses, reason", [
+    ([[0], [], [0], [0], [0]], [0, 2], ("preferences", None, 1)),
+    ([[0], [0], [0], [0], [0, 1]], [0, 2], ("destination", 1, 4)),
+    ([[0], [-1], [0], [0], [0]], [0, 2], ("destination", -1, 1)),
+    ([[0], [0], [0], [0], [0], [1], [1], [1], [1], [1]], [0, 1, 5], ("drivers", 1, None)),
+    ([[0]] * 10, [0, 1, 2, 3], ("drivers", 1, None)),
+    ([[0]] * 5, [0, 0, 1, 1], None),
+    ([[0]] * 5, [3, 3], ("drivers", 0, None)),
+    ([[0, 0]] * 5, [0, 1], None),
+    ([[0, 0]] * 4 + [[0, 0, 0]], [4, 4], ("drivers", 0, None)),
+    ([[0]] * 4 + [[0, 1]] * 2 + [[1]] * 4, [4, 5, 6, 7], ("seats", 0, None)),
+    ([[0, 1], [0], [1], [0, 1], [0], [1], [0], [1], [0], [1]], [0, 1, 2], ("drivers", 1, 0)),
+    ([], [], None),
+])
+def test_check_trip(preferences, licenses, reason):
+    # the constraint, the destination and the person of the InfeasibleTrip, or None for a trip which passes
+    if reason is None:
+        getaway.check_trip(preferences, licenses)
+        assert valid_allocation(preferences, licenses, getaway.allocate(preferences, licenses, strict=True)) is None
+        return
+    with pytest.raises(getaway.InfeasibleTrip) as caught:
+        getaway.check_trip(preferences, licenses)
+    failure = caught.value.as_dict()
+    assert (failure["constraint"], failure["destination"], failure["person"]) == reason
+    assert failure["message"] == str(caught.value)
+
+    stats = getaway.AllocationStats()
+    if reason[0] == "destination":
+        with pytest.raises(getaway.InfeasibleTrip):
+            getaway.allocate(preferences, licenses, stats=stats)
+    else:
+        assert getaway.allocate(preferences, licenses, stats=stats) is None
+    assert stats.infeasible == failure
+
+
+def test_numpy_network():
+    # the NumPy build gives the arrays of CompactFlowNetwork, also for a PreferenceArrays, and the same car capacities
+    pytest.importorskip("numpy")
+    rng = random.Random(11)
+    for n in [rng.randint(1, 20) for _ in range(50)] + [0, 1000]:
+        preferences, licenses = random_trip(rng, n) if n else ([], [])
+        arrays = getaway.PreferenceArrays()
+        for person_preference in preferences:
+            arrays.append(person_preference)
+        compact = getaway.CompactFlowNetwork(preferences)
+        for trip in (preferences, arrays):
+            network = getaway.NumpyFlowNetwork(trip)
+            assert network.numpy is not None
+            for name in ("offsets", "u", "v", "c", "f"):
+                assert list(getattr(network, name)) == list(getattr(compact, name)), name
+            assert network.car_edges_start == compact.car_edges_start
+
+        # the capacities of the cars after the flow of a phase
+        for flow_network in (network, compact):
+            flow_network.add_source_edges(licenses)
+            flow_network.warm_start([[] for _ in range(flow_network.car_max)])
+            flow_network.freeze_car_capacity(2)
+        assert list(network.c) == list(compact.c)
+        network.set_car_capacity(5)
+        compact.set_car_capacity(5)
+        assert list(network.c) == list(compact.c)
+
+
+def greedy_count(preferences, people, seats):
+    '''
+    Function description:
+
+    This function returns the number of people who get a seat when every person of people, in order,
+    takes the first car of their preferences which has a seat left. seats is updated.
+    '''
+    count = 0
+    for person in people:
+        for j in preferences[person]:
+            if seats[j] > 0:
+                seats[j] -= 1
+                count += 1
+                break
+    return count
+
+
+def run_phases(network, preferences, licenses, warm):
+    '''
+    Function description:
+
+    This function runs the phases of allocate_phased on the network, with or without the warm start,
+    and returns the car list, and the flow of the warm start and the greedy count (see greedy_count) of every phase.
+    '''
+    car_list = [[] for _ in range(network.car_max)]
+    flows = []
+    sources = []
+    network.license.update(licenses)
+    phases = [[driver for driver in licenses if len(preferences[driver]) == 1],
+              [driver for driver in licenses if len(preferences[driver]) > 1],
+              list(~network.license)]
+    for k, people in enumerate(phases):
+        # the seats which are left in every car, with the capacity of the phase
+        if k == 0:
+            seats = [5] * network.car_max
+        elif k == 1:
+            network.freeze_car_capacity(2)
+            seats = [max(2, len(car)) - len(car) for car in car_list]
+        else:
+            network.set_car_capacity(5)
+            seats = [5 - len(car) for car in car_list]
+        network.add_source_edges(people)
+        sources.extend(people)
+        if warm:
+            # the people of the earlier phases who are not in a car yet are tried again first
+            seated = {person for car in car_list for person in car}
+            waiting = [person for person in sources if person not in seated]
+            flows.append((network.warm_start(car_list), greedy_count(preferences, waiting, seats)))
+        getaway.augment_all(network, car_list)
+    return car_list, flows
+
+
+@pytest.mark.parametrize("backend", sorted(getaway.NETWORK_BACKENDS))
+def test_warm_start(backend):
+    # the warm start of every phase adds the flow of the greedy pass, and augment_all ends with the same cars without it
+    rng = random.Random(13)
+    network_class = getaway.NETWORK_BACKENDS[backend]
+    for n in [rng.randint(1, 30) for _ in range(100)] + [300]:
+        preferences, licenses = random_trip(rng, n)
+        car_list, flows = run_phases(network_class(preferences), preferences, licenses, True)
+        for flow, greedy in flows:
+            assert flow == greedy
+        assert run_phases(network_class(preferences), preferences, licenses, False)[0] == car_list
+
+
+def lazy_people(network):
+    '''
+    Function description:
+
+    This function returns the people of the LazyFlowNetwork network whose edges were made.
+    '''
+    return [i for i in range(network.og_vertices) if "edges" in network.vertices_list[i].__dict__]
+
+
+def test_lazy_network():
+    # the edges of a person are only made when a BFS expands the person, warm_start only makes the edge with the flow
+    network = getaway.LazyFlowNetwork([[0, 1]] * 5 + [[0]] * 5)
+    network.add_source_edges(range(10))
+    car_list = [[], []]
+    assert lazy_people(network) == []
+    assert network.warm_start(car_list) == 5 and car_list == [[0, 1, 2, 3, 4], []]
+    assert lazy_people(network) == []
+    assert [network.vertices_list[i].flow_edge[0] for i in range(5)] == [0] * 5
+    getaway.augment_all(network, car_list)
+    assert lazy_people(network) == [5, 6, 7, 8, 9]
+
+    # the edges which are made are the edges of the preferences, with the edge of the flow at its position
+    vertex = network.vertices_list[0]
+    flow_edge = vertex.flow_edge[1]
+    assert vertex.edges[0] is flow_edge and [edge.v for edge in vertex.edges] == [10, 11]
+    with pytest.raises(AttributeError):
+        vertex.missing
+
+    # a person who gets a car in the warm start is never expanded
+    rng = random.Random(19)
+    made = people = 0
+    for n in [rng.randint(1, 30) for _ in range(100)] + [300]:
+        preferences, licenses = random_trip(rng, n)
+        network = getaway.LazyFlowNetwork(preferences)
+        run_phases(network, preferences, licenses, True)
+        for i in lazy_people(network):
+            assert network.vertices_list[i].flow_edge is None
+        made += len(lazy_people(network))
+        people += n
+    assert 0 < made < people // 2
+
+
+def grouped_trip(rng, groups, people):
+    '''
+    Function description:
+
+    This function returns a random trip of people people whose preferences are inside one of the groups
+    (lists of destinations), so the groups are the components, and the people of every group. The group
+    of a person is the group of a random destination, so bigger groups get more people.
+    '''
+    destinations = [g for g, group in enumerate(groups) for _ in group]
+    preferences = []
+    members = [[] for _ in groups]
+    for i in range(people):
+        g = rng.choice(destinations)
+        preferences.append(rng.sample(groups[g], rng.randint(1, len(groups[g]))))
+        members[g].append(i)
+    return preferences, members
+
+
+def test_components():
+    # find_components splits the trip by the groups, and the cars of every component are put back to their destinations
+    rng = random.Random(14)
+    groups = [[0, 2], [1], [3, 4]]
+    preferences, members = grouped_trip(rng, groups, 25)
+    components = getaway.find_components(preferences, 5)
+    assert components == [(group, people) for group, people in zip(groups, members) if people]
+
+    feasible = 0
+    for _ in range(100):
+        groups = [[0, 2], [1], [3, 4, 5]]
+        preferences, members = grouped_trip(rng, groups, rng.randint(26, 28))
+        licenses = sorted(rng.sample(range(len(preferences)), rng.randint(16, len(preferences))))
+        expected = getaway.allocate(preferences, licenses, engine="dinic")
+        for engine, workers in (("bipartite", None), ("dinic", None), ("scipy", None), ("bipartite", 2)):
+            stats = getaway.AllocationStats()
+            car_list = getaway.allocate_components(preferences, licenses, engine, workers=workers, stats=stats)
+            assert (car_list is None) == (expected is None)
+            assert "components" in stats.phase_times
+            if car_list is not None:
+                assert "merge" in stats.phase_times
+                assert valid_allocation(preferences, licenses, car_list) is None
+                for group, people in zip(groups, members):
+                    assert sorted(person for j in group for person in car_list[j]) == people
+        feasible += expected is not None
+    assert feasible > 0
+
+    # a destination which nobody prefers has no drivers
+    assert getaway.allocate_components([[0]] * 5 + [[0, 2]] * 5 + [[2]] * 5, list(range(15))) is None
+
+
+def test_save_network_object_backend(tmp_path):
+    # the snapshot of the object graph is the same as the one of the compact arrays, and saving it changes nothing
+    preferences = [[0], [0, 1], [1], [0], [1], [0, 1], [1], [0], [0], [1]]
+    licenses = [0, 2, 3, 4]
+    network = getaway.FlowNetwork(preferences)
+    state = dict(vars(network))
+    getaway.save_network(tmp_path / "object.bin", network)
+    assert vars(network) == state
+
+    getaway.allocate_phased(preferences, licenses, "object", snapshot=tmp_path / "object.bin")
+    getaway.allocate_phased(preferences, licenses, "compact", snapshot=tmp_path / "compact.bin")
+    assert (tmp_path / "object.bin").read_bytes() == (tmp_path / "compact.bin").read_bytes()
+
+
+def test_trip_files(tmp_path):
+    # a trip written as JSON lines, CSV or binary is read back with the same preferences and licenses
+    import json
+
+    rng = random.Random(6)
+    for n in [1, 7, 30, 101]:
+        preferences, licenses = random_trip(rng, n)
+        licenses = sorted(licenses)
+        drivers = set(licenses)
+        with open(tmp_path / "trip.jsonl", "w") as file:
+            for i, person_preference in enumerate(preferences):
+                file.write(json.dumps({"preferences": person_preference, "license": i in drivers}) + "\n")
+        with open(tmp_path / "trip.csv", "w") as file:
+            file.write("license,destinations\n")
+            for i, person_preference in enumerate(preferences):
+                file.write(",".join([str(int(i in drivers))] + [str(j) for j in person_preference]) + "\n")
+
+        for name in ("trip.jsonl", "trip.csv"):
+            loaded, loaded_licenses = getaway.load_trip(tmp_path / name)
+            assert [list(person_preference) for person_preference in loaded] == preferences
+            assert list(loaded_licenses) == licenses
+
+            # the trip which was read is saved in the binary format and read again
+            getaway.save_trip(tmp_path / "trip.bin", loaded, loaded_licenses)
+            binary, binary_licenses = getaway.load_trip(tmp_path / "trip.bin")
+            assert [list(person_preference) for person_preference in binary] == preferences
+            assert list(binary_licenses) == licenses
+            assert getaway.allocate(binary, binary_licenses) == getaway.allocate(preferences, licenses)
+
+    # every truncated binary file is rejected, instead of giving a shorter trip
+    data = (tmp_path / "trip.bin").read_bytes()
+    for size in (0, 10, 24, 40, len(data) - 1):
+        (tmp_path / "truncated.bin").write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            getaway.load_trip(tmp_path / "truncated.bin")
+
+    # a destination which is not an integer, and an unknown format
+    (tmp_path / "bad.csv").write_text("license,destinations\n1,0,1\n0,x\n")
+    with pytest.raises(ValueError, match="line 3"):
+        getaway.load_trip(tmp_path / "bad.csv")
+    with pytest.raises(ValueError):
+        getaway.load_trip(tmp_path / "trip.jsonl", format="xml")
+
+
+def rank_sum(preferences, car_list):
+    '''
+    Function description:
+
+    This function returns the sum of the ranks of the cars of every person in their preferences.
+    '''
+    return sum(preferences[person].index(j) for j, car in enumerate(car_list) for person in car)
+
+
+def test_ranked_cache_keeps_ranks():
+    # the cache must not sort the preferences of the "ranked" engine, their order is the rank
+    preferences = [[1, 0], [1, 0], [0, 1], [0, 1], [0, 1], [1, 0], [1, 0], [0, 1], [1, 0], [0, 1]]
+    licenses = list(range(10))
+    plain = getaway.allocate(preferences, licenses, engine="ranked")
+    cached = getaway.allocate(preferences, licenses, engine="ranked", cache=getaway.SolveCache())
+    assert rank_sum(preferences, plain) == rank_sum(preferences, cached) == 0
+
+
+def test_ranked_max_slowdown():
+    preferences = [[1, 0], [1, 0], [0, 1], [0, 1], [0, 1], [1, 0], [1, 0], [0, 1], [1, 0], [0, 1]]
+    licenses = list(range(10))
+    car_list = getaway.allocate(preferences, licenses, engine="ranked", max_slowdown=1000.0)
+    assert valid_allocation(preferences, licenses, car_list) is None
+    with pytest.raises(ValueError):
+        getaway.allocate(preferences, licenses, engine="bipartite", max_slowdown=2.0)
+
+
+def kernel_networks():
+    '''
+    Function description:
+
+    This function returns the KernelFlowNetwork classes of the interpreted _getaway_kernel.py,
+    and of the extension of mypyc if it is the one which is imported.
+    '''
+    import importlib.util
+    import os
+
+    import _getaway_kernel
+
+    path = os.path.join(os.path.dirname(os.path.abspath(getaway.__file__)), "_getaway_kernel.py")
+    spec = importlib.util.spec_from_file_location("_getaway_kernel_interpreted", path)
+    interpreted = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(interpreted)
+
+    networks = [type("InterpretedKernelFlowNetwork", (getaway.KernelFlowNetwork,), {"kernel": interpreted})]
+    if _getaway_kernel.COMPILED:
+        networks.append(type("CompiledKernelFlowNetwork", (getaway.KernelFlowNetwork,), {"kernel": _getaway_kernel}))
+    return networks
+
+
+@pytest.mark.parametrize("network_class", kernel_networks(), ids=lambda network_class: network_class.__name__)
+def test_kernel_parity(network_class, monkeypatch):
+    # the kernel gives the same car list, and the same flow after the warm start, as the compact arrays
+    monkeypatch.setitem(getaway.NETWORK_BACKENDS, "test kernel", network_class)
+    rng = random.Random(21)
+    for n in [rng.randint(1, 15) for _ in range(300)] + [200, 2000]:
+        preferences, licenses = random_trip(rng, n)
+        expected = getaway.allocate_phased(preferences, licenses, "compact")
+        assert getaway.allocate_phased(preferences, licenses, "test kernel") == expected
+
+        network = network_class(preferences)
+        compact = getaway.CompactFlowNetwork(preferences)
+        for flow_network in (network, compact):
+            flow_network.add_source_edges(licenses)
+            flow_network.warm_start([[] for _ in range(flow_network.car_max)])
+        assert list(network.f) == list(compact.f)
+
+
+def test_spill_network(monkeypatch):
+    # the "spill" backend gives the car list of "compact" with a budget which drops the pages all the time,
+    # and it closes its files at the end of the solve
+    networks = []
+
+    class SmallSpillFlowNetwork(getaway.SpillFlowNetwork):
+        def __init__(self, preferences):
+            getaway.SpillFlowNetwork.__init__(self, preferences, budget=64)
+            networks.append(self)
+
+    monkeypatch.setitem(getaway.NETWORK_BACKENDS, "test spill", SmallSpillFlowNetwork)
+    rng = random.Random(24)
+    for n in [rng.randint(1, 15) for _ in range(100)] + [300]:
+        preferences, licenses = random_trip(rng, n)
+        # a person who is in licenses twice makes the edge arrays grow
+        licenses = licenses + licenses[:2]
+        expected = getaway.allocate_phased(preferences, licenses, "compact")
+        assert getaway.allocate_phased(preferences, licenses, "test spill") == expected
+        assert networks.pop().files == {}
+
+    with getaway.SpillFlowNetwork([[0]] * 5) as network:
+        files = list(network.files.values())
+        network.add_source_edges(list(range(5)) * 3)
+    assert network.files == {} and all(file.closed for file in files)
+    network.close()
+
+
+def test_auto_backend_in_stats(monkeypatch):
+    # the backend of choose_backend is kept in stats, so a solve which uses the files of "spill" can be seen
+    rng = random.Random(240)
+    preferences, licenses = random_trip(rng, getaway.KERNEL_TRIP)
+    monkeypatch.setattr(getaway, "SPILL_BUDGET", 1 << 16)
+    stats = getaway.AllocationStats()
+    car_list = getaway.allocate(preferences, licenses, engine="phased", stats=stats)
+    assert stats.backend == "spill" and stats.as_dict()["backend"] == "spill"
+    assert car_list == getaway.allocate_phased(preferences, licenses, "compact")
+
+    stats = getaway.AllocationStats()
+    # a trip which check_trip rejects builds no network
+    assert getaway.allocate([[0]] * 5, [0], engine="phased", stats=stats) is None
+    assert stats.backend is None
+    getaway.allocate([[0]] * 5, [0, 1], engine="phased", stats=stats)
+    assert stats.backend == "compact"
+    stats = getaway.AllocationStats()
+    getaway.allocate([[0]] * 5, [0, 1], stats=stats)
+    assert stats.backend is None
+
+
+def test_tiny_engine():
+    # "auto" uses "tiny" up to TINY_TRIP people, and it agrees with "bipartite"
+    rng = random.Random(23)
+    assert getaway.choose_engine([[0]] * getaway.TINY_TRIP, []) == "tiny"
+    assert getaway.choose_engine([[0]] * (getaway.TINY_TRIP + 1), []) == "bipartite"
+    for _ in range(300):
+        preferences, licenses = random_trip(rng, rng.randint(1, getaway.TINY_TRIP))
+        stats = getaway.AllocationStats()
+        car_list = getaway.allocate(preferences, licenses, stats=stats)
+        assert stats.engine == "tiny"
+        bipartite = getaway.allocate(preferences, licenses, engine="bipartite")
+        assert (car_list is None) == (bipartite is None)
+        if car_list is not None:
+            assert valid_allocation(preferences, licenses, car_list) is None
+
+    # a trip of more than 200 cars is solved by "bipartite"
+    preferences = [[j] for j in range(201) for _ in range(5)]
+    licenses = list(range(len(preferences)))
+    assert valid_allocation(preferences, licenses, getaway.allocate_tiny(preferences, licenses)) is None
+
+
+@pytest.mark.parametrize("argv, trip, status", [
+    ([], {"preferences": [[0, 1], [0], [0, 1], [1], [1], [0], [1]], "licenses": [0, 3, 4, 1]}, 0),
+    (["--engine", "phased", "--backend", "compact"], {"preferences": [[0]] * 5, "licenses": [0, 1]}, 0),
+    ([], {"preferences": [[0]] * 5, "licenses": [0]}, 1),
+    (["--strict"], {"preferences": [[0]] * 5, "licenses": [0]}, 1),
+    ([], {"preferences": [[3]], "licenses": [0]}, 2),
+    (["--engine", "fastest"], {"preferences": [[0]], "licenses": [0]}, 2),
+])
+def test_main(argv, trip, status):
+    import io
+    import json
+
+    stdout = io.StringIO()
+    assert getaway.main(argv, io.StringIO(json.dumps(trip)), stdout) == status
+    if status == 0:
+        assert valid_allocation(trip["preferences"], trip["licenses"], json.loads(stdout.getvalue())) is None
+    elif status == 1:
+        assert json.loads(stdout.getvalue()) is None